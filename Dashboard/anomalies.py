@@ -0,0 +1,143 @@
+"""Anomalous hours against a robust hour-of-week baseline.
+
+For every (hour of week, weathersit) cell, 168 x 4 of them, the baseline
+keeps an exact histogram of each hourly measure with one bin per rental
+count, built by a single ``bincount`` over all rows. The median and the MAD
+(median absolute deviation) of each cell are read off the histograms, and
+an hour is anomalous when its modified z-score
+``0.6745 * (x - median) / MAD`` is beyond `THRESHOLD` in a cell with at
+least `min_hours` observations (the 3.5 cut-off of Iglewicz and Hoaglin).
+Medians are lower medians, so both statistics stay whole counts, and the
+MAD is at least 1 so cells that are almost always 0 at night do not flag
+every single rental.
+
+New days only add to the histograms (`extend`), so the baseline follows an
+appended all_data.csv without revisiting older rows.
+
+    python anomalies.py --measure count_hour --top 10
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from data_loader import load_all_data
+
+MEASURES = ("count_hour", "casual_hour", "registered_hour")
+WEATHER_CODES = 4
+CELLS = 7 * 24 * WEATHER_CODES
+THRESHOLD = 3.5
+# 0.6745 is the 0.75 quantile of the standard normal: MAD / 0.6745 estimates sigma
+MAD_SCALE = 0.6745
+
+
+def cell_index(hourly):
+    """(hour of week, weathersit) cell of each hourly row; weeks start on Minggu 00:00."""
+    hour_of_week = hourly["weekday_hour"].to_numpy().astype(np.intp) * 24 + hourly["hour"].to_numpy().astype(np.intp)
+    # weathersit_hour holds the labels; its codes are 0-based
+    return hour_of_week * WEATHER_CODES + hourly["weathersit_hour"].cat.codes.to_numpy().astype(np.intp)
+
+
+class AnomalyBaseline:
+    def __init__(self, hourly, measures=MEASURES, min_hours=8):
+        self.measures = tuple(measures)
+        self.min_hours = min_hours
+        self.hist = np.zeros((len(self.measures), CELLS, 1), dtype=np.int64)
+        self._stats = None
+        self.extend(hourly)
+
+    def extend(self, hourly):
+        """Add the rows of `hourly` to the histograms.
+
+        The histograms are rebound rather than written in place, so a
+        shallow copy can be extended while the original is still read.
+        """
+        if len(hourly) == 0:
+            return self
+        cells = cell_index(hourly)
+        values = np.stack([hourly[measure].to_numpy().astype(np.intp) for measure in self.measures])
+        if values.min() < 0:
+            raise ValueError("hourly measures must be non-negative counts")
+        width = max(self.hist.shape[2], int(values.max()) + 1)
+        hist = np.zeros((len(self.measures), CELLS, width), dtype=np.int64)
+        hist[:, :, :self.hist.shape[2]] = self.hist
+        for m, column in enumerate(values):
+            hist[m] += np.bincount(cells * width + column, minlength=CELLS * width).reshape(CELLS, width)
+        self.hist = hist
+        self._stats = None
+        return self
+
+    def stats(self):
+        """``(n, median, mad)``, each of shape ``(len(measures), CELLS)``."""
+        if self._stats is not None:
+            return self._stats
+        n = self.hist.sum(axis=2)
+        cumulative = np.cumsum(self.hist, axis=2)
+        width = self.hist.shape[2]
+        # Lower median: the value at 0-based rank (n - 1) // 2
+        rank = np.maximum(n - 1, 0) // 2
+        median = (cumulative <= rank[..., None]).sum(axis=2)
+        median = np.minimum(median, width - 1)
+
+        def within(distance):
+            # Observations with |x - median| <= distance
+            upper = np.take_along_axis(cumulative, np.minimum(median + distance, width - 1)[..., None], axis=2)[..., 0]
+            lower_index = median - distance - 1
+            lower = np.take_along_axis(cumulative, np.maximum(lower_index, 0)[..., None], axis=2)[..., 0]
+            return upper - np.where(lower_index >= 0, lower, 0)
+
+        # MAD: the smallest distance that covers more than `rank` observations,
+        # found by a binary search run on every cell at once
+        lo, hi = np.zeros_like(median), np.full_like(median, width)
+        while (lo < hi).any():
+            middle = (lo + hi) // 2
+            enough = within(middle) > rank
+            hi = np.where(enough & (lo < hi), middle, hi)
+            lo = np.where(~enough & (lo < hi), middle + 1, lo)
+        self._stats = (n, median, lo)
+        return self._stats
+
+    def score(self, hourly, measure="count_hour"):
+        """``(expected, z)`` per row: the cell median and the modified z-score.
+
+        The score is NaN in cells with fewer than `min_hours` observations.
+        """
+        m = self.measures.index(measure)
+        n, median, mad = (values[m] for values in self.stats())
+        cells = cell_index(hourly)
+        expected = median[cells]
+        z = MAD_SCALE * (hourly[measure].to_numpy().astype(np.float64) - expected) / np.maximum(mad[cells], 1)
+        z[n[cells] < self.min_hours] = np.nan
+        return expected, z
+
+    def anomalies(self, hourly, measure="count_hour", threshold=THRESHOLD):
+        """Rows of `hourly` whose score is beyond `threshold`, with expected value and score, largest first."""
+        expected, z = self.score(hourly, measure)
+        flagged = np.flatnonzero(np.abs(np.nan_to_num(z)) > threshold)
+        flagged = flagged[np.argsort(-np.abs(z[flagged]), kind="stable")]
+        rows = hourly.iloc[flagged]
+        return pd.DataFrame({
+            "dateday": rows["dateday"].to_numpy(),
+            "hour": rows["hour"].to_numpy(),
+            "weathersit": rows["weathersit_hour"].to_numpy(),
+            measure: rows[measure].to_numpy(),
+            "expected": expected[flagged],
+            "z": z[flagged],
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--measure", choices=MEASURES, default="count_hour")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    hourly, _ = load_all_data()
+    found = AnomalyBaseline(hourly).anomalies(hourly, args.measure, args.threshold)
+    print(f"{len(found):,} anomalous hours of {len(hourly):,}")
+    print(found.head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""Local JSON API serving the dashboard's aggregates outside Streamlit.
+
+A small HTTP/1.1 server on asyncio streams (standard library only) answers
+GET requests from the same `LiveDataset` the dashboard uses:
+
+* ``/summary?by=season|month|weekday|weathersit|total&measure=count|casual|registered``:
+  count/sum/mean/std/min/max per group and ``median_estimate``, from the
+  aggregate cube's histograms (within one bin width of the exact median);
+* ``/totals``: days and rental totals from the prefix sums, with the daily
+  average and the casual share;
+* ``/users``: casual vs registered statistics, estimated quartiles
+  (``q25_estimate``, ``median_estimate``, ``q75_estimate``) and weekday means;
+* ``/health``: rows, digest and cache counters (never cached).
+
+Every endpoint takes the dashboard's filters: ``start`` and ``end``
+(YYYY-MM-DD, clamped to the data), ``weekdays`` (codes 0-6, 0 = Minggu) and
+``weather`` (weathersit codes 1-4) as comma-separated lists. Parameters are
+normalised before they become the cache key (defaults filled in, dates
+clamped, code lists sorted and deduplicated, a list of every code treated as
+no filter), so equivalent queries share one entry in `ResponseCache`, an LRU
+of encoded bodies whose entries also expire after ``ttl`` seconds. The key
+includes the dataset digest, so an appended all_data.csv is never answered
+from an older version. Misses are computed in a worker thread; concurrent
+misses for the same key wait for one computation. A request that fails
+unexpectedly gets a 500 with a JSON error body, and a failed reload keeps
+serving the last good version; both are logged.
+
+    python api.py --port 8765
+    curl 'http://127.0.0.1:8765/summary?by=season&weekdays=1,2,3,4,5&measure=casual'
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import math
+import time
+from collections import OrderedDict, namedtuple
+from urllib.parse import parse_qsl, urlsplit
+
+from data_loader import DATA_PATH, MONTH_NAMES
+from incremental import LiveDataset
+from transforms import DAY_NAMES, SEASONS, WEATHER_NAMES
+
+MEASURES = {"count": "count_day", "casual": "casual_day", "registered": "registered_day"}
+GROUP_LABELS = {
+    "total": lambda code: "Semua",
+    "season": lambda code: SEASONS[code],
+    "month": lambda code: MONTH_NAMES[code - 1],
+    "weekday": lambda code: DAY_NAMES[code],
+    "weathersit": lambda code: WEATHER_NAMES[code - 1],
+}
+FILTER_PARAMS = ("start", "end", "weekdays", "weather")
+ENDPOINT_PARAMS = {"/summary": ("by", "measure"), "/totals": (), "/users": ()}
+MAX_HEADER_BYTES = 16384
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+logger = logging.getLogger(__name__)
+
+Filters = namedtuple("Filters", "start end weekdays weather")
+
+
+class ResponseCache:
+    """LRU cache of encoded responses; entries also expire `ttl` seconds after they were stored.
+
+    Only the event loop thread touches it, so it needs no lock.
+    ``max_entries=0`` disables caching.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and self.clock() >= entry[0]:
+            del self._entries[key]
+            self.expired += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, body):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (self.clock() + self.ttl, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def _codes(text, name, valid):
+    """Sorted unique codes of a comma-separated list; None when it selects every code."""
+    try:
+        codes = tuple(sorted({int(part) for part in text.split(",") if part.strip()}))
+    except ValueError:
+        raise ValueError(f"{name} must be a comma-separated list of integers") from None
+    if not codes or not set(codes) <= set(valid):
+        raise ValueError(f"{name} codes must be in {min(valid)}-{max(valid)}")
+    return None if len(codes) == len(valid) else codes
+
+
+def normalize(params, state):
+    """`Filters` of a query's filter parameters, with defaults filled in and dates clamped."""
+    first, last = (date.date() for date in state.daily["date"].iloc[[0, -1]])
+    try:
+        start = datetime.date.fromisoformat(params["start"]) if "start" in params else first
+        end = datetime.date.fromisoformat(params["end"]) if "end" in params else last
+    except ValueError:
+        raise ValueError("start and end must be dates in YYYY-MM-DD format") from None
+    start, end = max(start, first), min(end, last)
+    if start > end:
+        raise ValueError("start is after end or outside the data")
+    weekdays = _codes(params["weekdays"], "weekdays", range(7)) if "weekdays" in params else None
+    weather = _codes(params["weather"], "weather", range(1, 5)) if "weather" in params else None
+    return Filters(start, end, weekdays, weather)
+
+
+def _number(value):
+    # JSON has no NaN; groups and filters without days report null
+    value = value.item() if hasattr(value, "item") else value
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def _column_name(column):
+    # The cube's quantiles are histogram estimates; the names say so
+    if column == "q50":
+        return "median_estimate"
+    return f"{column}_estimate" if column.startswith("q") else column
+
+
+def _filters_json(filters):
+    return {
+        "start": filters.start.isoformat(),
+        "end": filters.end.isoformat(),
+        "weekdays": list(filters.weekdays) if filters.weekdays is not None else None,
+        "weather": list(filters.weather) if filters.weather is not None else None,
+    }
+
+
+def summary(state, filters, by="total", measure="count"):
+    """Per-group statistics of one measure, as the dashboard's summary tables."""
+    table = state.cube.summary(
+        filters.start, filters.end, MEASURES[measure], by=None if by == "total" else by,
+        weekdays=filters.weekdays, weather=filters.weather,
+    )
+    label = GROUP_LABELS[by]
+    return {
+        "by": by,
+        "measure": measure,
+        "groups": [
+            {"code": int(code), "label": label(int(code)),
+             **{_column_name(column): _number(value) for column, value in row.items()}}
+            for code, row in zip(table.index, table.to_dict("records"))
+        ],
+    }
+
+
+def totals(state, filters):
+    """Days and rental totals over the filters, like the dashboard's metric cards."""
+    sums = state.prefix_sums.totals(filters.start, filters.end, weekdays=filters.weekdays, weather=filters.weather)
+    days = sums["days"]
+    return {
+        "days": days,
+        **{name: sums[column] for name, column in MEASURES.items()},
+        "mean_daily": sums["count_day"] / days if days else None,
+        "casual_share": sums["casual_day"] / sums["count_day"] if sums["count_day"] else None,
+    }
+
+
+def users(state, filters):
+    """Casual vs registered: daily statistics with quartiles and the mean per weekday."""
+    result = {}
+    for name in ("casual", "registered"):
+        arguments = dict(weekdays=filters.weekdays, weather=filters.weather)
+        overall = state.cube.summary(filters.start, filters.end, MEASURES[name], quantiles=(0.25, 0.5, 0.75), **arguments)
+        weekly = state.cube.summary(filters.start, filters.end, MEASURES[name], by="weekday", **arguments)["mean"]
+        result[name] = {
+            **({_column_name(column): _number(value) for column, value in overall.to_dict("records")[0].items()} if len(overall) else {}),
+            "weekday_mean": {DAY_NAMES[int(day)]: _number(mean) for day, mean in weekly.items()},
+        }
+    return result
+
+
+ENDPOINTS = {"/summary": summary, "/totals": totals, "/users": users}
+
+
+class AggregateServer:
+    """Serves `ENDPOINTS` for one `LiveDataset`, re-checking the file every `refresh` seconds."""
+
+    def __init__(self, dataset, cache=None, refresh=1.0):
+        self.dataset = dataset
+        self.cache = cache if cache is not None else ResponseCache()
+        self.refresh = refresh
+        self.state = None
+        self.requests = 0
+        self._pending = {}
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.refresh)
+            try:
+                self.state = await asyncio.to_thread(self.dataset.current)
+            except Exception:
+                # e.g. the file is mid-write or the cache directory is gone:
+                # keep answering from the last good state and retry next time
+                logger.exception("reloading %s failed; still serving digest %s", self.dataset.path, self.state.digest)
+
+    def _parse(self, target, state):
+        """(endpoint, normalised key parameters, function arguments) of a request target."""
+        url = urlsplit(target)
+        if url.path not in ENDPOINTS:
+            raise LookupError(url.path)
+        params = dict(parse_qsl(url.query, keep_blank_values=True))
+        allowed = FILTER_PARAMS + ENDPOINT_PARAMS[url.path]
+        unknown = sorted(set(params) - set(allowed))
+        if unknown:
+            raise ValueError(f"unknown parameter(s) {', '.join(unknown)}; expected {', '.join(allowed)}")
+        arguments = {}
+        if url.path == "/summary":
+            arguments["by"] = params.get("by", "total")
+            arguments["measure"] = params.get("measure", "count")
+            if arguments["by"] not in GROUP_LABELS:
+                raise ValueError(f"by must be one of {', '.join(GROUP_LABELS)}")
+            if arguments["measure"] not in MEASURES:
+                raise ValueError(f"measure must be one of {', '.join(MEASURES)}")
+        return url.path, normalize(params, state), arguments
+
+    async def respond(self, target):
+        """``(status, body, cache)`` for a GET of `target`; `cache` is "hit", "miss" or "none"."""
+        self.requests += 1
+        if urlsplit(target).path == "/health":
+            return 200, self._encode(self.health()), "none"
+        state = self.state
+        try:
+            path, filters, arguments = self._parse(target, state)
+        except LookupError:
+            return 404, self._encode({"error": f"unknown endpoint; expected {', '.join([*ENDPOINTS, '/health'])}"}), "none"
+        except ValueError as error:
+            return 400, self._encode({"error": str(error)}), "none"
+
+        key = (path, state.digest, filters, tuple(sorted(arguments.items())))
+        body = self.cache.get(key)
+        if body is not None:
+            return 200, body, "hit"
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = asyncio.ensure_future(asyncio.to_thread(self._compute, state, path, filters, arguments))
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        body = await asyncio.shield(pending)
+        self.cache.put(key, body)
+        return 200, body, "miss"
+
+    def _compute(self, state, path, filters, arguments):
+        return self._encode({"filters": _filters_json(filters), **ENDPOINTS[path](state, filters, **arguments)})
+
+    @staticmethod
+    def _encode(payload):
+        return json.dumps(payload, ensure_ascii=False, allow_nan=False).encode()
+
+    def health(self):
+        return {
+            "rows": self.state.rows,
+            "digest": self.state.digest,
+            "requests": self.requests,
+            "cache": {
+                "entries": len(self.cache), "hits": self.cache.hits,
+                "misses": self.cache.misses, "expired": self.cache.expired,
+            },
+        }
+
+    async def handle(self, reader, writer):
+        """One connection: requests are answered in order until the client closes or asks to."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ")
+                except ValueError:
+                    break
+                headers = dict(
+                    (name.strip().lower(), value.strip())
+                    for name, _, value in (line.partition(":") for line in lines[1:] if line)
+                )
+                if int(headers.get("content-length", 0) or 0):
+                    await reader.readexactly(int(headers["content-length"]))
+                keep_alive = headers.get("connection", "").lower() != "close" and (
+                    version == "HTTP/1.1" or headers.get("connection", "").lower() == "keep-alive"
+                )
+
+                if method != "GET":
+                    status, body, cache = 405, self._encode({"error": "only GET is supported"}), "none"
+                elif self.state is None:
+                    status, body, cache = 503, self._encode({"error": "dataset is loading"}), "none"
+                else:
+                    try:
+                        status, body, cache = await self.respond(target)
+                    except Exception:
+                        logger.exception("GET %s failed", target)
+                        status, body, cache = 500, self._encode({"error": "internal server error"}), "none"
+                writer.write(
+                    f"{version} {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"X-Cache: {cache}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.LimitOverrunError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765, ready=None):
+        """Load the dataset, then serve until cancelled; `ready` is called with the bound port."""
+        self.state = await asyncio.to_thread(self.dataset.current)
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        watcher = asyncio.create_task(self._watch())
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[1])
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache-entries", type=int, default=1024, help="0 disables the response cache")
+    parser.add_argument("--ttl", type=float, default=300.0, help="seconds a cached response stays valid")
+    args = parser.parse_args()
+
+    server = AggregateServer(LiveDataset(args.data), ResponseCache(args.cache_entries, args.ttl))
+    try:
+        asyncio.run(server.serve(
+            args.host, args.port, ready=lambda port: print(f"serving {args.data} on http://{args.host}:{port}", flush=True)
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Building and updating the anomaly baseline on millions of hourly rows.
+
+all_data.csv is tiled ``--copies`` times back in time. Timed cases:
+
+* pandas: per-cell median and MAD of every measure with ``groupby`` (two
+  medians per measure, the second over the absolute deviations);
+* build: `anomalies.AnomalyBaseline` over all but the last day, then its stats;
+* extend: one more day (24 hours) folded into a copy of the built
+  baseline, then its stats, checked against a rebuild from scratch;
+* score: modified z-scores of every row for one measure.
+
+pandas interpolates even-sized medians where the baseline takes the lower
+one, so only the timings are compared.
+
+    python -m benchmarks.anomalies --copies 100
+"""
+import argparse
+import copy
+import time
+
+import numpy as np
+
+import anomalies
+from benchmarks.partitions import tiled
+
+
+def pandas_stats(frame):
+    cells = anomalies.cell_index(frame)
+    result = {}
+    for measure in anomalies.MEASURES:
+        values = frame[measure].astype(np.int64)
+        median = values.groupby(cells).transform("median")
+        result[measure] = (median.groupby(cells).first(), (values - median).abs().groupby(cells).median())
+    return result
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return result, float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    frame = tiled(args.copies)
+    history, last_day = frame.iloc[:-24], frame.iloc[-24:]
+    print(f"{len(frame):,} hourly rows")
+
+    _, seconds = timed(lambda: pandas_stats(frame), args.repeat)
+    print(f"  {'pandas':<8} {seconds * 1000:9.1f} ms")
+    _, seconds = timed(lambda: anomalies.AnomalyBaseline(history).stats(), args.repeat)
+    print(f"  {'build':<8} {seconds * 1000:9.1f} ms")
+    baseline = anomalies.AnomalyBaseline(history)
+    baseline.stats()
+    extended, seconds = timed(lambda: copy.copy(baseline).extend(last_day), args.repeat)
+    _, stats_seconds = timed(extended.stats, 1)
+    rebuilt = anomalies.AnomalyBaseline(frame)
+    same = all(np.array_equal(have, want) for have, want in zip(extended.stats(), rebuilt.stats()))
+    print(f"  {'extend':<8} {seconds * 1000:9.1f} ms  + stats {stats_seconds * 1000:.1f} ms"
+          f"  {'identical to a rebuild' if same else 'DIFFERENT from a rebuild'}")
+    (_, z), seconds = timed(lambda: rebuilt.score(frame, "count_hour"), args.repeat)
+    flagged = int((np.abs(np.nan_to_num(z)) > anomalies.THRESHOLD).sum())
+    print(f"  {'score':<8} {seconds * 1000:9.1f} ms  {flagged:,} anomalous hours")
+
+
+if __name__ == "__main__":
+    main()
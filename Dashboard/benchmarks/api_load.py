@@ -0,0 +1,121 @@
+"""Load test of the local aggregate API: requests per second and latency percentiles.
+
+``--connections`` keep-alive clients on one asyncio loop send ``--requests``
+GETs in total, each drawn at random from ``--distinct`` queries over every
+endpoint, grouping, measure and filter combination. Without ``--url`` the
+script starts `api.AggregateServer` in a forked child twice, once with the
+response cache disabled and once with it on, so the two runs differ only in
+caching; with ``--url`` it loads an already running server. The client and
+a forked server share the machine, so on few CPUs the client's own work is
+part of the measured latency.
+
+    python -m benchmarks.api_load --requests 5000 --connections 32 --distinct 200
+    python -m benchmarks.api_load --url http://127.0.0.1:8765
+"""
+import argparse
+import asyncio
+import multiprocessing
+import time
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+import api
+from incremental import LiveDataset
+
+
+def queries(count, seed=0):
+    """`count` distinct request targets with random endpoints and filters."""
+    rng = np.random.default_rng(seed)
+    days = np.arange(np.datetime64("2011-01-01"), np.datetime64("2013-01-01"))
+    targets = set()
+    while len(targets) < count:
+        path = rng.choice(["/summary", "/totals", "/users"], p=[0.6, 0.2, 0.2])
+        params = {}
+        if path == "/summary":
+            params["by"] = rng.choice(list(api.GROUP_LABELS))
+            params["measure"] = rng.choice(list(api.MEASURES))
+        if rng.random() < 0.7:
+            start, end = np.sort(rng.choice(days, 2, replace=False))
+            params["start"], params["end"] = str(start), str(end)
+        if rng.random() < 0.5:
+            params["weekdays"] = ",".join(map(str, sorted(rng.choice(7, rng.integers(1, 7), replace=False))))
+        if rng.random() < 0.3:
+            params["weather"] = ",".join(map(str, sorted(rng.choice(np.arange(1, 5), rng.integers(1, 4), replace=False))))
+        targets.add(f"{path}?{urlencode(params)}" if params else str(path))
+    return sorted(targets)
+
+
+async def _client(host, port, targets, order, position, latencies, outcomes):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while position[0] < len(order):
+            target = targets[order[position[0]]]
+            position[0] += 1
+            started = time.perf_counter()
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+            headers = dict((name.lower(), value.strip()) for name, _, value in (line.partition(":") for line in head[1:] if line))
+            await reader.readexactly(int(headers["content-length"]))
+            latencies.append(time.perf_counter() - started)
+            outcomes.append((head[0].split(" ")[1], headers.get("x-cache", "none")))
+    finally:
+        writer.close()
+
+
+async def load(host, port, targets, requests, connections, seed=1):
+    """(seconds, latencies, outcomes) of `requests` GETs spread over `connections` clients."""
+    order = np.random.default_rng(seed).integers(len(targets), size=requests)
+    position, latencies, outcomes = [0], [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, targets, order, position, latencies, outcomes) for _ in range(connections)
+    ))
+    return time.perf_counter() - started, np.array(latencies), outcomes
+
+
+def report(name, seconds, latencies, outcomes):
+    statuses = [status for status, _ in outcomes]
+    hits = sum(cache == "hit" for _, cache in outcomes)
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"  {name:<10} {len(latencies) / seconds:8.0f} req/s  p50 {p50:7.2f} ms  p99 {p99:7.2f} ms"
+          f"  max {latencies.max() * 1000:7.2f} ms  hits {hits / len(outcomes):6.1%}"
+          f"  non-200 {sum(status != '200' for status in statuses)}")
+
+
+def _serve(cache_entries, ttl, ports):
+    server = api.AggregateServer(LiveDataset(), api.ResponseCache(cache_entries, ttl))
+    asyncio.run(server.serve(port=0, ready=ports.put))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="load this running server instead of starting one")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--distinct", type=int, default=200)
+    parser.add_argument("--ttl", type=float, default=300.0)
+    args = parser.parse_args()
+
+    targets = queries(args.distinct)
+    print(f"{args.requests:,} requests over {args.connections} connections, {len(targets)} distinct queries")
+    if args.url:
+        url = urlsplit(args.url)
+        report("server", *asyncio.run(load(url.hostname, url.port, targets, args.requests, args.connections)))
+        return
+
+    context = multiprocessing.get_context("fork")
+    for name, cache_entries in (("no cache", 0), ("cache", 1024)):
+        ports = context.Queue()
+        child = context.Process(target=_serve, args=(cache_entries, args.ttl, ports), daemon=True)
+        child.start()
+        try:
+            port = ports.get(timeout=120)
+            report(name, *asyncio.run(load("127.0.0.1", port, targets, args.requests, args.connections)))
+        finally:
+            child.terminate()
+            child.join()
+
+
+if __name__ == "__main__":
+    main()
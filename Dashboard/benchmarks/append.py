@@ -0,0 +1,93 @@
+"""Appending single days versus rebuilding the whole dataset.
+
+Starts from all_data.csv rebuilt up to ``--days`` days before the end of
+Dataset/hour.csv (in a temporary directory), then appends the remaining days
+one at a time with `incremental.append_days`, refreshing a `LiveDataset`
+after each append. The final file is compared byte for byte with the
+shipped all_data.csv and the incremental state with a full rebuild.
+
+``--copies`` puts that many copies of all_data.csv, shifted back in time,
+before the starting file, to show that an append costs the same however
+long the history is. The full rebuild then writes the whole scaled history
+(the copies plus all_data.csv) and the appended file is compared with that.
+
+    python -m benchmarks.append --days 30
+    python -m benchmarks.append --days 10 --copies 50
+"""
+import argparse
+import filecmp
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import pipeline
+from benchmarks.partitions import tiled
+from data_loader import DATA_PATH, DAY_PATH, HOUR_PATH, load_all_data
+from incremental import LiveDataset, append_days, check_consistency, load_summary
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--copies", type=int, default=0, help="earlier copies of all_data.csv to start from")
+    args = parser.parse_args()
+
+    hour, day = pd.read_csv(HOUR_PATH), pd.read_csv(DAY_PATH)
+    dates = day["dteday"].to_numpy()
+    cutoff = dates[-args.days]
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "all_data.csv")
+        cache_dir = os.path.join(workdir, "cache")
+        if args.copies:
+            scaled = tiled(args.copies)
+            history = scaled[scaled["dateday"] < pd.Timestamp(cutoff)]
+        else:
+            history = pipeline.join(hour[hour["dteday"] < cutoff], day[day["dteday"] < cutoff])
+        history.to_csv(path, index=False, date_format="%Y-%m-%d")
+        print(f"{len(history):,} rows ({os.path.getsize(path) / 2**20:.0f} MB) before the first append")
+        dataset = LiveDataset(path, cache_dir)
+        dataset.current()
+        load_summary(path, cache_dir)
+
+        append_ms, refresh_ms = [], []
+        for date in dates[-args.days:]:
+            _, elapsed = timed(append_days, hour[hour["dteday"] == date], day[day["dteday"] == date], path, cache_dir)
+            append_ms.append(elapsed)
+            state, elapsed = timed(dataset.current)
+            refresh_ms.append(elapsed)
+            assert state.incremental
+
+        full_path = os.path.join(workdir, "full.csv")
+
+        def rebuild():
+            # The same history the appends produced, written and loaded in one go
+            if args.copies:
+                scaled.to_csv(full_path, index=False, date_format="%Y-%m-%d")
+            else:
+                pipeline.write_csv(full_path)
+            hourly, _ = load_all_data(full_path, cache_dir=os.path.join(workdir, "full"))
+            LiveDataset._build("", hourly, {})
+
+        _, full_ms = timed(rebuild)
+        print(f"append one day    p50 {np.median(append_ms):7.1f} ms  max {max(append_ms):7.1f} ms")
+        print(f"dashboard refresh p50 {np.median(refresh_ms):7.1f} ms  max {max(refresh_ms):7.1f} ms")
+        print(f"full rebuild          {full_ms:7.1f} ms")
+        if args.copies:
+            print(f"matches the rebuilt file: {filecmp.cmp(path, full_path, shallow=False)}")
+        else:
+            print(f"matches all_data.csv: {filecmp.cmp(path, DATA_PATH, shallow=False)}")
+        problems = check_consistency(path, cache_dir, dataset)
+        print("consistent with a full rebuild" if not problems else "\n".join(problems))
+
+
+if __name__ == "__main__":
+    main()
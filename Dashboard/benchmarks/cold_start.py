@@ -0,0 +1,81 @@
+"""Cold-start time and RSS of ``pd.read_csv`` versus the memory-mapped columnar cache.
+
+Each measurement runs in a fresh interpreter so nothing is warm except the OS
+page cache. The cache's one-off build (full hash, typed read, column files)
+is timed on its own; the ``mmap`` load is split into the digest check (size
+and mtime against the memo) and the memory-mapped read. Run from the
+Dashboard directory::
+
+    python -m benchmarks.cold_start
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import columnar_cache
+from data_loader import DATA_PATH, DAY_PATH, HOUR_PATH, read_all_data, read_day_csv, read_hour_csv
+
+PROBE = """
+import json, os, sys, time
+import pandas as pd
+import columnar_cache, data_loader
+
+path, reader, mode = sys.argv[1:4]
+read = getattr(data_loader, reader)
+start = time.perf_counter()
+digest_seconds = None
+if mode == "read_csv":
+    df = pd.read_csv(path)
+elif mode == "typed_csv":
+    df = read(path)
+else:
+    digest = columnar_cache.source_digest(path)
+    digest_seconds = time.perf_counter() - start
+    df = columnar_cache.read_columns(columnar_cache.cache_path(path, digest))
+# Touch every column so lazily mapped pages count towards RSS
+[df[c].iloc[-1] for c in df.columns]
+elapsed = time.perf_counter() - start
+with open("/proc/self/statm") as statm:
+    _, resident, shared = (int(v) * os.sysconf("SC_PAGE_SIZE") for v in statm.read().split()[:3])
+print(json.dumps({"seconds": elapsed, "digest_seconds": digest_seconds, "rss": resident, "shared": shared}))
+"""
+
+SOURCES = (
+    (HOUR_PATH, read_hour_csv),
+    (DAY_PATH, read_day_csv),
+    (DATA_PATH, read_all_data),
+)
+
+
+def probe(path, reader, mode):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, path, reader.__name__, mode],
+        check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(columnar_cache.__file__)),
+    ).stdout
+    return json.loads(output)
+
+
+def main(repeat=3):
+    for path, reader in SOURCES:
+        # Drop the digest memo so the build pays the full hash, as on first use
+        shutil.rmtree(columnar_cache.cache_path(path, columnar_cache.source_digest(path)), ignore_errors=True)
+        os.remove(os.path.join(columnar_cache.CACHE_DIR, os.path.basename(path) + ".digest.json"))
+        start = time.perf_counter()
+        columnar_cache.build(path, reader)
+        print(f"{os.path.basename(path)}  (build {(time.perf_counter() - start) * 1000:.1f} ms)")
+        for mode in ("read_csv", "typed_csv", "mmap"):
+            runs = [probe(path, reader, mode) for _ in range(repeat)]
+            best = min(runs, key=lambda run: run["seconds"])
+            digest = "" if best["digest_seconds"] is None else f"  (digest check {best['digest_seconds'] * 1000:.2f} ms)"
+            print(
+                f"  {mode:<10} {best['seconds'] * 1000:8.1f} ms"
+                f"  rss {best['rss'] / 2**20:6.1f} MB  shared {best['shared'] / 2**20:6.1f} MB{digest}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Fitting the what-if demand model on millions of hourly rows, and predicting from it.
+
+all_data.csv is tiled ``--copies`` times back in time. Each fit runs in a
+forked child so its time and peak RSS growth are measured in isolation:
+
+* lstsq: build the full design matrix and call ``np.linalg.lstsq`` on it;
+* chunked: `demand_model.fit`, accumulating the normal equations
+  ``--chunk-rows`` at a time.
+
+Then the time of one what-if rerun: predicting a week for every weather
+condition from the fitted coefficients.
+
+    python -m benchmarks.demand_model --copies 100
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+
+import numpy as np
+
+import demand_model
+from benchmarks.partitions import tiled
+
+
+def peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def full_lstsq(frame, chunk_rows):
+    first_year = int(frame["dateday"].iloc[0].year)
+    matrix = demand_model.frame_design(frame, first_year)
+    return np.linalg.lstsq(matrix, np.log1p(frame["count_hour"].to_numpy(dtype=np.float64)), rcond=None)[0]
+
+
+def chunked(frame, chunk_rows):
+    return demand_model.fit(frame, chunk_rows).coefficients
+
+
+def measure(function, frame, chunk_rows, results):
+    rss = peak_rss()
+    started = time.perf_counter()
+    coefficients = function(frame, chunk_rows)
+    results.put((coefficients, time.perf_counter() - started, peak_rss() - rss))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=100)
+    parser.add_argument("--chunk-rows", type=int, default=demand_model.CHUNK_ROWS)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    frame = tiled(args.copies)
+    print(f"{len(frame):,} hourly rows")
+    context = multiprocessing.get_context("fork")
+    fitted = {}
+    for name, function in (("lstsq", full_lstsq), ("chunked", chunked)):
+        results = context.Queue()
+        child = context.Process(target=measure, args=(function, frame, args.chunk_rows, results))
+        child.start()
+        fitted[name], seconds, rss = results.get()
+        child.join()
+        print(f"  {name:<8} fit {seconds * 1000:8.0f} ms  peak +{rss / 2**20:7.1f} MB RSS")
+    print(f"  largest coefficient difference {np.abs(fitted['lstsq'] - fitted['chunked']).max():.2e}")
+
+    model = demand_model.fit(frame, args.chunk_rows)
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        model.predict(model.scenarios(range(7), [1, 2, 3, 4], 20, 60, 12))
+    print(f"  predict a week x 4 weather conditions: {(time.perf_counter() - started) / args.repeat * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Exporting the full hourly history: one CSV string vs chunked files.
+
+all_data.csv is tiled ``--copies`` times back in time and the whole
+history is exported. Each approach runs in a forked child, so its time and
+peak RSS growth are measured in isolation:
+
+* to_csv: gather every row and build one CSV string, as the old
+  ``convert_df_to_csv`` did;
+* chunked: `export.export_file` in each format, ``--chunk-rows`` at a time.
+
+    python -m benchmarks.export --copies 50
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+
+import export
+from benchmarks.partitions import tiled
+
+
+def peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def day_ranges(frame):
+    dates = frame["dateday"].to_numpy()
+    days = np.unique(dates)
+    return np.searchsorted(dates, days, side="left"), np.searchsorted(dates, days, side="right")
+
+
+def whole_csv(frame, starts, stops, fmt, workdir, chunk_rows):
+    positions = np.concatenate([np.arange(lo, hi) for lo, hi in zip(starts, stops)])
+    return len(frame.take(positions).to_csv(index=False).encode("utf-8"))
+
+
+def chunked(frame, starts, stops, fmt, workdir, chunk_rows):
+    path = export.export_file(
+        export.signature(fmt, chunk_rows), fmt,
+        lambda: export.frame_chunks(frame, export.range_chunks(starts, stops, chunk_rows)),
+        export_dir=workdir,
+    )
+    return os.path.getsize(path)
+
+
+def measure(function, args, results):
+    rss = peak_rss()
+    started = time.perf_counter()
+    size = function(*args)
+    results.put((size, time.perf_counter() - started, peak_rss() - rss))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=50)
+    parser.add_argument("--chunk-rows", type=int, default=export.CHUNK_ROWS)
+    args = parser.parse_args()
+
+    frame = tiled(args.copies)
+    starts, stops = day_ranges(frame)
+    print(f"{len(frame):,} hourly rows, {len(starts):,} days")
+    context = multiprocessing.get_context("fork")
+    with tempfile.TemporaryDirectory() as workdir:
+        cases = [("to_csv string", whole_csv, "csv")] + [(f"chunked {fmt}", chunked, fmt) for fmt in export.FORMATS]
+        for name, function, fmt in cases:
+            results = context.Queue()
+            child = context.Process(
+                target=measure, args=(function, (frame, starts, stops, fmt, workdir, args.chunk_rows), results)
+            )
+            child.start()
+            size, seconds, rss = results.get()
+            child.join()
+            print(f"  {name:<16} {seconds * 1000:8.0f} ms  peak +{rss / 2**20:6.1f} MB RSS  {size / 2**20:7.1f} MB output")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Time to the first page and rerun cost of the dashboard script.
+
+Each run starts a fresh interpreter and drives the script with Streamlit's
+``AppTest``: the first page (imports, data load and every chart it draws
+with an empty render cache), a change of the weather tab's plot type and
+then the other chart mode. It also reports whether matplotlib and seaborn
+were imported. ``AppTest`` reruns the whole script on every widget change,
+so the rerun times include the part above the tabs, which a fragment rerun
+in the browser skips.
+
+    python -m benchmarks.first_page --repeat 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+script = sys.argv[1]
+timings = {}
+at = AppTest.from_file(script, default_timeout=600)
+start = time.perf_counter()
+at.run()
+timings["first page"] = time.perf_counter() - start
+modules = {name: name in sys.modules for name in ("matplotlib", "seaborn")}
+
+at.selectbox(key="weather_plot").set_value("Bar Plot")
+start = time.perf_counter()
+at.run()
+timings["plot type change"] = time.perf_counter() - start
+
+at.sidebar.radio[0].set_value("Ringan (klien)")
+start = time.perf_counter()
+at.run()
+timings["light mode"] = time.perf_counter() - start
+assert not at.exception, [e.value for e in at.exception]
+print(json.dumps({"timings": timings, "modules": modules}))
+"""
+
+
+def probe(script):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, script],
+        check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(script)),
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--script", default=os.path.join(os.path.dirname(os.path.dirname(__file__)), "dashboard.py"))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    runs = [probe(args.script) for _ in range(args.repeat)]
+    print(os.path.basename(args.script))
+    for step in runs[0]["timings"]:
+        best = min(run["timings"][step] for run in runs)
+        print(f"  {step:<17} {best * 1000:8.0f} ms")
+    imported = ", ".join(name for name, loaded in runs[0]["modules"].items() if loaded) or "none"
+    print(f"  plotting modules imported by the first page: {imported}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Latency of the hourly drill-down at synthetic scale.
+
+Builds `HourlyDrilldown` over ``--rows`` synthetic hourly rows and times a
+full-range heatmap, a peak-hour view and a sequence of small date-range
+moves answered incrementally.
+
+    python -m benchmarks.hourly --rows 10000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from hourly import HourlyDrilldown
+
+
+def synthetic_hourly(rows, seed=0):
+    """Contiguous hourly rows with a daily double-peak commuting profile."""
+    rng = np.random.default_rng(seed)
+    index = np.arange(rows)
+    hour = index % 24
+    profile = 40 + 200 * np.exp(-((hour - 8) ** 2) / 4) + 300 * np.exp(-((hour - 17.5) ** 2) / 5)
+    casual = rng.poisson(profile * 0.2).astype(np.int16)
+    registered = rng.poisson(profile * 0.8).astype(np.int16)
+    return {
+        "dateday": np.datetime64("1900-01-01") + index // 24,
+        "hour": hour.astype(np.int8),
+        "casual_hour": casual,
+        "registered_hour": registered,
+        "count_hour": (casual + registered).astype(np.int16),
+    }
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    hourly = synthetic_hourly(args.rows)
+    drill, build_ms = timed(HourlyDrilldown, hourly)
+    first, last = hourly["dateday"][0], hourly["dateday"][-1]
+    print(f"{args.rows:,} hourly rows, {drill.n_days:,} days; build {build_ms:.0f} ms")
+
+    _, full_ms = timed(drill.mean_grid, first, last)
+    print(f"full-range heatmap      {full_ms:8.1f} ms")
+    _, peak_ms = timed(drill.peak_hours, first, last)
+    print(f"peak-hour view          {peak_ms:8.1f} ms")
+
+    moves = []
+    start, end = first + 30, last - 30
+    for step in range(20):
+        _, ms = timed(drill.mean_grid, start + step, end - step)
+        moves.append(ms)
+    print(f"incremental range move  p50 {np.median(moves):6.2f} ms  max {max(moves):6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Compare the typed all_data.csv loader against a default ``pd.read_csv``.
+
+Run from the Dashboard directory::
+
+    python -m benchmarks.loader
+"""
+import time
+
+import pandas as pd
+
+from data_loader import DATA_PATH, read_all_data
+
+
+def measure(label, read):
+    start = time.perf_counter()
+    df = read()
+    elapsed = time.perf_counter() - start
+    memory = df.memory_usage(deep=True).sum()
+    print(f"{label:<10} {elapsed * 1000:8.1f} ms {memory / 2**20:8.2f} MB")
+    return memory
+
+
+def main():
+    default = measure("default", lambda: pd.read_csv(DATA_PATH))
+    typed = measure("typed", lambda: read_all_data(DATA_PATH))
+    print(f"typed frame uses {typed / default:.0%} of the default frame's memory")
+
+
+if __name__ == "__main__":
+    main()
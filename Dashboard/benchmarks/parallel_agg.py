@@ -0,0 +1,78 @@
+"""Partitioned aggregation at 1, 2, 4 and 8 workers against single-threaded pandas.
+
+all_data.csv is tiled ``--copies`` times back in time (two years per copy)
+and written as month partitions in a temporary directory. Each case
+aggregates every measure over the whole history:
+
+* pandas: read all partitions into one frame and ``groupby(...).agg`` with
+  count/sum/mean/std/min/max/median, as the notebook does;
+* partials: `parallel_agg.aggregate` at each ``--workers`` count, checked
+  to give exactly the tables of the one-worker run.
+
+    python -m benchmarks.parallel_agg --copies 100 --workers 1 2 4 8
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import parallel_agg
+from benchmarks.partitions import tiled
+from partitions import PartitionedDataset, write_partitions
+
+
+def pandas_tables(dataset, level, by):
+    frame = dataset.read(dataset.min_dates[level][0], dataset.max_dates[level][-1], level)
+    keys = parallel_agg.group_keys(frame, by, level)
+    return {
+        measure: frame[parallel_agg.column_name(measure, level)].astype(np.int64).groupby(keys)
+        .agg(["count", "sum", "mean", "std", "min", "max", "median"])
+        for measure in parallel_agg.MEASURES
+    }
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return result, float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=100)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    frame = tiled(args.copies)
+    print(f"{len(frame):,} hourly rows, {os.cpu_count()} CPU(s)")
+    with tempfile.TemporaryDirectory() as workdir:
+        root = os.path.join(workdir, "parts")
+        write_partitions(frame, root)
+        del frame
+        dataset = PartitionedDataset(root)
+
+        for level, by in (("hourly", "hour"), ("daily", "year"), ("daily", "season")):
+            print(f"{level} by {by}")
+            _, seconds = timed(lambda: pandas_tables(dataset, level, by), args.repeat)
+            print(f"  {'pandas':<10} {seconds * 1000:9.1f} ms")
+            baseline, serial = None, None
+            for workers in args.workers:
+                result, seconds = timed(
+                    lambda: parallel_agg.aggregate(dataset, level=level, by=by, workers=workers), args.repeat
+                )
+                tables = [result.table(measure) for measure in parallel_agg.MEASURES]
+                if baseline is None:
+                    baseline, serial = tables, seconds
+                same = all(table.equals(expected) for table, expected in zip(tables, baseline))
+                print(f"  {workers:>2} worker(s) {seconds * 1000:8.1f} ms  x{serial / seconds:5.2f}"
+                      f"  {'identical' if same else 'DIFFERENT'}")
+
+
+if __name__ == "__main__":
+    main()
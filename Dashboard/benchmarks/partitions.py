@@ -0,0 +1,104 @@
+"""Reading one month from a many-year dataset: whole frame vs month partitions.
+
+all_data.csv is tiled ``--copies`` times back in time (two years per copy)
+and stored twice in a temporary directory: as one columnar directory and as
+month partitions. Each approach runs in a forked child so its time and
+RSS growth are measured in isolation: opening the store, the first query
+and the median of the repeated queries.
+
+* ``dt.date`` mask: map the whole frame and compare Python dates per row;
+* searchsorted: map the whole frame and slice the sorted date column;
+* partitions: read only the rows of the overlapping months.
+
+    python -m benchmarks.partitions --copies 100
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import columnar_cache
+from data_loader import current_rss, read_all_data
+from partitions import PartitionedDataset, write_partitions
+
+
+def tiled(copies):
+    base = read_all_data()
+    dates = base["dateday"].to_numpy()
+    span = (dates[-1] - dates[0]).astype("timedelta64[D]") + np.timedelta64(1, "D")
+    frames = [base.assign(dateday=dates - span * k) for k in range(copies, 0, -1)] + [base]
+    return pd.concat(frames, ignore_index=True)
+
+
+def open_full(full_dir, _):
+    return columnar_cache.read_columns(full_dir)
+
+
+def open_partitions(_, root):
+    return PartitionedDataset(root)
+
+
+def date_mask(frame, start, end):
+    days = frame["dateday"].dt.date
+    return frame[(days >= start) & (days <= end)]
+
+
+def sorted_slice(frame, start, end):
+    lo, hi = np.searchsorted(frame["dateday"].to_numpy(), [np.datetime64(start), np.datetime64(end) + 1])
+    return frame.iloc[lo:hi].copy()
+
+
+def partitioned(dataset, start, end):
+    return dataset.read(start, end)
+
+
+def measure(opener, query, paths, start, end, results, repeat=5):
+    rss = current_rss()
+    started = time.perf_counter()
+    handle = opener(*paths)
+    open_ms = (time.perf_counter() - started) * 1000
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = len(query(handle, start, end))
+        timings.append((time.perf_counter() - started) * 1000)
+    results.put((rows, open_ms, timings[0], np.median(timings[1:]), current_rss() - rss))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=100)
+    args = parser.parse_args()
+
+    frame = tiled(args.copies)
+    first, last = frame["dateday"].iloc[0].year, frame["dateday"].iloc[-1].year
+    print(f"{len(frame):,} hourly rows, {first}-{last}")
+    context = multiprocessing.get_context("fork")
+    with tempfile.TemporaryDirectory() as workdir:
+        full_dir, root = os.path.join(workdir, "full"), os.path.join(workdir, "parts")
+        columnar_cache.write_columns(frame, full_dir)
+        write_partitions(frame, root)
+        del frame
+
+        for label, start, end in (("one month", date(2012, 3, 1), date(2012, 3, 31)),
+                                  ("one year", date(2012, 1, 1), date(2012, 12, 31))):
+            print(label)
+            for name, opener, query in (("dt.date mask", open_full, date_mask),
+                                        ("searchsorted", open_full, sorted_slice),
+                                        ("partitions", open_partitions, partitioned)):
+                results = context.Queue()
+                child = context.Process(target=measure, args=(opener, query, (full_dir, root), start, end, results))
+                child.start()
+                rows, open_ms, first_ms, warm_ms, rss = results.get()
+                child.join()
+                print(f"  {name:<13} open {open_ms:6.1f} ms  first {first_ms:7.1f} ms  warm {warm_ms:7.1f} ms"
+                      f"  +{rss / 2**20:5.1f} MB RSS  {rows:,} rows")
+
+
+if __name__ == "__main__":
+    main()
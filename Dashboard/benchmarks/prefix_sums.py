@@ -0,0 +1,112 @@
+"""Metric-card totals and moving averages: filtered view vs prefix sums.
+
+The daily view of all_data.csv is tiled ``--copies`` times back in time and
+every approach answers the same random (date range, day type, weather)
+queries:
+
+* view: `FilterIndex.view` and ``sum``/``mean`` of the gathered columns, as
+  the metric cards did before;
+* prefix sums: `PrefixSums.totals`, two rows subtracted per query;
+* rolling: ``rolling("7D")``/``rolling("30D")`` over the filtered days;
+* prefix windows: `PrefixSums.moving_average`.
+
+    python -m benchmarks.prefix_sums --copies 20
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import daily_view, load_all_data
+from filters import FilterIndex
+from prefix_sums import PrefixSums
+
+DAY_TYPES = (None, [1, 2, 3, 4, 5], [0, 6])
+WEATHER = (None, [1], [2], [3])
+
+
+def tiled(copies):
+    hourly, _ = load_all_data()
+    base = daily_view(hourly)
+    dates = base["date"].to_numpy()
+    span = (dates[-1] - dates[0]).astype("timedelta64[D]") + np.timedelta64(1, "D")
+    frames = [base.assign(date=dates - span * k) for k in range(copies, 0, -1)] + [base]
+    return pd.concat(frames, ignore_index=True)
+
+
+def queries(daily, count, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = daily["date"].to_numpy().astype("datetime64[D]")
+    for _ in range(count):
+        lo, hi = np.sort(rng.integers(0, len(dates), 2))
+        yield dates[lo], dates[hi], DAY_TYPES[rng.integers(len(DAY_TYPES))], WEATHER[rng.integers(len(WEATHER))]
+
+
+def view_totals(index, start, end, weekdays, weather):
+    view = index.view(start, end, weekday_day=weekdays, weathersit_day=weather)
+    return view["count_day"].sum(), view["count_day"].mean(), view["casual_day"].sum(), view["registered_day"].sum()
+
+
+def prefix_totals(prefix, start, end, weekdays, weather):
+    totals = prefix.totals(start, end, weekdays=weekdays, weather=weather)
+    mean = totals["count_day"] / totals["days"] if totals["days"] else float("nan")
+    return totals["count_day"], mean, totals["casual_day"], totals["registered_day"]
+
+
+def rolling(index, start, end, weekdays, weather):
+    # The trailing windows reach back before `start`, so the whole filtered history is rolled
+    positions = index.positions(index.dates[0], end, weekday_day=weekdays, weathersit_day=weather)
+    series = pd.Series(index.frame["count_day"].to_numpy()[positions].astype(np.float64),
+                       index=pd.DatetimeIndex(index.dates[positions]))
+    frame = pd.DataFrame({f"ma{w}": series.rolling(f"{w}D").mean() for w in (7, 30)})
+    return frame[frame.index >= pd.Timestamp(start)]
+
+
+def prefix_windows(prefix, start, end, weekdays, weather):
+    return prefix.moving_average(start, end, weekdays=weekdays, weather=weather)
+
+
+def timed(function, handle, cases):
+    timings, results = [], []
+    for case in cases:
+        started = time.perf_counter()
+        results.append(function(handle, *case))
+        timings.append((time.perf_counter() - started) * 1000)
+    return results, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    daily = tiled(args.copies)
+    started = time.perf_counter()
+    index = FilterIndex(daily)
+    index_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    prefix = PrefixSums(daily)
+    prefix_ms = (time.perf_counter() - started) * 1000
+    print(f"{len(daily):,} days; build: filter index {index_ms:.1f} ms, prefix sums {prefix_ms:.1f} ms "
+          f"({prefix.nbytes / 2**20:.1f} MB)")
+
+    cases = list(queries(daily, args.queries))
+    for label, pairs in (("metric cards", (("view", view_totals, index), ("prefix sums", prefix_totals, prefix))),
+                         ("moving averages", (("rolling", rolling, index), ("prefix windows", prefix_windows, prefix)))):
+        print(label)
+        answers = []
+        for name, function, handle in pairs:
+            results, timings = timed(function, handle, cases)
+            answers.append(results)
+            print(f"  {name:<15} p50 {np.median(timings):8.3f} ms  p95 {np.percentile(timings, 95):8.3f} ms")
+        if label == "metric cards":
+            same = all(np.allclose(a, b, equal_nan=True) for a, b in zip(*answers))
+        else:
+            same = all(np.allclose(a.to_numpy(), b[["ma7", "ma30"]].to_numpy()) for a, b in zip(*answers))
+        print(f"  same answers: {same}")
+
+
+if __name__ == "__main__":
+    main()
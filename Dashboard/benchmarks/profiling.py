@@ -0,0 +1,40 @@
+"""Cost of the profiling instrumentation with the panel off and on.
+
+Times ``--stages`` stage blocks per simulated rerun (about what one
+dashboard run opens) with an empty body, so only the instrumentation is
+measured: `Profiler.stage` returning the shared no-op while off, and the
+clock and /proc reads of a recorded stage while on.
+
+    python -m benchmarks.profiling --reruns 20000
+"""
+import argparse
+import time
+
+from profiling import Profiler
+
+
+def rerun(profiler, enabled, stages):
+    profiler.begin("skrip", enabled)
+    for _ in range(stages):
+        with profiler.stage("agregasi") as stage:
+            stage.rows = 1
+    profiler.end()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=20000)
+    parser.add_argument("--stages", type=int, default=12)
+    args = parser.parse_args()
+
+    for label, enabled in (("off", False), ("on", True)):
+        profiler = Profiler()
+        started = time.perf_counter()
+        for _ in range(args.reruns):
+            rerun(profiler, enabled, args.stages)
+        per_rerun = (time.perf_counter() - started) / args.reruns
+        print(f"  panel {label:<4} {per_rerun * 1e6:8.2f} us per rerun  {per_rerun / args.stages * 1e9:8.0f} ns per stage")
+
+
+if __name__ == "__main__":
+    main()
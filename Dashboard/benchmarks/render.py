@@ -0,0 +1,98 @@
+"""p50/p95 chart times: matplotlib/seaborn rendering vs the light chart mode.
+
+For each chart type the server-side work is timed three ways: a seaborn
+figure rasterized to PNG (render cache miss), the same key served from
+`RenderCache` (hit) and the light mode's summary data plus Vega-Lite spec
+serialized to JSON (what the browser receives).
+
+    python -m benchmarks.render --repeat 20
+"""
+import argparse
+import json
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import seaborn as sns
+
+import light_charts
+from data_loader import daily_view, load_all_data
+from render_cache import RenderCache
+from tab_data import user_type_frame, weather_plot_frame
+
+
+def seaborn_charts(weather, users, casual):
+    def figure(draw):
+        def make():
+            fig, ax = plt.subplots(figsize=(10, 6))
+            draw(ax)
+            return fig
+        return make
+
+    return {
+        "box": figure(lambda ax: sns.boxplot(x="Kondisi Cuaca", y="Jumlah Peminjaman", data=weather, ax=ax)),
+        "violin": figure(lambda ax: sns.violinplot(x="Tipe Pengguna", y="Jumlah Peminjaman", data=users, ax=ax)),
+        "strip": figure(lambda ax: sns.stripplot(x="Tipe Pengguna", y="Jumlah Peminjaman", data=users, ax=ax, alpha=0.5)),
+        "histogram": figure(lambda ax: sns.histplot(casual, kde=True, ax=ax)),
+        "kde": figure(lambda ax: sns.kdeplot(casual, fill=True, ax=ax)),
+    }
+
+
+def light_payloads(weather, users, casual):
+    return {
+        "box": lambda: (light_charts.box_stats(weather, "Kondisi Cuaca", "Jumlah Peminjaman"),
+                        light_charts.box_spec("Kondisi Cuaca", "", "")),
+        "violin": lambda: (light_charts.density_by_group(users, "Tipe Pengguna", "Jumlah Peminjaman"), {}),
+        "strip": lambda: (light_charts.strip_sample(users, "Tipe Pengguna"), {}),
+        "histogram": lambda: (light_charts.histogram(casual), {}),
+        "kde": lambda: (light_charts.kde_grid(casual)[1], {}),
+    }
+
+
+def serialize(payload):
+    data, spec = payload
+    if hasattr(data, "to_json"):
+        return data.to_json(orient="records") + json.dumps(spec)
+    return json.dumps(np.asarray(data).tolist()) + json.dumps(spec)
+
+
+def percentiles(samples):
+    p50, p95 = np.percentile(samples, [50, 95]) * 1000
+    return f"p50 {p50:8.2f} ms  p95 {p95:8.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    hourly, _ = load_all_data()
+    daily = daily_view(hourly)
+    weather = weather_plot_frame(daily)
+    users = user_type_frame(daily)
+    casual = daily["casual_day"]
+
+    drawers = seaborn_charts(weather, users, casual)
+    payloads = light_payloads(weather, users, casual)
+    for name in drawers:
+        miss, hit, light = [], [], []
+        for i in range(args.repeat):
+            cache = RenderCache()
+            start = time.perf_counter()
+            cache.render((name, i), drawers[name])
+            miss.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            cache.render((name, i), drawers[name])
+            hit.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            serialize(payloads[name]())
+            light.append(time.perf_counter() - start)
+        print(f"{name:<10} matplotlib {percentiles(miss)} | cached {percentiles(hit)} | light {percentiles(light)}")
+    print(f"open figures after run: {len(plt.get_fignums())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""End-to-end benchmark suite on synthetic data, with JSON results.
+
+For each ``--scales`` factor a synthetic hour.csv/day.csv pair is generated
+(`benchmarks.synthetic`) in a temporary directory and every pipeline stage
+is timed ``--repeat`` times in a forked child, from the raw CSVs to a
+rendered figure:
+
+* load: typed ``read_csv`` of hour.csv and day.csv;
+* clean: the notebook's rename/date/label cleaning (`pipeline.clean`);
+* merge: the streaming join into all_data.csv (`pipeline.write_csv`);
+* load all_data: typed read; the columnar cache's first build (full hash,
+  typed read and column files, into a fresh directory each run), its digest
+  check (size and mtime against the memo) and a warm memory-mapped load;
+  then the daily view;
+* filter: bitmap index build, one sidebar filter query, prefix-sum totals;
+* aggregate: cube build and the per-tab summaries, tab frames, hourly
+  drill-down;
+* render: a seaborn figure rasterized to PNG and the light chart payloads.
+
+Results (median and every run in seconds, RSS growth of the first run) go
+to ``--output`` as JSON; ``--compare`` reads an earlier file and flags
+stages that got slower by more than ``--threshold``, exiting with status 1
+if any did. Scales the generator cannot date (above
+`synthetic.MAX_SCALE`) are skipped with a message and listed under
+``skipped``. A scale whose child raises, dies or runs past ``--timeout``
+seconds is reported as failed, and the suite exits with status 2.
+
+    python -m benchmarks.suite --scales 1 10 100 --output bench.json
+    python -m benchmarks.suite --scales 1 10 100 --compare bench.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic
+from data_loader import current_rss
+
+
+def stages(workdir, seed):
+    """``(name, function)`` pairs in pipeline order; later stages reuse earlier results."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    import columnar_cache
+    import light_charts
+    import pipeline
+    from cube import AggregateCube
+    from data_loader import daily_view, load_all_data, read_all_data, read_day_csv, read_hour_csv
+    from filters import FilterIndex
+    from hourly import HourlyDrilldown
+    from prefix_sums import PrefixSums
+    from render_cache import RenderCache
+    from tab_data import user_type_frame, weather_plot_frame
+
+    hour_path, day_path = os.path.join(workdir, "hour.csv"), os.path.join(workdir, "day.csv")
+    data_path, cache_dir = os.path.join(workdir, "all_data.csv"), os.path.join(workdir, ".cache")
+    state = {}
+    rng = np.random.default_rng(seed)
+
+    def query():
+        # A random date range with one day-type and weather selection, like a sidebar change
+        dates = state["daily"]["date"].to_numpy().astype("datetime64[D]")
+        lo, hi = np.sort(rng.integers(0, len(dates), 2))
+        return dates[lo], dates[hi], [[1, 2, 3, 4, 5], [0, 6], None][rng.integers(3)], [[1], [2], None][rng.integers(3)]
+
+    def load():
+        state["hour"], state["day"] = read_hour_csv(hour_path), read_day_csv(day_path)
+
+    def clean():
+        pipeline.clean(state["hour"]), pipeline.clean(state["day"])
+
+    def merge():
+        pipeline.write_csv(data_path, hour_path, day_path)
+
+    def read_typed():
+        read_all_data(data_path)
+
+    def cache_build():
+        state["builds"] = state.get("builds", 0) + 1
+        state["cache_dir"] = os.path.join(cache_dir, str(state["builds"]))
+        columnar_cache.load(data_path, read_all_data, state["cache_dir"])
+
+    def digest_check():
+        columnar_cache.source_digest(data_path, state["cache_dir"])
+
+    def read_cached():
+        state["hourly"], _ = load_all_data(data_path, cache_dir=state["cache_dir"])
+
+    def daily():
+        state["daily"] = daily_view(state["hourly"])
+
+    def filter_build():
+        state["index"] = FilterIndex(state["daily"])
+        state["prefix"] = PrefixSums(state["daily"])
+
+    def filter_query():
+        start, end, weekdays, weather = query()
+        view = state["index"].view(start, end, weekday_day=weekdays, weathersit_day=weather)
+        view["count_day"].sum(), view["casual_day"].sum(), view["registered_day"].sum()
+
+    def prefix_totals():
+        start, end, weekdays, weather = query()
+        state["prefix"].totals(start, end, weekdays=weekdays, weather=weather)
+
+    def cube_build():
+        state["cube"] = AggregateCube(state["daily"])
+
+    def tab_aggregation():
+        start, end, weekdays, weather = query()
+        for by in ("weathersit", "season", "month", "weekday"):
+            state["cube"].summary(start, end, "count_day", by=by, weekdays=weekdays, weather=weather)
+        view = state["index"].view(start, end, weekday_day=weekdays, weathersit_day=weather)
+        state["weather_plot"] = weather_plot_frame(view.restrict("weekday_day", [0, 6]))
+        state["users"] = user_type_frame(view.restrict("weekday_day", [1, 2, 3, 4, 5]))
+
+    def drilldown():
+        start, end, weekdays, _ = query()
+        drill = HourlyDrilldown(state["hourly"])
+        drill.mean_grid(start, end), drill.peak_hours(start, end, weekdays=weekdays)
+
+    def render_matplotlib():
+        def draw():
+            fig, ax = plt.subplots(figsize=(10, 6))
+            sns.boxplot(x="Kondisi Cuaca", y="Jumlah Peminjaman", data=state["weather_plot"], ax=ax)
+            return fig
+
+        # A fresh cache every run, so each run is a miss
+        RenderCache().render("weather", draw)
+
+    def render_light():
+        light_charts.box_stats(state["weather_plot"], "Kondisi Cuaca", "Jumlah Peminjaman")
+        light_charts.density_by_group(state["users"], "Tipe Pengguna", "Jumlah Peminjaman")
+        light_charts.histogram(state["daily"]["casual_day"].to_numpy())
+
+    return [
+        ("load", load), ("clean", clean), ("merge", merge),
+        ("load all_data (typed csv)", read_typed), ("columnar cache build", cache_build),
+        ("columnar cache digest check", digest_check), ("columnar cache load (warm)", read_cached),
+        ("daily view", daily),
+        ("filter index build", filter_build), ("filter query", filter_query), ("prefix-sum totals", prefix_totals),
+        ("cube build", cube_build), ("tab aggregation", tab_aggregation), ("hourly drill-down", drilldown),
+        ("render matplotlib", render_matplotlib), ("render light", render_light),
+    ]
+
+
+def run_scale(scale, repeat, seed, results):
+    """Put the report of one scale on `results`, or ``{"scale", "error"}`` if a stage raised."""
+    try:
+        results.put(_run_scale(scale, repeat, seed))
+    except Exception:
+        results.put({"scale": scale, "error": traceback.format_exc()})
+
+
+def _run_scale(scale, repeat, seed):
+    with tempfile.TemporaryDirectory() as workdir:
+        started = time.perf_counter()
+        hour_rows, day_rows = synthetic.write(scale, workdir, seed)
+        generate = time.perf_counter() - started
+        report = {
+            "scale": scale, "hour_rows": hour_rows, "day_rows": day_rows,
+            "stages": {"generate": {"median": generate, "runs": [generate], "rss_mb": None}},
+        }
+        for name, function in stages(workdir, seed):
+            runs, rss = [], current_rss()
+            for attempt in range(repeat):
+                started = time.perf_counter()
+                function()
+                runs.append(time.perf_counter() - started)
+                if attempt == 0:
+                    rss = current_rss() - rss
+            report["stages"][name] = {"median": float(np.median(runs)), "runs": runs, "rss_mb": rss / 2**20}
+        return report
+
+
+def collect(child, results, timeout, poll=1.0):
+    """The report `child` puts on `results`, or ``{"scale", "error"}`` if it exits without one or times out."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return results.get(timeout=poll)
+        except queue.Empty:
+            pass
+        if not child.is_alive():
+            try:
+                # The report may have been flushed just before the child exited
+                return results.get(timeout=poll)
+            except queue.Empty:
+                return {"error": f"child exited with code {child.exitcode} without a report"}
+        if time.monotonic() > deadline:
+            child.terminate()
+            return {"error": f"no report after {timeout:g} s; child terminated"}
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import matplotlib
+    import seaborn
+
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "matplotlib": matplotlib.__version__,
+        "seaborn": seaborn.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(previous, current, threshold):
+    """Print median changes per (scale, stage); returns the stages slower than `threshold`."""
+    before = {
+        (scale["scale"], name): stage["median"]
+        for scale in previous["scales"] for name, stage in scale["stages"].items()
+    }
+    slower = []
+    print(f"compared with {previous['environment'].get('commit')} ({previous['created']})")
+    for scale in current["scales"]:
+        for name, stage in scale["stages"].items():
+            old = before.get((scale["scale"], name))
+            if old is None:
+                continue
+            ratio = stage["median"] / old if old else float("inf")
+            # Sub-millisecond stages are too noisy to flag
+            flag = ratio > threshold and stage["median"] > 1e-3
+            if flag:
+                slower.append((scale["scale"], name))
+            print(f"  {scale['scale']:>6g}x {name:<32} {old * 1000:10.2f} -> {stage['median'] * 1000:10.2f} ms"
+                  f"  x{ratio:5.2f}{'  SLOWER' if flag else ''}")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--compare", help="earlier JSON results to compare the medians with")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    parser.add_argument("--timeout", type=float, default=3600.0, help="seconds allowed per scale")
+    args = parser.parse_args()
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "scales": [],
+        "skipped": [],
+        "failed": [],
+    }
+    context = multiprocessing.get_context("fork")
+    for scale in args.scales:
+        try:
+            synthetic.days_for(scale)
+        except ValueError as error:
+            print(f"{scale:g}x: skipped, {error}")
+            report["skipped"].append({"scale": scale, "reason": str(error)})
+            continue
+        results = context.Queue()
+        child = context.Process(target=run_scale, args=(scale, args.repeat, args.seed, results))
+        child.start()
+        result = collect(child, results, args.timeout)
+        child.join()
+        if "error" in result:
+            print(f"{scale:g}x: FAILED\n{result['error']}", file=sys.stderr)
+            report["failed"].append({"scale": scale, "error": result["error"]})
+            continue
+        report["scales"].append(result)
+        print(f"{scale:g}x: {result['hour_rows']:,} hourly rows, {result['day_rows']:,} days")
+        for name, stage in result["stages"].items():
+            rss = "" if stage["rss_mb"] is None else f"  +{stage['rss_mb']:7.1f} MB RSS"
+            print(f"  {name:<32} {stage['median'] * 1000:10.2f} ms{rss}")
+
+    if args.output:
+        with open(args.output, "w") as target:
+            json.dump(report, target, indent=2)
+    if report["failed"]:
+        failed = ", ".join(f"{item['scale']:g}x" for item in report["failed"])
+        print(f"failed scales: {failed}", file=sys.stderr)
+    if args.compare:
+        with open(args.compare) as source:
+            slower = compare(json.load(source), report, args.threshold)
+        if slower:
+            sys.exit(1)
+    if report["failed"]:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
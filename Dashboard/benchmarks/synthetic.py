@@ -0,0 +1,221 @@
+"""Synthetic Dataset/hour.csv and day.csv at any multiple of the shipped size.
+
+The generator is fitted to the shipped files and then samples day by day:
+
+* calendar: season per (month, day) as in the shipped day.csv, holidays on
+  the shipped dates of the year with the same parity, weekday and
+  workingday from the date;
+* weather: a Markov chain over the daily weathersit with the shipped
+  transition frequencies; each hour's weathersit is drawn from its
+  distribution given the day's;
+* temperature: the shipped monthly mean plus an AR(1) daily anomaly and the
+  mean diurnal profile; atemp follows temp linearly, humidity and wind
+  speed are drawn around their monthly means;
+* counts: casual and registered per hour are gamma-Poisson draws around
+  the shipped mean for (workingday, hour), scaled by month and by hourly
+  weather, so the hour-of-day and weekday/weekend shapes hold at any
+  scale;
+* missing hours are dropped with the shipped per-hour missing rate.
+
+``--scale k`` writes ``731 * k`` days ending 2012-12-31, or starting in 1678
+when that would reach before pandas' nanosecond timestamps. The pipeline
+parses every date to ``datetime64[ns]``, which spans 1678-2262, so
+`MAX_SCALE` (about 292x) is the most that fits; larger scales raise
+ValueError, and the benchmark suite skips them.
+
+    python -m benchmarks.synthetic --scale 10 --output-dir /tmp/bike10
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DAY_PATH, HOUR_PATH
+
+DAYS = 731
+FIRST_DAY = np.datetime64("1678-01-01")
+LAST_DAY = np.datetime64("2262-04-01")
+SHIPPED_END = np.datetime64("2012-12-31")
+MAX_SCALE = int((LAST_DAY - FIRST_DAY).astype(np.int64)) / DAYS
+HOUR_COLUMNS = ["instant", "dteday", "season", "yr", "mnth", "hr", "holiday", "weekday", "workingday",
+                "weathersit", "temp", "atemp", "hum", "windspeed", "casual", "registered", "cnt"]
+DAY_COLUMNS = [column for column in HOUR_COLUMNS if column != "hr"]
+
+
+class Model:
+    """Statistics of the shipped hour.csv/day.csv that the generator samples from."""
+
+    def __init__(self, hour_path=HOUR_PATH, day_path=DAY_PATH):
+        hour, day = pd.read_csv(hour_path), pd.read_csv(day_path)
+        dates = pd.to_datetime(day["dteday"])
+        self.season = np.zeros((13, 32), dtype=np.int8)
+        self.season[dates.dt.month, dates.dt.day] = day["season"].to_numpy()
+        self.holidays = {
+            year % 2: set(zip(dates.dt.month[(day["holiday"] == 1) & (dates.dt.year == year)],
+                              dates.dt.day[(day["holiday"] == 1) & (dates.dt.year == year)]))
+            for year in dates.dt.year.unique()
+        }
+
+        # Daily weather chain (codes 1-3) and hourly weather given the day's
+        weather = day["weathersit"].to_numpy()
+        self.transitions = pd.crosstab(weather[:-1], weather[1:], normalize="index").reindex(
+            index=[1, 2, 3], columns=[1, 2, 3], fill_value=0.0).to_numpy()
+        joined = hour.merge(day[["dteday", "weathersit", "temp"]], on="dteday", suffixes=("", "_daily"))
+        self.hour_weather = pd.crosstab(joined["weathersit_daily"], joined["weathersit"], normalize="index").reindex(
+            index=[1, 2, 3], columns=[1, 2, 3, 4], fill_value=0.0).to_numpy()
+
+        # Temperature: monthly mean, AR(1) anomaly, diurnal profile and hourly noise
+        self.temp_mean = day.groupby("mnth")["temp"].mean().reindex(range(13)).to_numpy()
+        anomaly = day["temp"].to_numpy() - self.temp_mean[day["mnth"]]
+        self.temp_phi = float(np.corrcoef(anomaly[:-1], anomaly[1:])[0, 1])
+        self.temp_sigma = float(anomaly.std() * np.sqrt(1 - self.temp_phi**2))
+        offset = joined["temp"] - joined["temp_daily"]
+        self.diurnal = offset.groupby(joined["hr"]).mean().reindex(range(24)).to_numpy()
+        self.hour_temp_sigma = float((offset - self.diurnal[joined["hr"]]).std())
+        self.atemp_fit = np.polyfit(hour["temp"], hour["atemp"], 1)
+        self.atemp_sigma = float((hour["atemp"] - np.polyval(self.atemp_fit, hour["temp"])).std())
+        self.humidity = hour.groupby("mnth")["hum"].agg(["mean", "std"]).reindex(range(13)).to_numpy()
+        self.windspeed = np.sort(hour["windspeed"].to_numpy())
+
+        # Counts: mean per (workingday, hour), month and hourly weather factors
+        self.counts = {}
+        for user in ("casual", "registered"):
+            base = hour.groupby(["workingday", "hr"])[user].mean().unstack().to_numpy()
+            expected = base[hour["workingday"], hour["hr"]]
+            month = (hour[user] / expected).groupby(hour["mnth"]).mean().reindex(range(13)).to_numpy()
+            expected *= month[hour["mnth"]]
+            weather = (hour[user] / expected).groupby(hour["weathersit"]).mean().reindex(range(5), fill_value=0.0)
+            self.counts[user] = (base, month, weather.fillna(0.0).to_numpy())
+        self.missing = 1.0 - hour.groupby("hr").size().reindex(range(24)).to_numpy() / len(day)
+
+
+def days_for(scale):
+    """First date and number of days for `scale` times the shipped 731 days."""
+    days = int(round(DAYS * scale))
+    first = SHIPPED_END - (days - 1)
+    if first < FIRST_DAY:
+        first = FIRST_DAY
+    if first + days > LAST_DAY:
+        raise ValueError(f"scale {scale:g} needs {days:,} days; at most {MAX_SCALE:.0f}x fits in datetime64[ns]")
+    return first, days
+
+
+def _choice(rng, probabilities, rows):
+    """One draw per row of `probabilities` (rows of a transition matrix), 0-based."""
+    cumulative = np.cumsum(probabilities[rows], axis=1)
+    return (rng.random((len(rows), 1)) > cumulative).sum(axis=1)
+
+
+def generate(model, first, days, rng, state):
+    """hour.csv and day.csv frames for `days` days from `first`; `state` carries the chains across blocks."""
+    dates = first + np.arange(days)
+    index = pd.DatetimeIndex(dates)
+    month, day_of_month, year = index.month.to_numpy(), index.day.to_numpy(), index.year.to_numpy()
+    weekday = (index.dayofweek.to_numpy() + 1) % 7
+    labels = np.asarray(index.strftime("%Y-%m-%d"), dtype=object)
+    holiday = np.array([
+        (m, d) in model.holidays.get(y % 2, ()) for m, d, y in zip(month, day_of_month, year)
+    ], dtype=np.int8)
+    workingday = ((weekday >= 1) & (weekday <= 5) & (holiday == 0)).astype(np.int8)
+
+    weather = np.empty(days, dtype=np.int8)
+    anomaly = np.empty(days)
+    uniforms, noise = rng.random(days).tolist(), rng.normal(0.0, model.temp_sigma, days).tolist()
+    cumulative = np.cumsum(model.transitions, axis=1).tolist()
+    code, previous = state
+    for i in range(days):
+        code = min(sum(uniforms[i] > bound for bound in cumulative[code]), 2)
+        previous = model.temp_phi * previous + noise[i]
+        weather[i], anomaly[i] = code + 1, previous
+    state[:] = [code, previous]
+    daily_temp = model.temp_mean[month] + anomaly
+
+    # One row per (day, hour), minus the missing hours
+    hours = np.tile(np.arange(24, dtype=np.int8), days)
+    rows = np.repeat(np.arange(days), 24)
+    keep = rng.random(len(rows)) >= model.missing[hours]
+    hours, rows = hours[keep], rows[keep]
+    hour_weather = (_choice(rng, model.hour_weather, weather[rows] - 1) + 1).astype(np.int8)
+    temp = np.clip(daily_temp[rows] + model.diurnal[hours] + rng.normal(0.0, model.hour_temp_sigma, len(rows)), 0.02, 1.0)
+    atemp = np.clip(np.polyval(model.atemp_fit, temp) + rng.normal(0.0, model.atemp_sigma, len(rows)), 0.0, 1.0)
+    humidity = np.clip(rng.normal(model.humidity[month[rows], 0], model.humidity[month[rows], 1]), 0.0, 1.0)
+    windspeed = model.windspeed[rng.integers(0, len(model.windspeed), len(rows))]
+
+    hour = pd.DataFrame({
+        "dteday": labels[rows],
+        "season": model.season[month, day_of_month][rows],
+        # The shipped yr is 0/1 for 2011/2012; the cleaning step recomputes the year from the date
+        "yr": (year[rows] % 2 == 0).astype(np.int8),
+        "mnth": month[rows],
+        "hr": hours,
+        "holiday": holiday[rows],
+        "weekday": weekday[rows],
+        "workingday": workingday[rows],
+        "weathersit": hour_weather,
+        "temp": temp.round(2),
+        "atemp": atemp.round(4),
+        "hum": humidity.round(2),
+        "windspeed": windspeed,
+    })
+    for user, (base, month_factor, weather_factor) in model.counts.items():
+        mean = base[workingday[rows], hours] * month_factor[month[rows]] * weather_factor[hour_weather]
+        # Gamma-Poisson (negative binomial) draws with shape 4
+        hour[user] = rng.poisson(rng.gamma(4.0, mean / 4.0)).astype(np.int64)
+    hour["cnt"] = hour["casual"] + hour["registered"]
+
+    sums = hour.groupby(rows)[["casual", "registered", "cnt"]].sum()
+    means = hour.groupby(rows)[["temp", "atemp", "hum", "windspeed"]].mean().round(6)
+    present = sums.index.to_numpy()
+    day = pd.DataFrame({
+        "dteday": labels[present],
+        "season": model.season[month, day_of_month][present],
+        "yr": (year[present] % 2 == 0).astype(np.int8),
+        "mnth": month[present],
+        "holiday": holiday[present],
+        "weekday": weekday[present],
+        "workingday": workingday[present],
+        "weathersit": weather[present],
+    })
+    day = pd.concat([day, means.reset_index(drop=True), sums.reset_index(drop=True)], axis=1)
+    return hour, day
+
+
+def write(scale, output_dir, seed=0, block_days=20_000, model=None):
+    """Write hour.csv and day.csv for `scale` into `output_dir`; returns (hour rows, day rows)."""
+    model = model or Model()
+    first, days = days_for(scale)
+    rng = np.random.default_rng(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    state = [0, 0.0]
+    hour_rows = day_rows = 0
+    with open(os.path.join(output_dir, "hour.csv"), "w", newline="") as hour_file, \
+            open(os.path.join(output_dir, "day.csv"), "w", newline="") as day_file:
+        for start in range(0, days, block_days):
+            hour, day = generate(model, first + start, min(block_days, days - start), rng, state)
+            hour.insert(0, "instant", np.arange(hour_rows + 1, hour_rows + len(hour) + 1))
+            day.insert(0, "instant", np.arange(day_rows + 1, day_rows + len(day) + 1))
+            hour[HOUR_COLUMNS].to_csv(hour_file, header=start == 0, index=False)
+            day[DAY_COLUMNS].to_csv(day_file, header=start == 0, index=False)
+            hour_rows += len(hour)
+            day_rows += len(day)
+    return hour_rows, day_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=10)
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        days_for(args.scale)
+    except ValueError as error:
+        parser.error(str(error))
+    hour_rows, day_rows = write(args.scale, args.output_dir, args.seed)
+    print(f"{hour_rows:,} hourly rows, {day_rows:,} days -> {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
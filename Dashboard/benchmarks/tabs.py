@@ -0,0 +1,106 @@
+"""Per-rerun cost of building the tab plot data: legacy loops vs `tab_data`.
+
+Times each builder on the real rows and on a synthetic frame of the same
+shape. The legacy ``iterrows``/``apply`` paths are skipped above
+``--legacy-max-rows`` because they take minutes at 10M rows.
+
+    python -m benchmarks.tabs --rows 10000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import tab_data
+import transforms
+from data_loader import load_all_data
+
+WEATHER_LABELS = {1: "Cerah", 2: "Berawan", 3: "Hujan Ringan", 4: "Hujan Lebat"}
+
+
+def legacy_weather_plot(df):
+    plot_data = []
+    for i, row in df.iterrows():
+        weather_label = WEATHER_LABELS.get(row["weathersit_day"], f"Cuaca {row['weathersit_day']}")
+        plot_data.append({"Kondisi Cuaca": weather_label, "Jumlah Peminjaman": row["count_day"]})
+    return pd.DataFrame(plot_data)
+
+
+def legacy_season(df):
+    def get_season(month):
+        if month in [12, 1, 2]:
+            return "Musim Dingin"
+        elif month in [3, 4, 5]:
+            return "Musim Semi"
+        elif month in [6, 7, 8]:
+            return "Musim Panas"
+        else:
+            return "Musim Gugur"
+
+    return df["month_day"].apply(get_season)
+
+
+def legacy_user_type(df):
+    casual_data = df["casual_day"].tolist()
+    registered_data = df["registered_day"].tolist()
+    return pd.DataFrame({
+        "Tipe Pengguna": ["Casual"] * len(casual_data) + ["Registered"] * len(registered_data),
+        "Jumlah Peminjaman": casual_data + registered_data,
+    })
+
+
+def synthetic_daily(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    casual = rng.integers(0, 3500, rows, dtype=np.int16)
+    registered = rng.integers(0, 7000, rows, dtype=np.int16)
+    return pd.DataFrame({
+        "month_day": rng.integers(1, 13, rows, dtype=np.int8),
+        "weekday_day": rng.integers(0, 7, rows, dtype=np.int8),
+        "weathersit_day": rng.choice(np.array([1, 2, 3, 4], dtype=np.int8), rows, p=[0.63, 0.33, 0.035, 0.005]),
+        "casual_day": casual,
+        "registered_day": registered,
+        "count_day": (casual + registered).astype(np.int16),
+    })
+
+
+def timed(function, df):
+    start = time.perf_counter()
+    function(df)
+    return time.perf_counter() - start
+
+
+def run(label, df, legacy_max_rows):
+    cases = (
+        ("weather plot", legacy_weather_plot, tab_data.weather_plot_frame),
+        ("season labels", legacy_season, lambda frame: transforms.season_labels(frame["month_day"])),
+        ("user type", legacy_user_type, tab_data.user_type_frame),
+    )
+    print(f"{label} ({len(df):,} rows)")
+    for name, legacy, vectorized in cases:
+        new = timed(vectorized, df)
+        if len(df) <= legacy_max_rows:
+            old = timed(legacy, df)
+            print(f"  {name:<14} legacy {old * 1000:10.1f} ms  vectorized {new * 1000:8.1f} ms  x{old / new:,.0f}")
+        else:
+            print(f"  {name:<14} legacy {'skipped':>10}     vectorized {new * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--legacy-max-rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    hourly, _ = load_all_data()
+    # The real hourly rows carry the day-level columns the tabs read
+    real = hourly[["casual_day", "registered_day", "count_day", "weekday_day"]].assign(
+        month_day=hourly["month_day"].cat.codes + 1,
+        weathersit_day=hourly["weathersit_day"].cat.codes + 1,
+    )
+    run("all_data.csv", real, args.legacy_max_rows)
+    run("synthetic", synthetic_daily(args.rows), args.legacy_max_rows)
+
+
+if __name__ == "__main__":
+    main()
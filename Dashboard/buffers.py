@@ -0,0 +1,90 @@
+"""Append-only storage for the indexes that grow with every appended day.
+
+`AppendBuffer` keeps an array's rows in storage with spare capacity along
+one axis. Extending the longest buffer over a storage writes the new rows
+into the spare capacity, so appending k rows costs O(k) amortised instead of
+a copy of the whole history; the storage doubles when it is full. Each
+buffer only exposes its own prefix, which later extensions never change, so
+an older buffer (held by a rerun still reading the previous dataset
+version) stays valid. Extending any other buffer over the storage copies
+it first.
+
+`FrameBuffer` does the same for a DataFrame of plain NumPy columns: its
+`frame` wraps one buffer view per column without copying.
+"""
+import numpy as np
+import pandas as pd
+
+
+class AppendBuffer:
+    def __init__(self, values, axis=0, capacity=None):
+        values = np.asarray(values)
+        self.axis = axis
+        size = values.shape[axis]
+        shape = list(values.shape)
+        shape[axis] = max(capacity or 0, 2 * size, 16)
+        self._storage = np.empty(shape, dtype=values.dtype)
+        # Rows written to the storage so far, shared by every buffer over it
+        self._written = [size]
+        self._size = size
+        self._storage[self._index(0, size)] = values
+
+    def _index(self, start, stop):
+        return (slice(None),) * self.axis + (slice(start, stop),)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def values(self):
+        """The buffer's rows, a read-only view into the storage."""
+        view = self._storage[self._index(0, self._size)]
+        view.flags.writeable = False
+        return view
+
+    def extend(self, values, keep=None):
+        """A buffer holding the first `keep` rows (default: all) followed by `values`.
+
+        Rows from `keep` on are overwritten in place, so they must read the
+        same wherever this buffer's earlier views look (e.g. padding bits a
+        reader never unpacks); otherwise leave `keep` unset.
+        """
+        values = np.asarray(values, dtype=self._storage.dtype)
+        keep = self._size if keep is None else keep
+        size = keep + values.shape[self.axis]
+        capacity = self._storage.shape[self.axis]
+        grown = object.__new__(AppendBuffer)
+        grown.axis = self.axis
+        grown._size = size
+        if self._written[0] == self._size and size <= capacity:
+            grown._storage, grown._written = self._storage, self._written
+        else:
+            shape = list(self._storage.shape)
+            shape[self.axis] = max(2 * size, 16)
+            grown._storage = np.empty(shape, dtype=self._storage.dtype)
+            grown._storage[self._index(0, keep)] = self._storage[self._index(0, keep)]
+            grown._written = [keep]
+        grown._storage[self._index(keep, size)] = values
+        grown._written[0] = size
+        return grown
+
+
+class FrameBuffer:
+    def __init__(self, frame):
+        self.columns = list(frame.columns)
+        self._buffers = {column: AppendBuffer(frame[column].to_numpy()) for column in self.columns}
+
+    def __len__(self):
+        return len(self._buffers[self.columns[0]]) if self.columns else 0
+
+    def extend(self, frame):
+        """A buffer with the rows of `frame` (same columns) appended."""
+        grown = object.__new__(FrameBuffer)
+        grown.columns = self.columns
+        grown._buffers = {column: self._buffers[column].extend(frame[column].to_numpy()) for column in self.columns}
+        return grown
+
+    @property
+    def frame(self):
+        # copy=False keeps one block per column, each a view of its buffer
+        return pd.DataFrame({column: self._buffers[column].values for column in self.columns}, copy=False)
@@ -0,0 +1,303 @@
+"""Binary columnar cache for the CSV datasets.
+
+Each source CSV is parsed once into a directory of raw column files (one per
+column) keyed by the SHA-256 of the source file. Later loads memory-map the
+columns read-only, so several Streamlit worker processes share the same
+page-cache copy of the data instead of each holding a private parsed frame.
+
+Rows appended to a source CSV can be appended to its cache as well
+(`append`); the cache is then re-keyed to the new digest and its manifest
+records the digests it grew from, so readers holding derived state for an
+older version know they only need to process the new rows.
+
+A digest names one version of a source file. A file first seen is hashed in
+full; a version produced by `append` gets the hash of its parent's digest
+followed by only the appended bytes, so an append costs time proportional
+to the new rows rather than to the file. Either digest changes with the
+content; a file rewritten behind the cache's back is simply hashed in full
+again, which keys it to a fresh cache.
+
+Build every cache up front with::
+
+    python columnar_cache.py
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+MANIFEST = "manifest.json"
+
+
+def file_digest(path, chunk_size=1 << 20):
+    sha = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def source_digest(path, cache_dir=CACHE_DIR):
+    """Hash of `path`, rehashing only when its size or mtime changed."""
+    stat = os.stat(path)
+    memo_path = os.path.join(cache_dir, os.path.basename(path) + ".digest.json")
+    try:
+        with open(memo_path) as memo_file:
+            memo = json.load(memo_file)
+        if memo["size"] == stat.st_size and memo["mtime_ns"] == stat.st_mtime_ns:
+            return memo["sha256"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    digest = file_digest(path)
+    _remember(path, stat, digest, cache_dir)
+    return digest
+
+
+def chained_digest(path, parent, offset, chunk_size=1 << 20):
+    """Digest of `path` after bytes were appended at `offset` to the version `parent`."""
+    sha = hashlib.sha256(parent.encode("ascii"))
+    with open(path, "rb") as source:
+        source.seek(offset)
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _remember(path, stat, digest, cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    memo_path = os.path.join(cache_dir, os.path.basename(path) + ".digest.json")
+    tmp = memo_path + ".tmp"
+    with open(tmp, "w") as memo_file:
+        json.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}, memo_file)
+    os.replace(tmp, memo_path)
+
+
+def cache_path(path, digest, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"{os.path.basename(path)}-{digest[:16]}")
+
+
+def write_columns(df, target):
+    """Write every column of `df` to `target` plus a JSON manifest."""
+    writer = ColumnWriter(target)
+    writer.append(df)
+    return writer.close()
+
+
+def read_manifest(target):
+    with open(os.path.join(target, MANIFEST)) as manifest:
+        return json.load(manifest)
+
+
+def read_columns(target, columns=None):
+    """Memory-map a directory written by `write_columns` or `ColumnWriter` as a DataFrame.
+
+    `columns` restricts which columns are mapped (default: all).
+    """
+    meta = read_manifest(target)
+    data = {}
+    for entry in meta["columns"]:
+        if columns is not None and entry["name"] not in columns:
+            continue
+        path = os.path.join(target, entry["file"])
+        if "dtype" in entry:
+            # Raw little-endian column
+            dtype = np.dtype(entry["dtype"])
+            values = np.memmap(path, dtype=dtype, mode="r", shape=(meta["rows"],)) if meta["rows"] else np.zeros(0, dtype)
+        else:
+            # Caches written before the raw format hold one .npy file per column
+            values = np.load(path, mmap_mode="r", allow_pickle=False)
+        if "categories" in entry:
+            dtype = pd.CategoricalDtype(entry["categories"], ordered=entry["ordered"])
+            values = pd.Categorical.from_codes(values, dtype=dtype)
+        data[entry["name"]] = values
+    # copy=False keeps one block per column, each backed by its memory map
+    return pd.DataFrame(data, copy=False)
+
+
+def read_ranges(ranges, columns=None):
+    """Concatenate row ranges of several raw-format directories into one DataFrame.
+
+    `ranges` lists ``(target, start, stop)``; only the bytes of rows
+    [start, stop) are read from each column file. All directories must
+    share the same columns and categories.
+    """
+    pieces, entries = {}, None
+    for target, start, stop in ranges:
+        meta = read_manifest(target)
+        if entries is None:
+            entries = [entry for entry in meta["columns"] if columns is None or entry["name"] in columns]
+        by_name = {entry["name"]: entry for entry in meta["columns"]}
+        for entry in entries:
+            stored = by_name[entry["name"]]
+            if stored.get("categories") != entry.get("categories") or "dtype" not in stored:
+                raise ValueError(f"{target}: column {entry['name']} does not match the first directory")
+            dtype = np.dtype(stored["dtype"])
+            values = np.fromfile(
+                os.path.join(target, stored["file"]), dtype=dtype, count=stop - start, offset=start * dtype.itemsize
+            )
+            pieces.setdefault(entry["name"], []).append(values)
+    data = {}
+    for entry in entries or []:
+        values = np.concatenate(pieces[entry["name"]])
+        if "categories" in entry:
+            values = pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(entry["categories"], ordered=entry["ordered"]))
+        data[entry["name"]] = values
+    return pd.DataFrame(data, copy=False)
+
+
+class ColumnWriter:
+    """Append DataFrame chunks to a cache directory one column file at a time.
+
+    Columns are written as raw little-endian arrays so that each chunk is a
+    plain append; the manifest (row count, dtypes, categories) is written on
+    `close`, which also publishes the directory. Categorical columns are
+    stored as codes of the categories seen in the first chunk.
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.tmp = target + ".tmp"
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        os.makedirs(self.tmp)
+        self.rows = 0
+        self.columns = None
+
+    def append(self, df):
+        if self.columns is None:
+            self.columns = []
+            for i, name in enumerate(df.columns):
+                entry = {"name": name, "file": f"{i:03d}.bin"}
+                dtype = df[name].dtype
+                if isinstance(dtype, pd.CategoricalDtype):
+                    entry["categories"] = dtype.categories.tolist()
+                    entry["ordered"] = bool(dtype.ordered)
+                    dtype = df[name].cat.codes.dtype
+                entry["dtype"] = np.dtype(dtype).newbyteorder("<").str
+                self.columns.append(entry)
+        _append_rows(self.tmp, self.columns, self.rows, df)
+        self.rows += len(df)
+
+    def close(self):
+        with open(os.path.join(self.tmp, MANIFEST), "w") as manifest:
+            json.dump({"rows": self.rows, "columns": self.columns or []}, manifest)
+        shutil.rmtree(self.target, ignore_errors=True)
+        os.replace(self.tmp, self.target)
+        return self.target
+
+
+def _append_rows(directory, columns, rows, df):
+    """Write `df` after the first `rows` rows of each column file in `directory`."""
+    encoded = []
+    for entry in columns:
+        series = df[entry["name"]]
+        if "categories" in entry:
+            values = pd.Categorical(series, categories=entry["categories"], ordered=entry["ordered"]).codes
+            if ((values < 0) & series.notna().to_numpy()).any():
+                raise ValueError(f"{entry['name']}: value outside the stored categories")
+        else:
+            values = series.to_numpy()
+        encoded.append(np.ascontiguousarray(values, dtype=entry["dtype"]))
+    # Encode everything before writing, and write at the manifest's row count,
+    # so a failed append never leaves stray bytes behind the committed rows
+    for entry, values in zip(columns, encoded):
+        with open(os.path.join(directory, entry["file"]), "ab") as column_file:
+            column_file.truncate(rows * values.itemsize)
+            column_file.write(values.tobytes())
+
+
+def append_columns(target, df, parent=None, at=None):
+    """Append the rows of `df` to a published raw-format directory in place.
+
+    The column files grow first and the manifest is replaced last, so a
+    reader that already mapped the directory keeps seeing the old row count.
+    `parent` is recorded in the manifest's ``parents`` list. `at` writes
+    after that many rows instead of the manifest's count, dropping any rows
+    stored past it.
+    """
+    meta = read_manifest(target)
+    if [entry["name"] for entry in meta["columns"]] != list(df.columns):
+        raise ValueError("appended columns do not match the stored columns")
+    if any("dtype" not in entry for entry in meta["columns"]):
+        raise ValueError(f"{target} is an .npy cache and cannot be appended to")
+    rows = meta["rows"] if at is None else at
+    if rows > meta["rows"]:
+        raise ValueError(f"{target} holds {meta['rows']} rows, cannot append after row {rows}")
+    _append_rows(target, meta["columns"], rows, df)
+    meta["rows"] = rows + len(df)
+    if parent is not None:
+        meta["parents"] = meta.get("parents", []) + [parent]
+    tmp = os.path.join(target, MANIFEST + ".tmp")
+    with open(tmp, "w") as manifest:
+        json.dump(meta, manifest)
+    os.replace(tmp, os.path.join(target, MANIFEST))
+    return meta
+
+
+def build(path, read, cache_dir=CACHE_DIR):
+    """Parse `path` with `read` and store it; stale caches of the same file are removed."""
+    digest = source_digest(path, cache_dir)
+    target = cache_path(path, digest, cache_dir)
+    write_columns(read(path), target)
+
+    prefix = os.path.basename(path) + "-"
+    for name in os.listdir(cache_dir):
+        stale = os.path.join(cache_dir, name)
+        if name.startswith(prefix) and stale != target and os.path.isdir(stale):
+            shutil.rmtree(stale, ignore_errors=True)
+    return target
+
+
+def load(path, read, cache_dir=CACHE_DIR):
+    """Return `path` as a memory-mapped frame, building the cache on first use."""
+    target = cache_path(path, source_digest(path, cache_dir), cache_dir)
+    if not os.path.exists(os.path.join(target, MANIFEST)):
+        build(path, read, cache_dir)
+    return read_columns(target)
+
+
+def lineage(path, cache_dir=CACHE_DIR):
+    """``(digest, rows, parents)`` of the cache for `path`.
+
+    `parents` lists the digests of earlier versions of `path` that the
+    current one was produced from by appending rows, oldest first.
+    """
+    digest = source_digest(path, cache_dir)
+    meta = read_manifest(cache_path(path, digest, cache_dir))
+    return digest, meta["rows"], meta.get("parents", [])
+
+
+def append(path, df, write_rows, read, cache_dir=CACHE_DIR):
+    """Append `df` to `path` and to its cache without re-parsing the file.
+
+    ``write_rows(path)`` must append exactly the rows of `df` to the source
+    file. The new digest chains the old one with the appended bytes only
+    (`chained_digest`). The existing cache is extended and moved to the new
+    digest; if there is no appendable cache, it is built from scratch
+    instead.
+    """
+    old_digest = source_digest(path, cache_dir)
+    old_target = cache_path(path, old_digest, cache_dir)
+    offset = os.stat(path).st_size
+    write_rows(path)
+    digest = chained_digest(path, old_digest, offset)
+    _remember(path, os.stat(path), digest, cache_dir)
+    target = cache_path(path, digest, cache_dir)
+    try:
+        append_columns(old_target, df, parent=old_digest)
+    except (OSError, ValueError):
+        return build(path, read, cache_dir)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(old_target, target)
+    return target
+
+
+if __name__ == "__main__":
+    from data_loader import DATA_PATH, DAY_PATH, HOUR_PATH, read_all_data, read_day_csv, read_hour_csv
+
+    for source, reader in ((HOUR_PATH, read_hour_csv), (DAY_PATH, read_day_csv), (DATA_PATH, read_all_data)):
+        print(f"{source} -> {build(source, reader)}")
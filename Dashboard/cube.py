@@ -0,0 +1,351 @@
+"""Pre-aggregated cube behind the dashboard's summary tables.
+
+The cube keeps the daily observations at two grains:
+
+* day cells: one per date, used for the partial months at the edges of a
+  date range;
+* month cells: one per (month, weekday, weathersit) combination, holding
+  count, sum, sum of squares, min, max and a `BINS`-bin integer-count
+  histogram for each measure.
+
+A query over a date range rolls up the month cells for every month the range
+fully covers and only the day cells of the (at most two) partial months, so
+its cost depends on the number of months, not on the number of rows.
+Both grains are append-only `buffers` storage: days added by `extend` get
+month cells of their own, so a month filled by several appends may hold a
+cell per append and combination instead of one per combination. Rollups
+merge cells by group, so the results are the same.
+
+Medians and quantiles are estimates: the histograms of the covered month
+cells are merged with the binned edge days and the order statistics are
+placed within their bin, so a quantile costs one pass over the month cells
+like the other statistics. Bins are a power-of-two number of rentals wide,
+just enough for `BINS` of them to reach the largest value; the estimate is
+within one bin width of the exact quantile (exact while the width is 1). A
+group with no full month in the range only has edge days, at most two
+partial months, and gets the exact quantile from sorting them.
+
+A value beyond the last bin doubles the width of that measure's bins and
+adds neighbouring bins together, so `extend` never goes back to the days;
+the widths are a function of the largest value alone, so an extended cube
+and a rebuilt one hold the same histograms.
+"""
+import numpy as np
+import pandas as pd
+
+from buffers import AppendBuffer
+from transforms import MONTH_TO_SEASON, SEASONS
+
+MEASURES = ("count_day", "casual_day", "registered_day")
+DIMENSIONS = ("month_day", "weekday_day", "weathersit_day")
+BINS = 256
+
+
+def _width(maximum, bins=BINS):
+    """Smallest power-of-two bin width for which `bins` bins cover [0, maximum]."""
+    width = 1
+    while width * bins <= maximum:
+        width *= 2
+    return width
+
+
+def _month_ordinal(dates):
+    return dates.astype("datetime64[M]").astype(np.int64)
+
+
+class AggregateCube:
+    def __init__(self, daily, bins=BINS):
+        daily = daily.sort_values("date")
+        self.bins = bins
+        self.widths = np.array([_width(daily[measure].max(), bins) for measure in MEASURES], dtype=np.int64)
+        self._days = {
+            "day_dates": AppendBuffer(daily["date"].to_numpy().astype("datetime64[D]")),
+            "day_dims": AppendBuffer(daily[list(DIMENSIONS)].to_numpy(dtype=np.int8)),
+            "day_values": AppendBuffer(daily[list(MEASURES)].to_numpy(dtype=np.float64)),
+        }
+        self._publish_days()
+        self._build_months()
+
+    def _publish_days(self):
+        for name, buffer in self._days.items():
+            setattr(self, name, buffer.values)
+
+    def _publish_months(self):
+        self.month_keys = self._months["keys"].values
+        self.month_dims = self._months["dims"].values
+        self.month_stats = {name: buffer.values for name, buffer in self._months["stats"].items()}
+
+    def _month_cells(self, first_day):
+        """Month cells ``(keys, dims, stats)`` of the days from `first_day` on."""
+        # Month cells: group days by (month ordinal, weekday, weathersit)
+        months = _month_ordinal(self.day_dates[first_day:])
+        keys = np.stack([months, self.day_dims[first_day:, 1], self.day_dims[first_day:, 2]], axis=1)
+        cells, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        dims = np.stack([
+            (cells[:, 0] % 12 + 1).astype(np.int8),
+            cells[:, 1].astype(np.int8),
+            cells[:, 2].astype(np.int8),
+        ], axis=1)
+        stats = self._accumulate(inverse, len(cells), self.day_values[first_day:])
+        # A month cell holds at most 31 days, so its counts fit in one byte
+        stats["hist"] = self._histograms(inverse, len(cells), self.day_values[first_day:]).astype(np.uint8)
+        return cells[:, 0], dims, stats
+
+    def _histograms(self, groups, size, values):
+        """Integer-count histograms ``(size, measures, bins)`` of day-level `values` per group."""
+        bin_index = (values // self.widths).astype(np.intp)
+        hist = np.empty((size, len(MEASURES), self.bins), dtype=np.int64)
+        for m in range(len(MEASURES)):
+            flat = groups * self.bins + bin_index[:, m]
+            hist[:, m] = np.bincount(flat, minlength=size * self.bins).reshape(size, self.bins)
+        return hist
+
+    def _widen(self, values):
+        """Double bin widths until `values` fit, adding neighbouring month-cell bins together."""
+        widths = np.array([_width(max(width * self.bins - 1, top), self.bins)
+                           for width, top in zip(self.widths, values.max(axis=0))], dtype=np.int64)
+        if (widths == self.widths).all():
+            return
+        hist = self.month_stats["hist"].copy()
+        for m, factor in enumerate(widths // self.widths):
+            if factor > 1:
+                merged = hist[:, m].reshape(len(hist), -1, min(factor, self.bins)).sum(axis=2)
+                hist[:, m] = 0
+                hist[:, m, :merged.shape[1]] = merged
+        self.widths = widths
+        self._months = dict(self._months, stats=dict(self._months["stats"], hist=AppendBuffer(hist)))
+        self._publish_months()
+
+    def _build_months(self):
+        keys, dims, stats = self._month_cells(0)
+        self._months = {
+            "keys": AppendBuffer(keys),
+            "dims": AppendBuffer(dims),
+            "stats": {name: AppendBuffer(values) for name, values in stats.items()},
+        }
+        self._publish_months()
+
+    def extend(self, daily):
+        """Add days that all come after the cube's last date.
+
+        The new days are appended with month cells of their own; only a value
+        beyond the last bin touches the existing cells (`_widen`). Attributes
+        are rebound rather than written in place, so a shallow copy can be
+        extended while the original is still read.
+        """
+        daily = daily.sort_values("date")
+        dates = daily["date"].to_numpy().astype("datetime64[D]")
+        if len(dates) == 0:
+            return self
+        if len(self.day_dates) and dates[0] <= self.day_dates[-1]:
+            raise ValueError("extend() only accepts dates after the last day in the cube")
+        first_day = len(self.day_dates)
+        self._widen(daily[list(MEASURES)].to_numpy(dtype=np.float64))
+        self._days = {
+            "day_dates": self._days["day_dates"].extend(dates),
+            "day_dims": self._days["day_dims"].extend(daily[list(DIMENSIONS)].to_numpy(dtype=np.int8)),
+            "day_values": self._days["day_values"].extend(daily[list(MEASURES)].to_numpy(dtype=np.float64)),
+        }
+        self._publish_days()
+        keys, dims, stats = self._month_cells(first_day)
+        self._months = {
+            "keys": self._months["keys"].extend(keys),
+            "dims": self._months["dims"].extend(dims),
+            "stats": {name: buffer.extend(stats[name]) for name, buffer in self._months["stats"].items()},
+        }
+        self._publish_months()
+        return self
+
+    def _accumulate(self, groups, size, values):
+        """Aggregate day-level `values` into `size` groups given per-day group ids."""
+        n_measures = values.shape[1]
+        stats = {
+            "n": np.bincount(groups, minlength=size).astype(np.int64),
+            "sum": np.zeros((size, n_measures)),
+            "sumsq": np.zeros((size, n_measures)),
+            "min": np.full((size, n_measures), np.inf),
+            "max": np.full((size, n_measures), -np.inf),
+        }
+        for m in range(n_measures):
+            stats["sum"][:, m] = np.bincount(groups, weights=values[:, m], minlength=size)
+            stats["sumsq"][:, m] = np.bincount(groups, weights=values[:, m] ** 2, minlength=size)
+            np.minimum.at(stats["min"][:, m], groups, values[:, m])
+            np.maximum.at(stats["max"][:, m], groups, values[:, m])
+        return stats
+
+    def _merge(self, groups, size, stats):
+        """Roll already-aggregated cells up into `size` groups."""
+        merged = {
+            "n": np.bincount(groups, weights=stats["n"], minlength=size).astype(np.int64),
+            "sum": np.zeros((size,) + stats["sum"].shape[1:]),
+            "sumsq": np.zeros((size,) + stats["sumsq"].shape[1:]),
+            "min": np.full((size,) + stats["min"].shape[1:], np.inf),
+            "max": np.full((size,) + stats["max"].shape[1:], -np.inf),
+        }
+        np.add.at(merged["sum"], groups, stats["sum"])
+        np.add.at(merged["sumsq"], groups, stats["sumsq"])
+        np.minimum.at(merged["min"], groups, stats["min"])
+        np.maximum.at(merged["max"], groups, stats["max"])
+        if "hist" in stats:
+            merged["hist"] = np.zeros((size,) + stats["hist"].shape[1:], dtype=np.int64)
+            np.add.at(merged["hist"], groups, stats["hist"])
+        return merged
+
+    def _cells(self, start, end, weekdays, weather):
+        """Month and day cells covering [start, end] after the dimension filters."""
+        start = np.datetime64(start, "D")
+        end = np.datetime64(end, "D")
+        first_full = start.astype("datetime64[M]")
+        if first_full.astype("datetime64[D]") != start:
+            first_full += 1
+        last_full = end.astype("datetime64[M]")
+        if (last_full + 1).astype("datetime64[D]") - 1 != end:
+            last_full -= 1
+
+        if first_full <= last_full:
+            lo = np.searchsorted(self.month_keys, first_full.astype(np.int64), side="left")
+            hi = np.searchsorted(self.month_keys, last_full.astype(np.int64), side="right")
+            month_index = np.arange(lo, hi)
+            full_start = first_full.astype("datetime64[D]")
+            full_end = (last_full + 1).astype("datetime64[D]")
+            edges = [(start, full_start), (full_end, end + 1)]
+        else:
+            month_index = np.arange(0)
+            edges = [(start, end + 1)]
+        day_index = np.concatenate([
+            np.arange(*np.searchsorted(self.day_dates, [lo_date, hi_date])) for lo_date, hi_date in edges
+        ])
+
+        month_mask = np.ones(len(month_index), dtype=bool)
+        day_mask = np.ones(len(day_index), dtype=bool)
+        if weekdays is not None:
+            month_mask &= np.isin(self.month_dims[month_index, 1], weekdays)
+            day_mask &= np.isin(self.day_dims[day_index, 1], weekdays)
+        if weather is not None:
+            month_mask &= np.isin(self.month_dims[month_index, 2], weather)
+            day_mask &= np.isin(self.day_dims[day_index, 2], weather)
+        return month_index[month_mask], day_index[day_mask]
+
+    @staticmethod
+    def _groups(dims, by):
+        """``(size, group code per cell)`` of cells with dimensions `dims` grouped by `by`."""
+        if by is None:
+            return 1, np.zeros(len(dims), dtype=np.intp)
+        if by == "season":
+            return len(SEASONS), MONTH_TO_SEASON[dims[:, 0]].astype(np.intp)
+        column = {"month": 0, "weekday": 1, "weathersit": 2}[by]
+        size = {"month": 13, "weekday": 7, "weathersit": 5}[by]
+        return size, dims[:, column].astype(np.intp)
+
+    def rollup(self, start, end, by=None, weekdays=None, weather=None):
+        """Aggregate the cube over [start, end] grouped by `by`.
+
+        `by` is one of ``"month"``, ``"weekday"``, ``"weathersit"``, ``"season"``
+        or ``None`` for a single total. `weekdays`/`weather` restrict the
+        weekday (0-6) and weathersit (1-4) codes. Returns a dict of arrays
+        indexed by group code, each of shape ``(groups, len(MEASURES))``
+        except ``"n"``.
+        """
+        month_index, day_index = self._cells(start, end, weekdays, weather)
+        size, month_groups = self._groups(self.month_dims[month_index], by)
+        _, day_groups = self._groups(self.day_dims[day_index], by)
+
+        from_days = self._accumulate(day_groups, size, self.day_values[day_index])
+        from_months = self._merge(month_groups, size, {k: self.month_stats[k][month_index] for k in from_days})
+        both = np.concatenate([np.arange(size), np.arange(size)])
+        return self._merge(both, size, {k: np.concatenate([from_days[k], from_months[k]]) for k in from_days})
+
+    @staticmethod
+    def _exact(values, groups, size, qs):
+        """Quantiles `qs` of `values` per group, interpolated like ``Series.quantile``."""
+        # Each group's values sorted, the groups one after another
+        ordered = values[np.lexsort((values, groups))]
+        n = np.bincount(groups, minlength=size)
+        present = np.flatnonzero(n)
+        first = (np.cumsum(n) - n)[present]
+        result = np.full((len(qs), size), np.nan)
+        for i, q in enumerate(qs):
+            position = q * (n[present] - 1)
+            below = np.floor(position).astype(np.int64)
+            above = np.ceil(position).astype(np.int64)
+            low, high = ordered[first + below], ordered[first + above]
+            result[i, present] = low + (high - low) * (position - below)
+        return result
+
+    def quantiles(self, start, end, measure, qs, by=None, weekdays=None, weather=None):
+        """Estimated quantiles `qs` of `measure` per group, interpolated like ``Series.quantile``.
+
+        Same arguments as `rollup`; returns an array of shape ``(len(qs), groups)``,
+        NaN for groups without any day. Order statistics in a bin of width
+        ``w`` are spread evenly over its ``w`` values.
+        """
+        m = MEASURES.index(measure)
+        month_index, day_index = self._cells(start, end, weekdays, weather)
+        size, month_groups = self._groups(self.month_dims[month_index], by)
+        _, day_groups = self._groups(self.day_dims[day_index], by)
+        bins, width = self.bins, self.widths[m]
+        day_values = self.day_values[day_index, m]
+
+        # Month cells group by group; a contiguous sum per group is much faster than reduceat
+        order = np.argsort(month_groups, kind="stable")
+        present, starts = np.unique(month_groups[order], return_index=True)
+        cells = self.month_stats["hist"][month_index[order], m]
+        from_months = np.zeros((size, bins), dtype=np.int64)
+        for group, first, last in zip(present, starts, np.append(starts[1:], len(order))):
+            from_months[group] = cells[first:last].sum(axis=0, dtype=np.int32)
+        from_days = np.bincount(
+            day_groups * bins + (day_values // width).astype(np.intp), minlength=size * bins
+        ).reshape(size, bins)
+        hist = from_months + from_days
+        n = hist.sum(axis=1)
+        cumulative = np.cumsum(hist, axis=1)
+        rows = np.arange(size)
+
+        def order_statistic(rank):
+            # The bin holding the rank-th smallest value (0-based), and its place among the bin's counts
+            position = np.minimum((cumulative <= rank[:, None]).sum(axis=1), bins - 1)
+            count = hist[rows, position]
+            within = rank - (cumulative[rows, position] - count)
+            spread = np.divide(within + 0.5, count, out=np.zeros(size), where=count > 0)
+            return position * width + (width - 1) * spread
+
+        result = np.full((len(qs), size), np.nan)
+        for i, q in enumerate(qs):
+            position = q * np.maximum(n - 1, 0)
+            below, above = np.floor(position), np.ceil(position)
+            low, high = order_statistic(below), order_statistic(above)
+            result[i] = np.where(n > 0, low + (high - low) * (position - below), np.nan)
+        # Groups made of edge days only are few enough to sort
+        edge_only = from_months.sum(axis=1) == 0
+        if edge_only.any():
+            exact = self._exact(day_values, day_groups, size, qs)
+            result[:, edge_only] = exact[:, edge_only]
+        return result
+
+    def summary(self, start, end, measure, by=None, weekdays=None, weather=None, quantiles=(0.5,)):
+        """Table of count/sum/mean/std/min/max and quantiles for one measure.
+
+        Groups without any day are dropped; the index holds the group codes.
+        """
+        m = MEASURES.index(measure)
+        stats = self.rollup(start, end, by=by, weekdays=weekdays, weather=weather)
+        n = stats["n"].astype(np.float64)
+        total = stats["sum"][:, m]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / n
+            variance = (stats["sumsq"][:, m] - n * mean**2) / (n - 1)
+        table = pd.DataFrame({
+            "count": stats["n"],
+            "sum": total,
+            "mean": mean,
+            "std": np.sqrt(np.maximum(variance, 0.0)),
+            "min": stats["min"][:, m],
+            "max": stats["max"][:, m],
+        })
+        if quantiles:
+            values = self.quantiles(start, end, measure, quantiles, by=by, weekdays=weekdays, weather=weather)
+            for q, value in zip(quantiles, values):
+                # Keep the estimates inside the exact [min, max] of each group
+                table[f"q{int(q * 100)}"] = np.clip(value, table["min"], table["max"])
+        return table[table["count"] > 0]
@@ -1,39 +1,50 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import time
 from datetime import datetime
 
+import anomalies
+from data_loader import DATA_PATH
+import demand_model
+import export
+from incremental import LiveDataset
+import light_charts
+from profiling import CACHES, Profiler, counted
+from render_cache import RenderCache
+from tab_data import user_type_frame, weather_plot_frame, weekly_frame
+from transforms import DAY_NAMES, SEASONS, WEATHER_NAMES, season_labels
+
 st.set_page_config(page_title="Dashboard Bike Sharing", layout="wide")
 
+# Stage timings are recorded only while the profiling panel at the bottom of
+# the sidebar is on; its toggle keeps its state in st.session_state["profiling"]
+profiler = st.session_state.setdefault("profiler", Profiler())
+profiler.begin("skrip", st.session_state.get("profiling", False))
+
 # Add sidebar for date range selection
 st.sidebar.image("https://raw.githubusercontent.com/sendy-ty/Submission1/refs/heads/main/Dashboard/bike%20sharing.jpg", width=200)
 st.sidebar.title("Rentang Waktu")
 
-@st.cache_data
-def load_data():
-    # Sample data for demonstration
-    data = {
-        "year_day": [2021, 2021, 2021, 2021, 2021, 2021, 2021, 2021, 2021, 2021, 2021, 2022, 2022, 2022, 2022, 2022, 2022, 2022, 2022],
-        "month_day": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 1, 2, 3, 4, 5, 6, 7],
-        "weekday_day": [1, 2, 3, 4, 5, 6, 0, 1, 2, 3, 4, 5, 6, 0, 1, 2, 3, 4, 5],
-        "weathersit_day": [1, 1, 2, 2, 1, 3, 2, 1, 4, 1, 2, 3, 1, 2, 1, 3, 2, 1, 4],
-        "count_day": [4200, 4800, 5200, 5600, 6000, 6500, 7000, 7200, 6800, 6400, 5800, 5200, 4600, 5000, 5500, 6000, 6500, 7000, 7200],
-        "casual_day": [1200, 1600, 1800, 2000, 2200, 2600, 3200, 3400, 3000, 2800, 2400, 2000, 1600, 1800, 2000, 2200, 2600, 3200, 3400],
-        "registered_day": [3000, 3200, 3400, 3600, 3800, 3900, 3800, 3800, 3800, 3600, 3400, 3200, 3000, 3200, 3500, 3800, 3900, 3800, 3800]
-    }
-    return pd.DataFrame(data)
+@counted("get_dataset", st.cache_resource)
+def get_dataset(path):
+    # One LiveDataset per file: it reloads when the CSV's content changes and,
+    # when rows were only appended (incremental.append_days), folds just those
+    # rows into the cube, filter index, hourly drill-down, prefix sums and
+    # anomaly baseline
+    return LiveDataset(path)
 
 # Load data
-df = load_data()
-
-# Process dates
-df["date"] = pd.to_datetime(
-    df["year_day"].astype(str) + "-" + 
-    df["month_day"].astype(str).str.zfill(2) + "-01", 
-    format="%Y-%m-%d"
-)
+with profiler.stage("muat data") as stage:
+    live_dataset = get_dataset(DATA_PATH)
+    dataset = live_dataset.current()
+    stage.rows = dataset.rows
+df_hourly, df, load_stats = dataset.hourly, dataset.daily, dataset.stats
+cube = dataset.cube
+filter_index = dataset.filter_index
+hourly_drilldown = dataset.drilldown
+prefix_sums = dataset.prefix_sums
 
 min_date = df["date"].min().date()
 max_date = df["date"].max().date()
@@ -54,36 +65,101 @@ day_types = ["Semua", "Hari Kerja", "Akhir Pekan"]
 selected_day_type = st.sidebar.selectbox("Tipe Hari", day_types)
 
 # Filter berdasarkan cuaca
-weather_types = ["Semua", "Cerah", "Berawan", "Hujan Ringan", "Hujan Lebat"]
+weather_types = ["Semua"] + WEATHER_NAMES
 selected_weather = st.sidebar.selectbox("Kondisi Cuaca", weather_types)
 
 # Filter berdasarkan tipe pengguna
 user_types = ["Semua", "Casual", "Registered"]
 selected_user_type = st.sidebar.selectbox("Tipe Pengguna", user_types)
 
-# Apply filters
-df_filtered = df.copy()
+# Matplotlib renders PNGs on the server (cached per filter state); the light
+# mode sends precomputed summaries to Streamlit's client-side Vega-Lite charts
+chart_mode = st.sidebar.radio("Mode Grafik", ["Matplotlib", "Ringan (klien)"], horizontal=True)
+light_mode = chart_mode != "Matplotlib"
 
-# Date filter
-df_filtered = df_filtered[(df_filtered["date"].dt.date >= start_date) & (df_filtered["date"].dt.date <= end_date)]
+with st.sidebar.expander("Info Data"):
+    st.caption(
+        f"{load_stats['rows']:,} baris dimuat dalam {load_stats['load_seconds'] * 1000:.0f} ms, "
+        f"memori frame {load_stats['memory_bytes'] / 2**20:.1f} MB, "
+        f"RSS proses {load_stats['rss_bytes'] / 2**20:.0f} MB, "
+        f"pembaruan {'inkremental' if dataset.incremental else 'penuh'}"
+    )
 
+# Apply filters
 # Day type filter
-if selected_day_type == "Hari Kerja":
-    df_filtered = df_filtered[df_filtered["weekday_day"].isin([1, 2, 3, 4, 5])]
-elif selected_day_type == "Akhir Pekan":
-    df_filtered = df_filtered[df_filtered["weekday_day"].isin([0, 6])]
-
-# Weather filter
-weather_map = {"Cerah": 1, "Berawan": 2, "Hujan Ringan": 3, "Hujan Lebat": 4}
-if selected_weather != "Semua":
-    weather_value = weather_map.get(selected_weather)
-    df_filtered = df_filtered[df_filtered["weathersit_day"] == weather_value]
-
-# User type filter
-if selected_user_type == "Casual":
-    df_filtered["count_day"] = df_filtered["casual_day"]
-elif selected_user_type == "Registered":
-    df_filtered["count_day"] = df_filtered["registered_day"]
+day_type_weekdays = {"Semua": None, "Hari Kerja": [1, 2, 3, 4, 5], "Akhir Pekan": [0, 6]}
+selected_weekdays = day_type_weekdays[selected_day_type]
+
+# Weather filter: weathersit codes are 1-based positions in WEATHER_NAMES
+selected_weather_codes = None if selected_weather == "Semua" else [WEATHER_NAMES.index(selected_weather) + 1]
+
+# User type filter: count_day is read from the chosen column instead of being overwritten
+count_measure = {"Semua": "count_day", "Casual": "casual_day", "Registered": "registered_day"}[selected_user_type]
+
+# Date range + bitmap filters give one array of row positions; df_filtered is
+# a lazy view over it rather than a copied DataFrame
+with profiler.stage("filter") as stage:
+    df_filtered = filter_index.view(
+        start_date, end_date,
+        aliases={"count_day": count_measure},
+        weekday_day=selected_weekdays,
+        weathersit_day=selected_weather_codes,
+    )
+    stage.rows = len(df_filtered)
+
+# The summary tables below are rolled up from the pre-aggregated cube
+
+def cube_summary(measure, by=None, weekdays=selected_weekdays, quantiles=(0.5,)):
+    with profiler.stage("agregasi"):
+        return cube.summary(
+            start_date, end_date, measure, by=by,
+            weekdays=weekdays, weather=selected_weather_codes, quantiles=quantiles,
+        )
+
+@counted("get_render_cache", st.cache_resource)
+def get_render_cache():
+    return RenderCache()
+
+render_cache = get_render_cache()
+filter_state = (dataset.digest, start_date, end_date, selected_day_type, selected_weather, selected_user_type)
+
+def plotting():
+    # matplotlib and seaborn dominate a cold start, so they are imported only
+    # when a figure is actually drawn (a render cache miss in Matplotlib mode)
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
+
+def tab_input(name, build):
+    # Tab inputs depend only on the sidebar filters; they are kept per session
+    # so a fragment rerun (a widget inside one tab) does not rebuild them
+    inputs = st.session_state.get("tab_inputs")
+    if inputs is None or inputs["state"] != filter_state:
+        inputs = st.session_state["tab_inputs"] = {"state": filter_state}
+    CACHES.count("tab_input", name in inputs)
+    if name not in inputs:
+        with profiler.stage("agregasi"):
+            inputs[name] = build()
+    return inputs[name]
+
+def show_figure(chart_id, plot_type, draw):
+    # draw() only runs on a cache miss; the figure is closed once rasterized
+    with profiler.stage("grafik"):
+        png = render_cache.render((filter_state, plot_type, chart_id), draw)
+        st.image(png, use_container_width=True)
+
+def show_light_chart(data, spec):
+    with profiler.stage("grafik") as stage:
+        start = time.perf_counter()
+        st.vega_lite_chart(data, spec, use_container_width=True)
+        render_cache.record("klien", time.perf_counter() - start)
+        stage.rows = len(data)
+
+def show_table(data):
+    # st.dataframe serializes the whole frame to Arrow on every run
+    with profiler.stage("tabel") as stage:
+        st.dataframe(data)
+        stage.rows = len(data)
 
 # Main dashboard content
 st.title("📊 Dashboard Analisis Bike Sharing")
@@ -102,10 +178,14 @@ st.info(f"Data ditampilkan untuk rentang waktu: {selected_range}")
 
 # Tambahkan metrik ringkasan di atas dashboard
 col1, col2, col3, col4 = st.columns(4)
-total_rentals = df_filtered["count_day"].sum()
-avg_daily_rentals = df_filtered["count_day"].mean()
-casual_rentals = df_filtered["casual_day"].sum()
-registered_rentals = df_filtered["registered_day"].sum()
+# Range totals are the difference of two prefix-sum rows, not a pass over df_filtered
+with profiler.stage("metrik") as stage:
+    range_totals = prefix_sums.totals(start_date, end_date, weekdays=selected_weekdays, weather=selected_weather_codes)
+    stage.rows = range_totals["days"]
+total_rentals = range_totals[count_measure]
+avg_daily_rentals = total_rentals / range_totals["days"] if range_totals["days"] else float("nan")
+casual_rentals = range_totals["casual_day"]
+registered_rentals = range_totals["registered_day"]
 
 with col1:
     st.metric("Total Peminjaman", f"{total_rentals:,.0f}")
@@ -117,47 +197,79 @@ with col4:
     st.metric("Total Registered", f"{registered_rentals:,.0f}")
 
 # Tambahkan tab untuk navigasi antar pertanyaan
-tabs = st.tabs(["Dampak Cuaca", "Perbandingan Musim", "Casual vs Registered"])
+# Only the selected analysis runs: st.tabs would execute every tab body on each
+# rerun. Each analysis is a fragment, so its own widgets rerun just that tab
+tab_names = ["Dampak Cuaca", "Perbandingan Musim", "Casual vs Registered", "Pola Per Jam", "Simulasi Permintaan"]
+active_tab = st.radio("Analisis", tab_names, horizontal=True, key="active_tab", label_visibility="collapsed")
 
 # **Pertanyaan 1: Dampak Cuaca terhadap Peminjaman**
-with tabs[0]:
+@st.fragment
+@profiler.rerun("fragmen Dampak Cuaca")
+def weather_tab():
     st.header("1️⃣ Seberapa besar dampak kondisi cuaca terhadap jumlah peminjaman sepeda pada akhir pekan dalam dua tahun terakhir?")
     
     # Data for visualization
-    weekend_data = df_filtered[df_filtered["weekday_day"].isin([0, 6])]
-    weather_labels = {1: "Cerah", 2: "Berawan", 3: "Hujan Ringan", 4: "Hujan Lebat"}
-    
+    def weekend_weather():
+        weekend_data = df_filtered.restrict("weekday_day", [0, 6])
+        weekend_days = [0, 6] if selected_weekdays is None else [d for d in selected_weekdays if d in (0, 6)]
+        weather_summary = cube_summary(count_measure, by="weathersit", weekdays=weekend_days)
+        weather_summary.index = [WEATHER_NAMES[code - 1] for code in weather_summary.index]
+        return weather_plot_frame(weekend_data), weather_summary
+
     # Create plot data
-    plot_data = []
-    for i, row in weekend_data.iterrows():
-        weather_label = weather_labels.get(row["weathersit_day"], f"Cuaca {row['weathersit_day']}")
-        plot_data.append({"Kondisi Cuaca": weather_label, "Jumlah Peminjaman": row["count_day"]})
-    
-    df_weather_plot = pd.DataFrame(plot_data)
+    df_weather_plot, weather_summary = tab_input("weather", weekend_weather)
     
     # Create plot
     plot_type = st.selectbox("Pilih Jenis Plot", ["Box Plot", "Bar Plot", "Violin Plot"], key="weather_plot")
     
     if len(df_weather_plot) > 0:
-        fig, ax = plt.subplots(figsize=(10, 6))
-        if plot_type == "Box Plot":
-            sns.boxplot(x="Kondisi Cuaca", y="Jumlah Peminjaman", data=df_weather_plot, palette="Blues", ax=ax)
+        summary = weather_summary["mean"].rename("Jumlah Peminjaman").rename_axis("Kondisi Cuaca").reset_index()
+        weather_title = "Pengaruh Cuaca terhadap Peminjaman Sepeda di Akhir Pekan"
+
+        def draw_weather():
+            plt, sns = plotting()
+            fig, ax = plt.subplots(figsize=(10, 6))
+            if plot_type == "Box Plot":
+                sns.boxplot(x="Kondisi Cuaca", y="Jumlah Peminjaman", data=df_weather_plot, palette="Blues", ax=ax)
+            elif plot_type == "Bar Plot":
+                sns.barplot(x="Kondisi Cuaca", y="Jumlah Peminjaman", data=summary, palette="Blues", ax=ax)
+            else:  # Violin Plot
+                sns.violinplot(x="Kondisi Cuaca", y="Jumlah Peminjaman", data=df_weather_plot, palette="Blues", ax=ax)
+
+            ax.set_title(weather_title, fontsize=14)
+            ax.set_xlabel("Kondisi Cuaca", fontsize=12)
+            ax.set_ylabel("Jumlah Peminjaman", fontsize=12)
+            ax.grid(axis='y', linestyle='--', alpha=0.7)
+            return fig
+
+        if not light_mode:
+            show_figure("weather", plot_type, draw_weather)
+        elif plot_type == "Box Plot":
+            show_light_chart(
+                light_charts.box_stats(df_weather_plot, "Kondisi Cuaca", "Jumlah Peminjaman"),
+                light_charts.box_spec("Kondisi Cuaca", weather_title, "Jumlah Peminjaman"),
+            )
         elif plot_type == "Bar Plot":
-            summary = df_weather_plot.groupby("Kondisi Cuaca")["Jumlah Peminjaman"].mean().reset_index()
-            sns.barplot(x="Kondisi Cuaca", y="Jumlah Peminjaman", data=summary, palette="Blues", ax=ax)
+            show_light_chart(summary, light_charts.category_spec("bar", "Kondisi Cuaca", "Jumlah Peminjaman", weather_title))
         else:  # Violin Plot
-            sns.violinplot(x="Kondisi Cuaca", y="Jumlah Peminjaman", data=df_weather_plot, palette="Blues", ax=ax)
-        
-        ax.set_title("Pengaruh Cuaca terhadap Peminjaman Sepeda di Akhir Pekan", fontsize=14)
-        ax.set_xlabel("Kondisi Cuaca", fontsize=12)
-        ax.set_ylabel("Jumlah Peminjaman", fontsize=12)
-        ax.grid(axis='y', linestyle='--', alpha=0.7)
-        st.pyplot(fig)
+            show_light_chart(
+                light_charts.density_by_group(df_weather_plot, "Kondisi Cuaca", "Jumlah Peminjaman"),
+                {
+                    "title": weather_title,
+                    "mark": {"type": "area", "opacity": 0.5},
+                    "encoding": {
+                        "x": {"field": "Jumlah Peminjaman", "type": "quantitative"},
+                        "y": {"field": "Densitas", "type": "quantitative", "stack": None},
+                        "color": {"field": "Kondisi Cuaca", "type": "nominal", "sort": None},
+                    },
+                },
+            )
         
         # Display statistics
         st.markdown("### Statistik Dampak Cuaca")
-        weather_stats = df_weather_plot.groupby("Kondisi Cuaca")["Jumlah Peminjaman"].agg(["count", "mean", "median", "min", "max"])
-        st.dataframe(weather_stats)
+        weather_stats = weather_summary.rename(columns={"q50": "median (perkiraan)"})[["count", "mean", "median (perkiraan)", "min", "max"]]
+        weather_stats.index.name = "Kondisi Cuaca"
+        show_table(weather_stats)
     else:
         st.warning("Tidak ada data untuk plot yang dipilih.")
 
@@ -175,114 +287,190 @@ with tabs[0]:
     """)
 
 # **Pertanyaan 2: Tren Peminjaman Sepeda pada Musim Panas**
-with tabs[1]:
+@st.fragment
+@profiler.rerun("fragmen Perbandingan Musim")
+def season_tab():
     st.header("2️⃣ Bagaimana pola pertumbuhan jumlah peminjaman sepeda pada musim panas dibandingkan dengan musim lainnya?")
     
-    # Add season data
-    def get_season(month):
-        if month in [12, 1, 2]:
-            return "Musim Dingin"
-        elif month in [3, 4, 5]:
-            return "Musim Semi"
-        elif month in [6, 7, 8]:
-            return "Musim Panas"
-        else:
-            return "Musim Gugur"
-    
-    df_filtered["Season"] = df_filtered["month_day"].apply(get_season)
-    
     # Option for visualization
-    view_options = ["Perbandingan Musim", "Tren Bulanan", "Tren Harian"]
+    view_options = ["Perbandingan Musim", "Tren Bulanan", "Tren Harian", "Rata-rata Bergerak"]
     selected_view = st.radio("Pilih Tampilan", view_options, horizontal=True)
     
     if selected_view == "Perbandingan Musim":
         # Season comparison
-        season_counts = df_filtered.groupby("Season")["count_day"].agg(["mean", "sum", "count"]).reset_index()
-        season_counts.columns = ["Season", "Rata-rata Peminjaman", "Total Peminjaman", "Jumlah Hari"]
+        def season_totals():
+            season_counts = cube_summary(count_measure, by="season")[["mean", "sum", "count"]]
+            season_counts.index = [SEASONS[code] for code in season_counts.index]
+            season_counts = season_counts.rename_axis("Season").reset_index()
+            season_counts.columns = ["Season", "Rata-rata Peminjaman", "Total Peminjaman", "Jumlah Hari"]
+            return season_counts
+
+        season_counts = tab_input("season", season_totals)
         
         # Metric selection
         metric_options = ["Rata-rata Peminjaman", "Total Peminjaman"]
         selected_metric = st.selectbox("Pilih Metrik", metric_options)
         
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.barplot(
-            x="Season", 
-            y=selected_metric, 
-            data=season_counts,
-            palette="crest",
-            order=["Musim Dingin", "Musim Semi", "Musim Panas", "Musim Gugur"]
-        )
-        ax.set_title(f"{selected_metric} Berdasarkan Musim", fontsize=14)
-        ax.set_xlabel("Musim", fontsize=12)
-        ax.set_ylabel(selected_metric, fontsize=12)
-        ax.grid(axis='y', linestyle='--', alpha=0.7)
-        st.pyplot(fig)
+        def draw_season():
+            plt, sns = plotting()
+            fig, ax = plt.subplots(figsize=(10, 6))
+            sns.barplot(
+                x="Season", 
+                y=selected_metric, 
+                data=season_counts,
+                palette="crest",
+                order=["Musim Dingin", "Musim Semi", "Musim Panas", "Musim Gugur"]
+            )
+            ax.set_title(f"{selected_metric} Berdasarkan Musim", fontsize=14)
+            ax.set_xlabel("Musim", fontsize=12)
+            ax.set_ylabel(selected_metric, fontsize=12)
+            ax.grid(axis='y', linestyle='--', alpha=0.7)
+            return fig
+
+        if light_mode:
+            show_light_chart(
+                season_counts,
+                light_charts.category_spec("bar", "Season", selected_metric, f"{selected_metric} Berdasarkan Musim", x_title="Musim"),
+            )
+        else:
+            show_figure("season", selected_metric, draw_season)
         
         # Display data table
-        st.dataframe(season_counts)
+        show_table(season_counts)
         
     elif selected_view == "Tren Bulanan":
         # Monthly trend
-        monthly_counts = df_filtered.groupby("month_day")["count_day"].mean().reset_index()
+        monthly_counts = (
+            cube_summary(count_measure, by="month")["mean"]
+            .rename("count_day").rename_axis("month_day").reset_index()
+        )
         month_names = {
             1: "Januari", 2: "Februari", 3: "Maret", 4: "April", 5: "Mei", 6: "Juni",
             7: "Juli", 8: "Agustus", 9: "September", 10: "Oktober", 11: "November", 12: "Desember"
         }
         monthly_counts["Bulan"] = monthly_counts["month_day"].map(month_names)
         
-        fig, ax = plt.subplots(figsize=(12, 6))
-        sns.lineplot(
-            x="month_day", 
-            y="count_day", 
-            data=monthly_counts,
-            marker="o",
-            linewidth=2,
-            color="royalblue"
-        )
-        for i, row in monthly_counts.iterrows():
-            ax.text(row["month_day"], row["count_day"], f"{row['count_day']:.0f}", 
-                    ha='center', va='bottom', fontsize=9)
-        
-        ax.set_xticks(range(1, 13))
-        ax.set_xticklabels([month_names[i] for i in range(1, 13)], rotation=45)
-        ax.set_title("Tren Peminjaman Sepeda Bulanan", fontsize=14)
-        ax.set_xlabel("Bulan", fontsize=12)
-        ax.set_ylabel("Rata-rata Peminjaman Harian", fontsize=12)
-        ax.grid(axis='both', linestyle='--', alpha=0.7)
-        st.pyplot(fig)
+        def draw_monthly():
+            plt, sns = plotting()
+            fig, ax = plt.subplots(figsize=(12, 6))
+            sns.lineplot(
+                x="month_day", 
+                y="count_day", 
+                data=monthly_counts,
+                marker="o",
+                linewidth=2,
+                color="royalblue"
+            )
+            for month, value in zip(monthly_counts["month_day"].to_numpy(), monthly_counts["count_day"].to_numpy()):
+                ax.text(month, value, f"{value:.0f}", ha='center', va='bottom', fontsize=9)
+
+            ax.set_xticks(range(1, 13))
+            ax.set_xticklabels([month_names[i] for i in range(1, 13)], rotation=45)
+            ax.set_title("Tren Peminjaman Sepeda Bulanan", fontsize=14)
+            ax.set_xlabel("Bulan", fontsize=12)
+            ax.set_ylabel("Rata-rata Peminjaman Harian", fontsize=12)
+            ax.grid(axis='both', linestyle='--', alpha=0.7)
+            return fig
+
+        if light_mode:
+            show_light_chart(
+                monthly_counts,
+                light_charts.category_spec(
+                    "line", "Bulan", "count_day", "Tren Peminjaman Sepeda Bulanan", y_title="Rata-rata Peminjaman Harian"
+                ),
+            )
+        else:
+            show_figure("monthly", selected_view, draw_monthly)
         
         # Show monthly stats
         st.markdown("### Statistik Bulanan")
         monthly_stats = monthly_counts[["Bulan", "count_day"]].rename(columns={"count_day": "Rata-rata Peminjaman"})
-        st.dataframe(monthly_stats)
+        show_table(monthly_stats)
         
-    else:  # Tren Harian
+    elif selected_view == "Tren Harian":
         # Daily trend
-        daily_counts = df_filtered.groupby("weekday_day")["count_day"].mean().reset_index()
+        daily_counts = (
+            cube_summary(count_measure, by="weekday")["mean"]
+            .rename("count_day").rename_axis("weekday_day").reset_index()
+        )
         day_names = {
             0: "Minggu", 1: "Senin", 2: "Selasa", 3: "Rabu", 
             4: "Kamis", 5: "Jumat", 6: "Sabtu"
         }
         daily_counts["Hari"] = daily_counts["weekday_day"].map(day_names)
         
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.barplot(
-            x="Hari", 
-            y="count_day", 
-            data=daily_counts,
-            palette="viridis",
-            order=[day_names[i] for i in range(7)]
-        )
-        ax.set_title("Rata-rata Peminjaman Sepeda per Hari", fontsize=14)
-        ax.set_xlabel("Hari", fontsize=12)
-        ax.set_ylabel("Rata-rata Peminjaman", fontsize=12)
-        ax.grid(axis='y', linestyle='--', alpha=0.7)
-        st.pyplot(fig)
+        def draw_daily():
+            plt, sns = plotting()
+            fig, ax = plt.subplots(figsize=(10, 6))
+            sns.barplot(
+                x="Hari", 
+                y="count_day", 
+                data=daily_counts,
+                palette="viridis",
+                order=[day_names[i] for i in range(7)]
+            )
+            ax.set_title("Rata-rata Peminjaman Sepeda per Hari", fontsize=14)
+            ax.set_xlabel("Hari", fontsize=12)
+            ax.set_ylabel("Rata-rata Peminjaman", fontsize=12)
+            ax.grid(axis='y', linestyle='--', alpha=0.7)
+            return fig
+
+        if light_mode:
+            show_light_chart(
+                daily_counts,
+                light_charts.category_spec("bar", "Hari", "count_day", "Rata-rata Peminjaman Sepeda per Hari", y_title="Rata-rata Peminjaman"),
+            )
+        else:
+            show_figure("daily", selected_view, draw_daily)
         
         # Show daily stats
-        st.dataframe(daily_counts[["Hari", "count_day"]].sort_values("weekday_day").rename(
+        show_table(daily_counts.sort_values("weekday_day")[["Hari", "count_day"]].rename(
             columns={"count_day": "Rata-rata Peminjaman"}
         ))
+
+    else:  # Rata-rata Bergerak
+        # 7/30-day moving averages read off the prefix sums
+        with profiler.stage("agregasi"):
+            moving = prefix_sums.moving_average(
+                start_date, end_date, count_measure, weekdays=selected_weekdays, weather=selected_weather_codes
+            ).rename(columns={
+                "date": "Tanggal", count_measure: "Harian", "ma7": "Rata-rata 7 Hari", "ma30": "Rata-rata 30 Hari"
+            })
+        moving_title = "Rata-rata Bergerak Peminjaman Sepeda"
+
+        def draw_moving():
+            plt, _ = plotting()
+            fig, ax = plt.subplots(figsize=(12, 6))
+            ax.plot(moving["Tanggal"], moving["Harian"], color="lightgray", linewidth=1, label="Harian")
+            ax.plot(moving["Tanggal"], moving["Rata-rata 7 Hari"], color="royalblue", linewidth=2, label="Rata-rata 7 Hari")
+            ax.plot(moving["Tanggal"], moving["Rata-rata 30 Hari"], color="coral", linewidth=2, label="Rata-rata 30 Hari")
+            ax.set_title(moving_title, fontsize=14)
+            ax.set_xlabel("Tanggal", fontsize=12)
+            ax.set_ylabel("Jumlah Peminjaman", fontsize=12)
+            ax.legend()
+            ax.grid(axis='both', linestyle='--', alpha=0.7)
+            return fig
+
+        if len(moving) == 0:
+            st.warning("Tidak ada data untuk plot yang dipilih.")
+        elif light_mode:
+            moving_long = moving.melt(id_vars=["Tanggal"], var_name="Seri", value_name="Jumlah Peminjaman")
+            show_light_chart(moving_long, {
+                "title": moving_title,
+                "mark": {"type": "line"},
+                "encoding": {
+                    "x": {"field": "Tanggal", "type": "temporal"},
+                    "y": {"field": "Jumlah Peminjaman", "type": "quantitative"},
+                    "color": {
+                        "field": "Seri", "type": "nominal", "sort": None,
+                        "scale": {"range": ["lightgray", "royalblue", "coral"]},
+                    },
+                },
+            })
+        else:
+            show_figure("moving", selected_view, draw_moving)
+
+        show_table(moving.tail(30))
     
     st.markdown("""
     #### 📊 Analisis Peminjaman Sepeda Berdasarkan Musim:
@@ -299,202 +487,267 @@ with tabs[1]:
     """)
 
 # **Pertanyaan 3: Perbedaan Peminjaman Pengguna Casual vs Registered**
-with tabs[2]:
+@st.fragment
+@profiler.rerun("fragmen Casual vs Registered")
+def user_type_tab():
     st.header("3️⃣ Bagaimana perbedaan pola peminjaman sepeda antara pengguna casual dan registered pada hari kerja?")
     
     # Interactive view selection
     view_type = st.radio("Pilih Tampilan", ["Perbandingan Langsung", "Tren Mingguan", "Distribusi Peminjaman"], horizontal=True)
     
     if view_type == "Perbandingan Langsung":
-        # Filter untuk hari kerja
-        if selected_day_type == "Semua" or selected_day_type == "Hari Kerja":
-            df_weekday = df_filtered[df_filtered["weekday_day"].isin([1, 2, 3, 4, 5])]
-        else:
-            df_weekday = df_filtered.copy()
-        
+        def weekday_users():
+            # Filter untuk hari kerja
+            if selected_day_type == "Semua" or selected_day_type == "Hari Kerja":
+                df_weekday = df_filtered.restrict("weekday_day", [1, 2, 3, 4, 5])
+            else:
+                df_weekday = df_filtered
+            return user_type_frame(df_weekday)
+
         # Prepare data for visualization
-        casual_data = df_weekday["casual_day"].tolist()
-        registered_data = df_weekday["registered_day"].tolist()
-        
-        data_for_plot = {
-            "Tipe Pengguna": ["Casual"] * len(casual_data) + ["Registered"] * len(registered_data),
-            "Jumlah Peminjaman": casual_data + registered_data
-        }
-        
-        df_plot = pd.DataFrame(data_for_plot)
+        df_plot = tab_input("user_type", weekday_users)
         
         # Plot type selection
         plot_type = st.selectbox("Pilih Jenis Plot", ["Box Plot", "Violin Plot", "Strip Plot"], key="user_plot")
         
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        if plot_type == "Box Plot":
-            sns.boxplot(
-                x="Tipe Pengguna", 
-                y="Jumlah Peminjaman", 
-                data=df_plot,
-                palette={"Casual": "lightblue", "Registered": "coral"}
-            )
+        user_title = "Pola Peminjaman Sepeda (Casual vs Registered)"
+
+        def draw_user_type():
+            plt, sns = plotting()
+            fig, ax = plt.subplots(figsize=(10, 6))
+
+            if plot_type == "Box Plot":
+                sns.boxplot(
+                    x="Tipe Pengguna", 
+                    y="Jumlah Peminjaman", 
+                    data=df_plot,
+                    palette={"Casual": "lightblue", "Registered": "coral"}
+                )
+            elif plot_type == "Violin Plot":
+                sns.violinplot(
+                    x="Tipe Pengguna", 
+                    y="Jumlah Peminjaman", 
+                    data=df_plot,
+                    palette={"Casual": "lightblue", "Registered": "coral"}
+                )
+            else:  # Strip Plot
+                sns.stripplot(
+                    x="Tipe Pengguna", 
+                    y="Jumlah Peminjaman", 
+                    data=df_plot,
+                    palette={"Casual": "lightblue", "Registered": "coral"},
+                    jitter=True,
+                    alpha=0.5
+                )
+
+            ax.set_title(user_title, fontsize=14)
+            ax.set_xlabel("Tipe Pengguna", fontsize=12)
+            ax.set_ylabel("Jumlah Peminjaman", fontsize=12)
+            ax.grid(axis='y', linestyle='--', alpha=0.7)
+            return fig
+
+        user_colors = {"domain": ["Casual", "Registered"], "range": ["lightblue", "coral"]}
+        if not light_mode:
+            show_figure("user_type", plot_type, draw_user_type)
+        elif len(df_plot) == 0:
+            st.warning("Tidak ada data untuk plot yang dipilih.")
+        elif plot_type == "Box Plot":
+            spec = light_charts.box_spec("Tipe Pengguna", user_title, "Jumlah Peminjaman")
+            spec["layer"][1]["encoding"]["color"]["scale"] = user_colors
+            show_light_chart(light_charts.box_stats(df_plot, "Tipe Pengguna", "Jumlah Peminjaman"), spec)
         elif plot_type == "Violin Plot":
-            sns.violinplot(
-                x="Tipe Pengguna", 
-                y="Jumlah Peminjaman", 
-                data=df_plot,
-                palette={"Casual": "lightblue", "Registered": "coral"}
+            show_light_chart(
+                light_charts.density_by_group(df_plot, "Tipe Pengguna", "Jumlah Peminjaman"),
+                {
+                    "title": user_title,
+                    "mark": {"type": "area", "opacity": 0.5},
+                    "encoding": {
+                        "x": {"field": "Jumlah Peminjaman", "type": "quantitative"},
+                        "y": {"field": "Densitas", "type": "quantitative", "stack": None},
+                        "color": {"field": "Tipe Pengguna", "type": "nominal", "scale": user_colors},
+                    },
+                },
             )
         else:  # Strip Plot
-            sns.stripplot(
-                x="Tipe Pengguna", 
-                y="Jumlah Peminjaman", 
-                data=df_plot,
-                palette={"Casual": "lightblue", "Registered": "coral"},
-                jitter=True,
-                alpha=0.5
+            show_light_chart(
+                light_charts.strip_sample(df_plot, "Tipe Pengguna"),
+                {
+                    "title": user_title,
+                    "mark": {"type": "circle", "opacity": 0.5},
+                    "encoding": {
+                        "x": {"field": "Tipe Pengguna", "type": "nominal"},
+                        "xOffset": {"field": "jitter", "type": "quantitative"},
+                        "y": {"field": "Jumlah Peminjaman", "type": "quantitative"},
+                        "color": {"field": "Tipe Pengguna", "type": "nominal", "scale": user_colors, "legend": None},
+                    },
+                    "transform": [{"calculate": "random()", "as": "jitter"}],
+                },
             )
         
-        ax.set_title("Pola Peminjaman Sepeda (Casual vs Registered)", fontsize=14)
-        ax.set_xlabel("Tipe Pengguna", fontsize=12)
-        ax.set_ylabel("Jumlah Peminjaman", fontsize=12)
-        ax.grid(axis='y', linestyle='--', alpha=0.7)
-        st.pyplot(fig)
-        
         # Statistical summary
+        weekday_codes = [1, 2, 3, 4, 5] if selected_day_type in ("Semua", "Hari Kerja") else selected_weekdays
+        stat_columns = ["mean", "q50", "max", "min", "std"]
         summary = pd.DataFrame({
-            "Metrik": ["Rata-rata", "Median", "Maks", "Min", "Std Dev"],
-            "Casual": [
-                df_weekday["casual_day"].mean(),
-                df_weekday["casual_day"].median(),
-                df_weekday["casual_day"].max(),
-                df_weekday["casual_day"].min(),
-                df_weekday["casual_day"].std()
-            ],
-            "Registered": [
-                df_weekday["registered_day"].mean(),
-                df_weekday["registered_day"].median(),
-                df_weekday["registered_day"].max(),
-                df_weekday["registered_day"].min(),
-                df_weekday["registered_day"].std()
-            ]
+            "Metrik": ["Rata-rata", "Median (perkiraan)", "Maks", "Min", "Std Dev"],
+            "Casual": cube_summary("casual_day", weekdays=weekday_codes)[stat_columns].reindex([0]).iloc[0].to_numpy(),
+            "Registered": cube_summary("registered_day", weekdays=weekday_codes)[stat_columns].reindex([0]).iloc[0].to_numpy(),
         })
-        st.dataframe(summary.set_index("Metrik"))
+        show_table(summary.set_index("Metrik"))
     
     elif view_type == "Tren Mingguan":
         # Weekly trend
-        weekly_casual = df_filtered.groupby("weekday_day")["casual_day"].mean().reset_index()
-        weekly_registered = df_filtered.groupby("weekday_day")["registered_day"].mean().reset_index()
-        
-        day_names = {
-            0: "Minggu", 1: "Senin", 2: "Selasa", 3: "Rabu", 
-            4: "Kamis", 5: "Jumat", 6: "Sabtu"
-        }
-        
+        def weekly_users():
+            weekly_casual = cube_summary("casual_day", by="weekday")["mean"].rename("casual_day").rename_axis("weekday_day").reset_index()
+            weekly_registered = cube_summary("registered_day", by="weekday")["mean"].rename("registered_day").rename_axis("weekday_day").reset_index()
+            return weekly_frame(weekly_casual, weekly_registered)
+
         # Create DataFrame for plotting
-        weekly_data = []
-        for day_num in range(7):
-            day_casual = weekly_casual[weekly_casual["weekday_day"] == day_num]["casual_day"].values
-            day_registered = weekly_registered[weekly_registered["weekday_day"] == day_num]["registered_day"].values
-            
-            casual_val = day_casual[0] if len(day_casual) > 0 else 0
-            registered_val = day_registered[0] if len(day_registered) > 0 else 0
-            
-            weekly_data.append({
-                "Hari": day_names[day_num],
-                "Hari_num": day_num,
-                "Casual": casual_val,
-                "Registered": registered_val
-            })
-        
-        weekly_df = pd.DataFrame(weekly_data)
+        weekly_df = tab_input("weekly", weekly_users)
         
         # Visualization style
         plot_style = st.radio("Pilih Jenis Visualisasi", ["Gabungan", "Terpisah"], horizontal=True)
         
-        if plot_style == "Gabungan":
-            fig, ax = plt.subplots(figsize=(12, 6))
-            
-            sns.lineplot(
-                x="Hari_num", y="Casual", data=weekly_df, 
-                marker="o", linewidth=2, color="lightblue", label="Casual"
-            )
-            sns.lineplot(
-                x="Hari_num", y="Registered", data=weekly_df, 
-                marker="s", linewidth=2, color="coral", label="Registered"
-            )
-            
-            ax.set_xticks(range(7))
-            ax.set_xticklabels([day_names[i] for i in range(7)])
-            ax.set_title("Tren Peminjaman Mingguan (Casual vs Registered)", fontsize=14)
-            ax.set_xlabel("Hari", fontsize=12)
-            ax.set_ylabel("Rata-rata Peminjaman", fontsize=12)
-            ax.legend()
-            ax.grid(axis='both', linestyle='--', alpha=0.7)
-            st.pyplot(fig)
-            
-        else:  # Terpisah
-            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10), sharex=True)
-            
-            # Plot for casual users
-            sns.barplot(
-                x="Hari", y="Casual", data=weekly_df, 
-                ax=ax1, color="lightblue", alpha=0.8
+        def draw_weekly():
+            plt, sns = plotting()
+            if plot_style == "Gabungan":
+                fig, ax = plt.subplots(figsize=(12, 6))
+
+                sns.lineplot(
+                    x="Hari_num", y="Casual", data=weekly_df, 
+                    marker="o", linewidth=2, color="lightblue", label="Casual"
+                )
+                sns.lineplot(
+                    x="Hari_num", y="Registered", data=weekly_df, 
+                    marker="s", linewidth=2, color="coral", label="Registered"
+                )
+
+                ax.set_xticks(range(7))
+                ax.set_xticklabels(DAY_NAMES)
+                ax.set_title("Tren Peminjaman Mingguan (Casual vs Registered)", fontsize=14)
+                ax.set_xlabel("Hari", fontsize=12)
+                ax.set_ylabel("Rata-rata Peminjaman", fontsize=12)
+                ax.legend()
+                ax.grid(axis='both', linestyle='--', alpha=0.7)
+
+            else:  # Terpisah
+                fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10), sharex=True)
+
+                # Plot for casual users
+                sns.barplot(
+                    x="Hari", y="Casual", data=weekly_df, 
+                    ax=ax1, color="lightblue", alpha=0.8
+                )
+                ax1.set_title("Rata-rata Peminjaman Casual per Hari", fontsize=14)
+                ax1.set_ylabel("Rata-rata Peminjaman", fontsize=12)
+                ax1.grid(axis='y', linestyle='--', alpha=0.7)
+
+                # Plot for registered users
+                sns.barplot(
+                    x="Hari", y="Registered", data=weekly_df, 
+                    ax=ax2, color="coral", alpha=0.8
+                )
+                ax2.set_title("Rata-rata Peminjaman Registered per Hari", fontsize=14)
+                ax2.set_xlabel("Hari", fontsize=12)
+                ax2.set_ylabel("Rata-rata Peminjaman", fontsize=12)
+                ax2.grid(axis='y', linestyle='--', alpha=0.7)
+
+                plt.tight_layout()
+            return fig
+
+        if not light_mode:
+            show_figure("weekly", plot_style, draw_weekly)
+        else:
+            weekly_long = weekly_df.melt(
+                id_vars=["Hari"], value_vars=["Casual", "Registered"],
+                var_name="Tipe Pengguna", value_name="Rata-rata Peminjaman",
             )
-            ax1.set_title("Rata-rata Peminjaman Casual per Hari", fontsize=14)
-            ax1.set_ylabel("Rata-rata Peminjaman", fontsize=12)
-            ax1.grid(axis='y', linestyle='--', alpha=0.7)
-            
-            # Plot for registered users
-            sns.barplot(
-                x="Hari", y="Registered", data=weekly_df, 
-                ax=ax2, color="coral", alpha=0.8
+            spec = light_charts.category_spec(
+                "line" if plot_style == "Gabungan" else "bar", "Hari", "Rata-rata Peminjaman",
+                "Tren Peminjaman Mingguan (Casual vs Registered)", color="Tipe Pengguna",
             )
-            ax2.set_title("Rata-rata Peminjaman Registered per Hari", fontsize=14)
-            ax2.set_xlabel("Hari", fontsize=12)
-            ax2.set_ylabel("Rata-rata Peminjaman", fontsize=12)
-            ax2.grid(axis='y', linestyle='--', alpha=0.7)
-            
-            plt.tight_layout()
-            st.pyplot(fig)
+            spec["encoding"]["color"]["scale"] = {"domain": ["Casual", "Registered"], "range": ["lightblue", "coral"]}
+            if plot_style == "Terpisah":
+                spec["encoding"]["row"] = {"field": "Tipe Pengguna", "type": "nominal"}
+            show_light_chart(weekly_long, spec)
         
         # Show weekly data table
-        st.dataframe(weekly_df[["Hari", "Casual", "Registered"]])
+        show_table(weekly_df[["Hari", "Casual", "Registered"]])
         
     else:  # Distribusi Peminjaman
-        # Create histograms
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
-        
         # Distribution type selection
         dist_type = st.radio("Pilih Tipe Distribusi", ["Histogram", "KDE"], horizontal=True)
-        
-        if dist_type == "Histogram":
-            sns.histplot(df_filtered["casual_day"], ax=ax1, kde=True, color="lightblue")
-            sns.histplot(df_filtered["registered_day"], ax=ax2, kde=True, color="coral")
-        else:  # KDE
-            sns.kdeplot(df_filtered["casual_day"], ax=ax1, fill=True, color="lightblue")
-            sns.kdeplot(df_filtered["registered_day"], ax=ax2, fill=True, color="coral")
-        
-        ax1.set_title("Distribusi Peminjaman Casual", fontsize=14)
-        ax1.set_xlabel("Jumlah Peminjaman", fontsize=12)
-        ax1.set_ylabel("Frekuensi", fontsize=12)
-        ax1.grid(axis='both', linestyle='--', alpha=0.7)
-        
-        ax2.set_title("Distribusi Peminjaman Registered", fontsize=14)
-        ax2.set_xlabel("Jumlah Peminjaman", fontsize=12)
-        ax2.set_ylabel("Frekuensi", fontsize=12)
-        ax2.grid(axis='both', linestyle='--', alpha=0.7)
-        
-        plt.tight_layout()
-        st.pyplot(fig)
+
+        def draw_distribution():
+            plt, sns = plotting()
+            # Create histograms
+            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
+
+            if dist_type == "Histogram":
+                sns.histplot(df_filtered["casual_day"], ax=ax1, kde=True, color="lightblue")
+                sns.histplot(df_filtered["registered_day"], ax=ax2, kde=True, color="coral")
+            else:  # KDE
+                sns.kdeplot(df_filtered["casual_day"], ax=ax1, fill=True, color="lightblue")
+                sns.kdeplot(df_filtered["registered_day"], ax=ax2, fill=True, color="coral")
+
+            ax1.set_title("Distribusi Peminjaman Casual", fontsize=14)
+            ax1.set_xlabel("Jumlah Peminjaman", fontsize=12)
+            ax1.set_ylabel("Frekuensi", fontsize=12)
+            ax1.grid(axis='both', linestyle='--', alpha=0.7)
+
+            ax2.set_title("Distribusi Peminjaman Registered", fontsize=14)
+            ax2.set_xlabel("Jumlah Peminjaman", fontsize=12)
+            ax2.set_ylabel("Frekuensi", fontsize=12)
+            ax2.grid(axis='both', linestyle='--', alpha=0.7)
+
+            plt.tight_layout()
+            return fig
+
+        if not light_mode:
+            show_figure("distribution", dist_type, draw_distribution)
+        else:
+            dist_columns = st.columns(2)
+            for column, (label, source, color) in zip(dist_columns, [
+                ("Casual", "casual_day", "lightblue"), ("Registered", "registered_day", "coral"),
+            ]):
+                with column:
+                    values = df_filtered[source].to_numpy()
+                    if dist_type == "Histogram":
+                        data = light_charts.histogram(values)
+                        mark, y_title = {"type": "bar", "color": color}, "Frekuensi"
+                    else:  # KDE
+                        grid, density = light_charts.kde_grid(values)
+                        data = pd.DataFrame({"Jumlah Peminjaman": grid, "Frekuensi": density})
+                        mark, y_title = {"type": "area", "color": color, "opacity": 0.6}, "Densitas"
+                    show_light_chart(data, {
+                        "title": f"Distribusi Peminjaman {label}",
+                        "mark": mark,
+                        "encoding": {
+                            "x": {"field": "Jumlah Peminjaman", "type": "quantitative"},
+                            "y": {"field": "Frekuensi", "type": "quantitative", "title": y_title},
+                        },
+                    })
         
         # Statistical summary
-        casual_stats = df_filtered["casual_day"].describe()
-        registered_stats = df_filtered["registered_day"].describe()
-        
-        stats_df = pd.DataFrame({
-            "Statistik": casual_stats.index,
-            "Casual": casual_stats.values,
-            "Registered": registered_stats.values
-        })
-        st.dataframe(stats_df.set_index("Statistik"))
+        def describe_users():
+            describe_columns = ["count", "mean", "std", "min", "q25", "q50", "q75", "max"]
+            # Quartiles come from the cube's histograms, so they are estimates
+            describe_index = ["count", "mean", "std", "min", "25% (perkiraan)", "50% (perkiraan)", "75% (perkiraan)", "max"]
+            casual_stats = pd.Series(
+                cube_summary("casual_day", quantiles=(0.25, 0.5, 0.75))[describe_columns].reindex([0]).iloc[0].to_numpy(),
+                index=describe_index,
+            )
+            registered_stats = pd.Series(
+                cube_summary("registered_day", quantiles=(0.25, 0.5, 0.75))[describe_columns].reindex([0]).iloc[0].to_numpy(),
+                index=describe_index,
+            )
+            return pd.DataFrame({
+                "Statistik": casual_stats.index,
+                "Casual": casual_stats.values,
+                "Registered": registered_stats.values
+            })
+
+        stats_df = tab_input("describe", describe_users)
+        show_table(stats_df.set_index("Statistik"))
     
     st.markdown("""
     #### 📊 Analisis Perbandingan:
@@ -516,9 +769,354 @@ with tabs[2]:
     Perbedaan pola ini menunjukkan bahwa pengguna registered cenderung menggunakan sepeda untuk komuter harian, sedangkan pengguna casual lebih untuk kegiatan rekreasi.
     """)
 
+# **Drill-down: Pola Peminjaman per Jam**
+@st.fragment
+@profiler.rerun("fragmen Pola Per Jam")
+def hourly_tab():
+    st.header("4️⃣ Pada jam berapa puncak peminjaman sepeda terjadi, dan bagaimana polanya antara hari kerja dan akhir pekan?")
+    st.caption("Tampilan ini memakai data per jam dan mengikuti filter rentang waktu, tipe hari, dan tipe pengguna.")
+
+    hour_measure = {"count_day": "count_hour", "casual_day": "casual_hour", "registered_day": "registered_hour"}[count_measure]
+    hourly_view = st.radio("Pilih Tampilan", ["Heatmap Jam x Hari", "Jam Puncak", "Anomali"], horizontal=True, key="hourly_view")
+
+    if hourly_view == "Heatmap Jam x Hari":
+        with profiler.stage("agregasi"):
+            hourly_means = hourly_drilldown.mean_grid(start_date, end_date, hour_measure)
+        if selected_weekdays is not None:
+            hourly_means[~pd.Series(range(7)).isin(selected_weekdays).to_numpy()] = float("nan")
+        heatmap_df = pd.DataFrame(hourly_means, index=DAY_NAMES, columns=range(24))
+        heatmap_title = "Rata-rata Peminjaman per Jam dan Hari"
+
+        def draw_heatmap():
+            plt, sns = plotting()
+            fig, ax = plt.subplots(figsize=(14, 5))
+            sns.heatmap(heatmap_df, cmap="YlGnBu", ax=ax, cbar_kws={"label": "Rata-rata Peminjaman"})
+            ax.set_title(heatmap_title, fontsize=14)
+            ax.set_xlabel("Jam", fontsize=12)
+            ax.set_ylabel("Hari", fontsize=12)
+            return fig
+
+        if light_mode:
+            show_light_chart(
+                heatmap_df.rename_axis("Hari").reset_index().melt(id_vars="Hari", var_name="Jam", value_name="Rata-rata Peminjaman"),
+                {
+                    "title": heatmap_title,
+                    "mark": "rect",
+                    "encoding": {
+                        "x": {"field": "Jam", "type": "ordinal"},
+                        "y": {"field": "Hari", "type": "nominal", "sort": DAY_NAMES},
+                        "color": {"field": "Rata-rata Peminjaman", "type": "quantitative", "scale": {"scheme": "yellowgreenblue"}},
+                    },
+                },
+            )
+        else:
+            show_figure("hourly_heatmap", hour_measure, draw_heatmap)
+
+    elif hourly_view == "Jam Puncak":
+        with profiler.stage("agregasi"):
+            peak_df = hourly_drilldown.peak_hours(start_date, end_date, hour_measure, weekdays=selected_weekdays)
+        peak_title = "Rata-rata Peminjaman per Jam"
+
+        def draw_peak():
+            plt, _ = plotting()
+            fig, ax = plt.subplots(figsize=(12, 6))
+            ax.plot(peak_df["Jam"], peak_df["Hari Kerja"], marker="o", linewidth=2, color="royalblue", label="Hari Kerja")
+            ax.plot(peak_df["Jam"], peak_df["Akhir Pekan"], marker="s", linewidth=2, color="coral", label="Akhir Pekan")
+            ax.set_xticks(range(24))
+            ax.set_title(peak_title, fontsize=14)
+            ax.set_xlabel("Jam", fontsize=12)
+            ax.set_ylabel("Rata-rata Peminjaman", fontsize=12)
+            ax.legend()
+            ax.grid(axis='both', linestyle='--', alpha=0.7)
+            return fig
+
+        if light_mode:
+            show_light_chart(
+                peak_df.melt(id_vars="Jam", value_vars=["Hari Kerja", "Akhir Pekan"], var_name="Tipe Hari", value_name="Rata-rata Peminjaman"),
+                {
+                    "title": peak_title,
+                    "mark": {"type": "line", "point": True},
+                    "encoding": {
+                        "x": {"field": "Jam", "type": "ordinal"},
+                        "y": {"field": "Rata-rata Peminjaman", "type": "quantitative"},
+                        "color": {"field": "Tipe Hari", "type": "nominal"},
+                    },
+                },
+            )
+        else:
+            show_figure("hourly_peak", hour_measure, draw_peak)
+
+        # Top three hours per day type
+        st.markdown("### Jam Puncak")
+        peak_table = pd.DataFrame({
+            day_type: peak_df.nlargest(3, day_type)["Jam"].map("{:02d}:00".format).tolist()
+            for day_type in ["Hari Kerja", "Akhir Pekan"]
+            if peak_df[day_type].notna().sum() >= 3
+        }, index=["1", "2", "3"])
+        show_table(peak_table)
+
+    else:  # Anomali
+        st.caption(
+            "Setiap jam dibandingkan dengan median dan MAD seluruh data pada jam yang sama dalam seminggu dan kondisi "
+            "cuaca yang sama; skor z termodifikasi = 0,6745 × (aktual − median) / MAD."
+        )
+        threshold = st.slider("Ambang Skor z", 2.0, 8.0, anomalies.THRESHOLD, 0.5, key="anomaly_threshold")
+
+        def score_hours():
+            # The hourly rows are sorted by date, so the range is one slice
+            hourly_dates = df_hourly["dateday"].to_numpy()
+            lo, hi = np.searchsorted(hourly_dates, np.array([start_date, end_date + pd.Timedelta(days=1)], dtype=hourly_dates.dtype))
+            hours = df_hourly.iloc[lo:hi]
+            if selected_weekdays is not None:
+                hours = hours[hours["weekday_hour"].isin(selected_weekdays).to_numpy()]
+            expected, z = dataset.anomalies.score(hours, hour_measure)
+            return pd.DataFrame({
+                "Waktu": hours["dateday"].to_numpy() + pd.to_timedelta(hours["hour"].to_numpy(), unit="h"),
+                "Cuaca": hours["weathersit_hour"].to_numpy(),
+                "Aktual": hours[hour_measure].to_numpy(),
+                "Median": expected,
+                "Skor z": z,
+            })
+
+        scored = tab_input(f"anomalies_{hour_measure}", score_hours)
+        flagged = scored[scored["Skor z"].abs().to_numpy() > threshold]
+        metric_col1, metric_col2 = st.columns(2)
+        with metric_col1:
+            st.metric("Jam Anomali", f"{len(flagged):,}")
+        with metric_col2:
+            st.metric("Porsi dari Jam Terpilih", f"{len(flagged) / max(len(scored), 1) * 100:.2f}%")
+        anomaly_title = "Peminjaman per Jam dan Jam Anomali"
+
+        def draw_anomalies():
+            plt, _ = plotting()
+            fig, ax = plt.subplots(figsize=(14, 6))
+            ax.plot(scored["Waktu"], scored["Aktual"], linewidth=0.6, color="royalblue", label="Aktual")
+            ax.plot(scored["Waktu"], scored["Median"], linewidth=0.6, color="gray", alpha=0.7, label="Median")
+            ax.scatter(flagged["Waktu"], flagged["Aktual"], s=18, color="red", zorder=3, label="Anomali")
+            ax.set_title(anomaly_title, fontsize=14)
+            ax.set_xlabel("Waktu", fontsize=12)
+            ax.set_ylabel("Jumlah Peminjaman", fontsize=12)
+            ax.legend()
+            ax.grid(axis='both', linestyle='--', alpha=0.7)
+            return fig
+
+        if light_mode:
+            show_light_chart(
+                scored.assign(Anomali=scored["Skor z"].abs() > threshold)[["Waktu", "Aktual", "Median", "Anomali"]],
+                {
+                    "title": anomaly_title,
+                    "encoding": {"x": {"field": "Waktu", "type": "temporal"}},
+                    "layer": [
+                        {"mark": {"type": "line", "strokeWidth": 0.6, "color": "gray"},
+                         "encoding": {"y": {"field": "Median", "type": "quantitative"}}},
+                        {"mark": {"type": "line", "strokeWidth": 0.6},
+                         "encoding": {"y": {"field": "Aktual", "type": "quantitative", "title": "Jumlah Peminjaman"}}},
+                        {"transform": [{"filter": "datum.Anomali"}],
+                         "mark": {"type": "point", "filled": True, "color": "red"},
+                         "encoding": {"y": {"field": "Aktual", "type": "quantitative"}}},
+                    ],
+                },
+            )
+        else:
+            show_figure("hourly_anomalies", (hour_measure, threshold), draw_anomalies)
+
+        st.markdown("### Anomali Terbesar")
+        top = flagged.iloc[np.argsort(-flagged["Skor z"].abs().to_numpy(), kind="stable")[:20]]
+        show_table(pd.DataFrame({
+            "Tanggal": top["Waktu"].dt.strftime("%Y-%m-%d").to_numpy(),
+            "Jam": top["Waktu"].dt.strftime("%H:00").to_numpy(),
+            "Cuaca": top["Cuaca"].to_numpy(),
+            "Aktual": top["Aktual"].to_numpy(),
+            "Median": top["Median"].to_numpy(),
+            "Skor z": top["Skor z"].round(1).to_numpy(),
+        }))
+
+@counted("get_demand_model", st.cache_resource)
+def get_demand_model(digest, _hourly):
+    # Fitted once per data version and stored on disk (demand_model.load_model);
+    # a rerun only multiplies the scenario rows by the coefficients
+    return demand_model.load_model(DATA_PATH, _hourly)
+
+# **Simulasi: Perkiraan Permintaan**
+@st.fragment
+@profiler.rerun("fragmen Simulasi Permintaan")
+def what_if_tab():
+    st.header("5️⃣ Berapa perkiraan jumlah peminjaman sepeda untuk kondisi cuaca dan hari tertentu?")
+    st.caption(
+        "Perkiraan dari model kuadrat terkecil atas log jumlah peminjaman per jam (jam per tipe hari, hari, cuaca, "
+        "suhu, kelembapan, kecepatan angin dan tahun). Model dilatih sekali per versi data dan tidak mengikuti filter."
+    )
+    with profiler.stage("agregasi"):
+        model = get_demand_model(dataset.digest, df_hourly)
+
+    input_col, weather_col = st.columns(2)
+    with input_col:
+        period = st.radio("Periode", ["Satu Hari", "Satu Minggu"], horizontal=True, key="what_if_period")
+        if period == "Satu Hari":
+            day_name = st.selectbox("Hari", DAY_NAMES, index=1, key="what_if_day")
+            holiday = st.checkbox("Hari Libur", key="what_if_holiday")
+            weekdays = [DAY_NAMES.index(day_name)]
+        else:
+            holiday = False
+            weekdays = list(range(7))
+        weather_name = st.selectbox("Kondisi Cuaca", WEATHER_NAMES, key="what_if_weather")
+    with weather_col:
+        temp_c = st.slider("Suhu (°C)", 0, 41, 20, key="what_if_temp")
+        humidity = st.slider("Kelembapan (%)", 0, 100, 60, key="what_if_humidity")
+        windspeed = st.slider("Kecepatan Angin (km/jam)", 0, 67, 12, key="what_if_windspeed")
+
+    # Every weather condition is predicted in one batched product, so the
+    # comparison with Cerah costs no more than the selected scenario
+    with profiler.stage("prediksi") as stage:
+        predicted = model.predict(model.scenarios(weekdays, [1, 2, 3, 4], temp_c, humidity, windspeed, holiday))
+        stage.rows = predicted.size
+    selected = WEATHER_NAMES.index(weather_name)
+    totals = predicted.sum(axis=1)
+    change = (totals / totals[0] - 1) * 100
+
+    metric_col1, metric_col2 = st.columns(2)
+    with metric_col1:
+        st.metric(f"Perkiraan Peminjaman ({period})", f"{totals[selected]:,.0f}")
+    with metric_col2:
+        st.metric("Perubahan vs Cerah", f"{change[selected]:+.1f}%")
+
+    profile = pd.DataFrame({"Jam": np.arange(predicted.shape[1]), weather_name: predicted[selected]})
+    if selected:
+        profile["Cerah"] = predicted[0]
+    what_if_title = f"Perkiraan Peminjaman per Jam ({period})"
+
+    def draw_what_if():
+        plt, _ = plotting()
+        fig, ax = plt.subplots(figsize=(12, 6))
+        ax.plot(profile["Jam"], profile[weather_name], linewidth=2, color="royalblue", label=weather_name)
+        if selected:
+            ax.plot(profile["Jam"], profile["Cerah"], linewidth=1, linestyle="--", color="gray", label="Cerah")
+        if len(weekdays) > 1:
+            ax.set_xticks(range(0, len(profile), 24))
+            ax.set_xticklabels([DAY_NAMES[day] for day in weekdays])
+        else:
+            ax.set_xticks(range(24))
+        ax.set_title(what_if_title, fontsize=14)
+        ax.set_xlabel("Jam" if len(weekdays) == 1 else "Hari", fontsize=12)
+        ax.set_ylabel("Perkiraan Peminjaman", fontsize=12)
+        ax.legend()
+        ax.grid(axis='both', linestyle='--', alpha=0.7)
+        return fig
+
+    if light_mode:
+        show_light_chart(
+            profile.melt(id_vars="Jam", var_name="Kondisi Cuaca", value_name="Perkiraan Peminjaman"),
+            {
+                "title": what_if_title,
+                "mark": {"type": "line"},
+                "encoding": {
+                    "x": {"field": "Jam", "type": "quantitative", "title": "Jam" if len(weekdays) == 1 else "Jam sejak Minggu 00:00"},
+                    "y": {"field": "Perkiraan Peminjaman", "type": "quantitative"},
+                    "color": {"field": "Kondisi Cuaca", "type": "nominal", "sort": None},
+                },
+            },
+        )
+    else:
+        show_figure("what_if", (period, tuple(weekdays), holiday, weather_name, temp_c, humidity, windspeed), draw_what_if)
+
+    st.markdown("### Perbandingan Kondisi Cuaca")
+    show_table(pd.DataFrame({
+        "Perkiraan Peminjaman": totals.round(0),
+        "Perubahan vs Cerah (%)": change.round(1),
+        "Jam Data Latih": model.weather_hours,
+    }, index=pd.Index(WEATHER_NAMES, name="Kondisi Cuaca")))
+    st.caption(
+        f"Model dilatih pada {model.rows:,} jam data ({model.first_year}-{model.last_year}), "
+        f"R² log-skala {model.r_squared:.3f}. Kondisi cuaca dengan sedikit jam data memberi perkiraan yang kurang pasti."
+    )
+
+{"Dampak Cuaca": weather_tab, "Perbandingan Musim": season_tab,
+ "Casual vs Registered": user_type_tab, "Pola Per Jam": hourly_tab,
+ "Simulasi Permintaan": what_if_tab}[active_tab]()
+
+with st.sidebar.expander("Performa Grafik"):
+    for mode_label, mode in (("Matplotlib", "matplotlib"), ("Ringan", "klien")):
+        timings = render_cache.percentiles(mode)
+        if timings is not None:
+            st.caption(f"{mode_label}: p50 {timings[0] * 1000:.1f} ms, p95 {timings[1] * 1000:.1f} ms")
+    st.caption(
+        f"Cache: {len(render_cache)} gambar, {render_cache.bytes / 2**20:.1f} MB, "
+        f"hit {render_cache.hits} / miss {render_cache.misses}"
+    )
+
 # Add feature to download filtered data
 st.sidebar.markdown("### Download Data")
+export_formats = {"CSV": "csv", "CSV (gzip)": "csv.gz", "Parquet": "parquet", "Arrow IPC": "arrow"}
+export_format = export_formats[st.sidebar.selectbox("Format", list(export_formats))]
+export_level = st.sidebar.radio("Tingkat Data", ["Harian", "Per Jam"], horizontal=True)
+st.sidebar.caption(f"File disiapkan di server dulu; unduhan lewat browser dibatasi {export.MAX_DOWNLOAD_BYTES / 2**20:.0f} MB.")
 if st.sidebar.button("Download Data Terfilter"):
-    @st.cache_data
-    def convert_df_to_csv(df):
-        return df.to_
\ No newline at end of file
+    # The file is written chunk by chunk from the filter index and kept on disk
+    # under a short signature of the filter state, not cached as a DataFrame
+    export_aliases = {"count_day": count_measure}
+    if export_level == "Harian":
+        export_source = filter_index.frame
+        export_positions = export.position_chunks(df_filtered.positions)
+    else:
+        export_source = df_hourly
+        export_aliases["count_hour"] = count_measure.replace("_day", "_hour")
+        hourly_dates = df_hourly["dateday"].to_numpy()
+        selected_dates = filter_index.dates[df_filtered.positions].astype(hourly_dates.dtype)
+        export_positions = export.range_chunks(
+            np.searchsorted(hourly_dates, selected_dates, side="left"),
+            np.searchsorted(hourly_dates, selected_dates, side="right"),
+        )
+    month_column = "month_day" if export_level == "Harian" else "month_hour"
+
+    def export_rows(chunk):
+        chunk = chunk.assign(**{column: chunk[source] for column, source in export_aliases.items()})
+        return chunk.assign(Season=season_labels(chunk[month_column]))
+
+    export_key = export.signature(
+        dataset.digest, export_level, start_date, end_date, selected_weekdays, selected_weather_codes, count_measure
+    )
+    with profiler.stage("ekspor"):
+        export_path = export.export_file(
+            export_key, export_format, lambda: export.frame_chunks(export_source, export_positions, export_rows)
+        )
+    extension, mime = export.FORMATS[export_format]
+    export_size = os.path.getsize(export_path)
+    if export_size > export.MAX_DOWNLOAD_BYTES:
+        # The download button would load the whole file into server memory
+        st.sidebar.warning(
+            f"File {export_size / 2**20:.0f} MB melebihi batas unduhan "
+            f"{export.MAX_DOWNLOAD_BYTES / 2**20:.0f} MB. File tersimpan di {os.path.abspath(export_path)}; "
+            "persempit filter atau pilih CSV (gzip)/Parquet untuk mengunduh lewat browser."
+        )
+    else:
+        with open(export_path, "rb") as export_data:
+            st.sidebar.download_button(
+                f"Simpan {extension.upper()} ({export_size / 2**20:.1f} MB)",
+                data=export_data,
+                file_name=f"bike_sharing_filtered.{extension}",
+                mime=mime,
+            )
+
+profiler.end()
+
+# Debug panel: stage timings of the last runs and cache hit/miss counts
+st.sidebar.toggle("Panel Profiling", key="profiling")
+if profiler.enabled:
+    with st.sidebar.expander("Profiling", expanded=True):
+        st.caption(
+            f"{len(profiler.runs)} jalankan terakhir, ms per tahap. "
+            "Fragmen yang dijalankan ulang tampil setelah jalankan penuh berikutnya."
+        )
+        st.dataframe(profiler.history_frame().round(1), hide_index=True)
+        st.caption("Jalankan terakhir")
+        st.dataframe(profiler.stage_frame().round(2), hide_index=True)
+        cache_counts = dict(CACHES.snapshot())
+        cache_counts["LiveDataset.current"] = (live_dataset.hits, live_dataset.misses)
+        cache_counts["RenderCache"] = (render_cache.hits, render_cache.misses)
+        st.dataframe(
+            pd.DataFrame(
+                [(name, hits, misses) for name, (hits, misses) in cache_counts.items()],
+                columns=["Cache", "Hit", "Miss"],
+            ),
+            hide_index=True,
+        )
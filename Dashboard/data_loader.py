@@ -0,0 +1,141 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import columnar_cache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_DIR, "all_data.csv")
+HOUR_PATH = os.path.join(BASE_DIR, os.pardir, "Dataset", "hour.csv")
+DAY_PATH = os.path.join(BASE_DIR, os.pardir, "Dataset", "day.csv")
+
+MONTH_NAMES = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+]
+WEATHER_LABELS = [
+    "cerah/berawan",
+    "berawan dan berkabut",
+    "hujan/salju ringan",
+    "hujan/salju lebat",
+]
+
+MONTH_DTYPE = pd.CategoricalDtype(MONTH_NAMES, ordered=True)
+WEATHER_DTYPE = pd.CategoricalDtype(WEATHER_LABELS, ordered=True)
+
+# Explicit dtypes for all_data.csv: small ints for codes, float32 for the
+# normalised weather measures and fixed-order categoricals for the labels.
+DTYPES = {}
+for _suffix in ("hour", "day"):
+    DTYPES.update({
+        f"season_{_suffix}": "int8",
+        f"year_{_suffix}": "int16",
+        f"month_{_suffix}": MONTH_DTYPE,
+        f"holiday_{_suffix}": "int8",
+        f"weekday_{_suffix}": "int8",
+        f"workingday_{_suffix}": "int8",
+        f"weathersit_{_suffix}": WEATHER_DTYPE,
+        f"temp_{_suffix}": "float32",
+        f"atemp_{_suffix}": "float32",
+        f"humidity_{_suffix}": "float32",
+        f"windspeed_{_suffix}": "float32",
+        f"casual_{_suffix}": "int16",
+        f"registered_{_suffix}": "int16",
+        f"count_{_suffix}": "int16",
+    })
+DTYPES["hour"] = "int8"
+
+DAY_COLUMNS = [column for column in DTYPES if column.endswith("_day")]
+
+# Dtypes for the raw UCI files in Dataset/ (day.csv has no `hr` column)
+RAW_DTYPES = {
+    "instant": "int32",
+    "season": "int8",
+    "yr": "int8",
+    "mnth": "int8",
+    "hr": "int8",
+    "holiday": "int8",
+    "weekday": "int8",
+    "workingday": "int8",
+    "weathersit": "int8",
+    "temp": "float32",
+    "atemp": "float32",
+    "hum": "float32",
+    "windspeed": "float32",
+    "casual": "int16",
+    "registered": "int16",
+    "cnt": "int16",
+}
+
+
+def current_rss():
+    """Resident set size of this process in bytes (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _read_dated_csv(path, dtypes, date_column):
+    df = pd.read_csv(path, dtype={**dtypes, date_column: "category"})
+    # Every date repeats up to 24 times, so parse each distinct string once and broadcast
+    dates = df[date_column].cat
+    df[date_column] = pd.to_datetime(dates.categories, format="%Y-%m-%d").take(dates.codes)
+    return df
+
+
+def read_all_data(path=DATA_PATH):
+    """Read all_data.csv with compact dtypes and `dateday` as datetime64."""
+    return _read_dated_csv(path, DTYPES, "dateday")
+
+
+def read_hour_csv(path=HOUR_PATH):
+    """Read the raw Dataset/hour.csv with compact dtypes."""
+    return _read_dated_csv(path, RAW_DTYPES, "dteday")
+
+
+def read_day_csv(path=DAY_PATH):
+    """Read the raw Dataset/day.csv with compact dtypes."""
+    return _read_dated_csv(path, {k: v for k, v in RAW_DTYPES.items() if k != "hr"}, "dteday")
+
+
+def load_all_data(path=DATA_PATH, use_cache=True, cache_dir=columnar_cache.CACHE_DIR):
+    """Load all_data.csv and return ``(df, stats)`` with load time, frame size and process RSS.
+
+    With `use_cache` the columns come memory-mapped from the binary cache in
+    `columnar_cache`, which is rebuilt whenever the CSV's content changes.
+    """
+    rss_before = current_rss()
+    start = time.perf_counter()
+    df = columnar_cache.load(path, read_all_data, cache_dir) if use_cache else read_all_data(path)
+    elapsed = time.perf_counter() - start
+    rss_after = current_rss()
+    stats = {
+        "rows": len(df),
+        "load_seconds": elapsed,
+        "memory_bytes": int(df.memory_usage(deep=True).sum()),
+        "rss_bytes": rss_after,
+        "rss_delta_bytes": rss_after - rss_before,
+    }
+    return df, stats
+
+
+def daily_view(df):
+    """Collapse the hourly frame to one row per date with numeric day-level codes.
+
+    `month_day` becomes the month number (1-12) and `weathersit_day` the
+    original weather code (1-4), which is what the dashboard filters on.
+    """
+    daily = df.drop_duplicates("dateday")[["dateday"] + DAY_COLUMNS].reset_index(drop=True)
+    daily["month_day"] = (daily["month_day"].cat.codes + 1).astype(np.int8)
+    daily["weathersit_day"] = (daily["weathersit_day"].cat.codes + 1).astype(np.int8)
+    daily["date"] = daily["dateday"]
+    return daily
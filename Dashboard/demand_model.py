@@ -0,0 +1,229 @@
+"""Least-squares demand model behind the what-if tab.
+
+log1p(count_hour) is modelled as a linear function of
+
+* the hour of day separately for working and non-working days (the
+  commuting profile), the weekday and the weathersit code, one-hot against
+  hour 0 of a non-working day, Minggu and cerah;
+* temp, temp², humidity and windspeed, normalised as in all_data.csv;
+* the year, counted from the first one, for the growth between years.
+
+`fit` makes two chunked passes over the hourly frame. The first adds each
+chunk's XᵀX and Xᵀy to `NormalEquations`, so memory depends on the chunk
+size and not on the number of rows, and solves them once. The second
+averages exp(residual), Duan's smearing factor, which turns predictions of
+log1p(count) back into expected counts. `load_model` stores the result next
+to the columnar cache under all_data.csv's digest, so the dashboard fits
+once per data version; a what-if prediction is then one matrix product over
+the design rows of every scenario.
+
+    python demand_model.py --weather 3 --temp-c 15
+"""
+import argparse
+import os
+
+import numpy as np
+
+import columnar_cache
+from data_loader import DATA_PATH, load_all_data
+
+CHUNK_ROWS = 65536
+# Column layout of the design matrix
+PROFILE = 0        # 0: intercept, 1-47: hour * 2 + workingday
+WEEKDAY = 47       # 48-53: weekday 1-6
+WEATHER = 52       # 54-56: weathersit 2-4
+TEMP, TEMP_SQUARED, HUMIDITY, WINDSPEED, YEAR = 57, 58, 59, 60, 61
+FEATURES = 62
+# all_data.csv stores temp / 41 °C, humidity / 100 % and windspeed / 67 km/h
+TEMP_SCALE, HUMIDITY_SCALE, WINDSPEED_SCALE = 41.0, 100.0, 67.0
+
+
+def design(hour, weekday, workingday, weathersit, temp, humidity, windspeed, year):
+    """Design matrix, one row per hour; every argument is an array (or scalar) per row."""
+    hour, weekday, workingday, weathersit, temp, humidity, windspeed, year = np.broadcast_arrays(
+        hour, weekday, workingday, weathersit, temp, humidity, windspeed, year
+    )
+    rows = np.arange(hour.size)
+    matrix = np.zeros((hour.size, FEATURES))
+    matrix[rows, PROFILE + hour.ravel().astype(np.intp) * 2 + workingday.ravel().astype(np.intp)] = 1.0
+    # Reference levels land in column 0, which the intercept then overwrites
+    matrix[rows, np.where(weekday.ravel() > 0, WEEKDAY + weekday.ravel().astype(np.intp), 0)] = 1.0
+    matrix[rows, np.where(weathersit.ravel() > 1, WEATHER + weathersit.ravel().astype(np.intp), 0)] = 1.0
+    matrix[:, PROFILE] = 1.0
+    matrix[:, TEMP] = temp.ravel()
+    matrix[:, TEMP_SQUARED] = temp.ravel() ** 2
+    matrix[:, HUMIDITY] = humidity.ravel()
+    matrix[:, WINDSPEED] = windspeed.ravel()
+    matrix[:, YEAR] = year.ravel()
+    return matrix
+
+
+def frame_design(frame, first_year):
+    """Design matrix of hourly rows in all_data.csv's layout."""
+    return design(
+        frame["hour"].to_numpy(),
+        frame["weekday_hour"].to_numpy(),
+        frame["workingday_hour"].to_numpy(),
+        # weathersit_hour holds the labels; codes are 0-based
+        frame["weathersit_hour"].cat.codes.to_numpy() + 1,
+        frame["temp_hour"].to_numpy(dtype=np.float64),
+        frame["humidity_hour"].to_numpy(dtype=np.float64),
+        frame["windspeed_hour"].to_numpy(dtype=np.float64),
+        frame["dateday"].to_numpy().astype("datetime64[Y]").astype(np.int64) + 1970 - first_year,
+    )
+
+
+def _target(frame):
+    return np.log1p(frame["count_hour"].to_numpy(dtype=np.float64))
+
+
+class NormalEquations:
+    """Running XᵀX, Xᵀy, yᵀy, Σy and row count of a least-squares problem."""
+
+    def __init__(self, features=FEATURES):
+        self.xtx = np.zeros((features, features))
+        self.xty = np.zeros(features)
+        self.yty = 0.0
+        self.y_sum = 0.0
+        self.rows = 0
+
+    def add(self, matrix, target):
+        self.xtx += matrix.T @ matrix
+        self.xty += matrix.T @ target
+        self.yty += float(target @ target)
+        self.y_sum += float(target.sum())
+        self.rows += len(target)
+        return self
+
+    def solve(self):
+        # lstsq rather than solve: weekday and workingday are collinear when a
+        # history has no holidays on weekdays
+        return np.linalg.lstsq(self.xtx, self.xty, rcond=None)[0]
+
+    def r_squared(self, coefficients):
+        residual = self.yty - 2.0 * coefficients @ self.xty + coefficients @ self.xtx @ coefficients
+        total = self.yty - self.y_sum**2 / self.rows
+        return 1.0 - residual / total if total > 0 else float("nan")
+
+
+class DemandModel:
+    def __init__(self, coefficients, smearing, first_year, last_year, rows, r_squared, weather_hours):
+        self.coefficients = coefficients
+        self.smearing = smearing
+        self.first_year = first_year
+        self.last_year = last_year
+        self.rows = rows
+        self.r_squared = r_squared
+        # Training hours per weathersit code 1-4: a rare code's effect rests on few rows
+        self.weather_hours = weather_hours
+
+    def predict(self, matrix):
+        """Expected rentals per design row; `matrix` may carry leading batch axes."""
+        return np.maximum(np.expm1(matrix @ self.coefficients) * self.smearing, 0.0)
+
+    def scenarios(self, weekdays, weather_codes, temp_c, humidity_pct, windspeed_kmh, holiday=False):
+        """Design rows of shape ``(len(weather_codes), 24 * len(weekdays), FEATURES)``.
+
+        One scenario per weathersit code, each covering 24 hours of every
+        weekday in `weekdays` (0 = Minggu), at the latest year of the data.
+        """
+        weekdays = np.asarray(weekdays)
+        codes = np.asarray(weather_codes)[:, None]
+        hour = np.tile(np.arange(24), len(weekdays))[None, :]
+        weekday = np.repeat(weekdays, 24)[None, :]
+        workingday = ((weekday >= 1) & (weekday <= 5) & (not holiday)).astype(np.int64)
+        matrix = design(
+            hour, weekday, workingday, codes, temp_c / TEMP_SCALE, humidity_pct / HUMIDITY_SCALE,
+            windspeed_kmh / WINDSPEED_SCALE, self.last_year - self.first_year,
+        )
+        return matrix.reshape(len(codes), hour.shape[1], FEATURES)
+
+    def to_arrays(self):
+        return {
+            "coefficients": self.coefficients,
+            "smearing": np.float64(self.smearing),
+            "years": np.array([self.first_year, self.last_year]),
+            "rows": np.int64(self.rows),
+            "r_squared": np.float64(self.r_squared),
+            "weather_hours": self.weather_hours,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        first_year, last_year = (int(year) for year in arrays["years"])
+        return cls(
+            arrays["coefficients"], float(arrays["smearing"]), first_year, last_year,
+            int(arrays["rows"]), float(arrays["r_squared"]), arrays["weather_hours"],
+        )
+
+
+def _chunks(hourly, chunk_rows):
+    for start in range(0, len(hourly), chunk_rows):
+        yield hourly.iloc[start:start + chunk_rows]
+
+
+def fit(hourly, chunk_rows=CHUNK_ROWS):
+    """`DemandModel` of all_data.csv-style hourly rows, fitted `chunk_rows` at a time."""
+    if len(hourly) == 0:
+        raise ValueError("cannot fit the demand model without rows")
+    years = hourly["dateday"].to_numpy()[[0, -1]].astype("datetime64[Y]").astype(np.int64) + 1970
+    first_year, last_year = int(years.min()), int(years.max())
+    equations = NormalEquations()
+    for chunk in _chunks(hourly, chunk_rows):
+        equations.add(frame_design(chunk, first_year), _target(chunk))
+    coefficients = equations.solve()
+
+    exp_residuals = 0.0
+    for chunk in _chunks(hourly, chunk_rows):
+        exp_residuals += np.exp(_target(chunk) - frame_design(chunk, first_year) @ coefficients).sum()
+    # The diagonal of XᵀX counts the rows of each one-hot column
+    weather_hours = np.diag(equations.xtx)[WEATHER + 2:WEATHER + 5].astype(np.int64)
+    weather_hours = np.r_[equations.rows - weather_hours.sum(), weather_hours]
+    return DemandModel(
+        coefficients, exp_residuals / equations.rows, first_year, last_year,
+        equations.rows, equations.r_squared(coefficients), weather_hours,
+    )
+
+
+def model_path(path=DATA_PATH, cache_dir=columnar_cache.CACHE_DIR):
+    return os.path.join(cache_dir, os.path.basename(path) + ".model.npz")
+
+
+def load_model(path=DATA_PATH, hourly=None, cache_dir=columnar_cache.CACHE_DIR):
+    """`DemandModel` for the current `path`, fitted and stored when missing or stale."""
+    digest = columnar_cache.source_digest(path, cache_dir)
+    target = model_path(path, cache_dir)
+    try:
+        with np.load(target) as arrays:
+            if str(arrays["digest"]) == digest and arrays["coefficients"].shape == (FEATURES,):
+                # A file without a field this version stores raises KeyError and is refitted
+                return DemandModel.from_arrays(arrays)
+    except (OSError, KeyError, ValueError):
+        pass
+    if hourly is None:
+        hourly, _ = load_all_data(path, cache_dir=cache_dir)
+    model = fit(hourly)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp.npz"
+    np.savez(tmp, digest=np.array(digest), **model.to_arrays())
+    os.replace(tmp, target)
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--weather", type=int, choices=[1, 2, 3, 4], default=1)
+    parser.add_argument("--temp-c", type=float, default=20.0)
+    parser.add_argument("--humidity", type=float, default=60.0)
+    parser.add_argument("--windspeed", type=float, default=12.0)
+    args = parser.parse_args()
+
+    model = load_model()
+    print(f"{model.rows:,} hourly rows, {model.first_year}-{model.last_year}, R² (log1p) {model.r_squared:.3f}")
+    week = model.predict(model.scenarios(range(7), [args.weather], args.temp_c, args.humidity, args.windspeed))[0]
+    for weekday, day in enumerate(week.reshape(7, 24)):
+        print(f"  weekday {weekday}: {day.sum():8.0f} rentals, peak at {day.argmax():02d}:00")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Chunked export of the filtered rows for the sidebar download.
+
+Rows are gathered from the filter index a chunk at a time (`frame.take` on
+a slice of row positions) and written straight to a file, so exporting never
+materialises the whole filtered frame or the whole CSV text. CSV, gzipped
+CSV, Parquet (one row group per chunk) and Arrow IPC (one record batch per
+chunk) are supported; the last two need pyarrow, which Streamlit already
+depends on.
+
+Finished files are kept under ``.cache/exports`` named by a short digest of
+the filter state (`signature`), so repeating a download reuses the file
+instead of hashing and caching a full copy of the data per filter state.
+
+The file is only written after an explicit click ("Download Data
+Terfilter"), and a download button is only built for files up to
+`MAX_DOWNLOAD_BYTES`: Streamlit's download button reads the whole file into
+server memory and keeps it in its media file manager for the session.
+Larger exports stay on disk and the sidebar names the file instead.
+"""
+import gzip
+import hashlib
+import os
+
+import numpy as np
+
+import columnar_cache
+
+EXPORT_DIR = os.path.join(columnar_cache.CACHE_DIR, "exports")
+CHUNK_ROWS = 65536
+# Largest export handed to st.download_button, which holds it in memory
+MAX_DOWNLOAD_BYTES = 50 * 2**20
+# format -> (file extension, MIME type)
+FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "csv.gz": ("csv.gz", "application/gzip"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "arrow": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+
+def signature(*parts):
+    """Short digest of the values that determine an export's content."""
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def position_chunks(positions, chunk_rows=CHUNK_ROWS):
+    """Split an array of row positions into chunks of at most `chunk_rows`."""
+    for start in range(0, len(positions), chunk_rows):
+        yield positions[start:start + chunk_rows]
+
+
+def range_chunks(starts, stops, chunk_rows=CHUNK_ROWS):
+    """Row positions of the ranges ``[starts[i], stops[i])``, whole ranges per chunk.
+
+    Used for the hourly rows of the selected days: each day is one range of
+    the date-sorted hourly frame.
+    """
+    lengths = stops - starts
+    ends = np.cumsum(lengths)
+    first = 0
+    while first < len(starts):
+        # Take ranges until the chunk holds about `chunk_rows` rows
+        last = max(int(np.searchsorted(ends, ends[first] - lengths[first] + chunk_rows, side="right")), first + 1)
+        sizes = lengths[first:last]
+        offsets = np.repeat(starts[first:last] - np.cumsum(sizes) + sizes, sizes)
+        yield offsets + np.arange(sizes.sum())
+        first = last
+
+
+def frame_chunks(frame, chunks, transform=None):
+    """DataFrames of `frame` at each chunk of positions; at least one, possibly empty."""
+    empty = True
+    for positions in chunks:
+        empty = False
+        chunk = frame.take(positions).reset_index(drop=True)
+        yield chunk if transform is None else transform(chunk)
+    if empty:
+        chunk = frame.iloc[:0].reset_index(drop=True)
+        yield chunk if transform is None else transform(chunk)
+
+
+def write_chunks(chunks, fmt, target):
+    """Write DataFrame `chunks` to the binary file object `target` as `fmt`."""
+    if fmt in ("csv", "csv.gz"):
+        stream = gzip.GzipFile(fileobj=target, mode="wb", compresslevel=6, mtime=0) if fmt == "csv.gz" else target
+        try:
+            for number, chunk in enumerate(chunks):
+                stream.write(chunk.to_csv(index=False, header=number == 0).encode("utf-8"))
+        finally:
+            if stream is not target:
+                stream.close()
+        return
+    import pyarrow as pa
+
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                if fmt == "parquet":
+                    import pyarrow.parquet as pq
+
+                    writer = pq.ParquetWriter(target, table.schema)
+                elif fmt == "arrow":
+                    writer = pa.ipc.new_file(target, table.schema)
+                else:
+                    raise ValueError(f"unknown export format {fmt!r}")
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def export_file(key, fmt, make_chunks, export_dir=EXPORT_DIR, keep=8):
+    """Path of the `fmt` export for `key`, written from ``make_chunks()`` if missing.
+
+    Only the `keep` most recently used exports are kept on disk.
+    """
+    extension, _ = FORMATS[fmt]
+    path = os.path.join(export_dir, f"{key}.{extension}")
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+    os.makedirs(export_dir, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as target:
+            write_chunks(make_chunks(), fmt, target)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    exports = sorted(
+        (entry for entry in os.scandir(export_dir) if entry.is_file() and not entry.name.endswith(".tmp")),
+        key=lambda entry: entry.stat().st_mtime, reverse=True,
+    )
+    for entry in exports[keep:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+    return path
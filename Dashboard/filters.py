@@ -0,0 +1,163 @@
+"""Bitmap filter engine for the sidebar filters.
+
+`FilterIndex` is built once per dataset. It keeps the rows sorted by date,
+so a date range is a ``searchsorted`` slice, and it stores one packed bitmap
+(1 bit per row) for every value of each categorical filter column. Applying
+a filter ORs the bitmaps of the selected values, ANDs the columns together
+over the bytes covering the date slice, and yields a single array of row
+positions. Nothing is copied until a column is read through the resulting
+`FilteredView`.
+
+Rows, dates and bitmaps live in `buffers` storage, so `FilterIndex.extend`
+writes only the appended days.
+"""
+import numpy as np
+import pandas as pd
+
+from buffers import AppendBuffer, FrameBuffer
+
+FILTER_COLUMNS = ("weekday_day", "weathersit_day")
+
+
+class FilteredView:
+    """Read-only view of `frame` restricted to the row `positions`.
+
+    Columns are gathered lazily on first access. `aliases` maps a column
+    name to the column it should be read from, e.g. ``{"count_day":
+    "casual_day"}`` for the user-type filter, without touching the frame.
+    """
+
+    def __init__(self, index, positions, aliases=None):
+        self._index = index
+        self.positions = positions
+        self.aliases = dict(aliases or {})
+        self._columns = {}
+
+    @property
+    def columns(self):
+        return self._index.frame.columns
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, column):
+        if column not in self._columns:
+            source = self._index.frame[self.aliases.get(column, column)]
+            self._columns[column] = pd.Series(source.to_numpy()[self.positions], name=column)
+        return self._columns[column]
+
+    def restrict(self, column, values):
+        """Narrow the view to rows whose `column` is in `values`."""
+        keep = self._index.test(column, values, self.positions)
+        return FilteredView(self._index, self.positions[keep], self.aliases)
+
+    def to_frame(self):
+        """Materialise the view as a DataFrame (aliases applied)."""
+        return pd.DataFrame({column: self[column] for column in self.columns})
+
+
+class FilterIndex:
+    def __init__(self, df, date_column="date", columns=FILTER_COLUMNS):
+        if not df[date_column].is_monotonic_increasing:
+            df = df.sort_values(date_column, kind="stable")
+        self._rows = FrameBuffer(df)
+        self.frame = self._rows.frame
+        self.date_column = date_column
+        self._dates = AppendBuffer(self.frame[date_column].to_numpy().astype("datetime64[D]"))
+        self.dates = self._dates.values
+        self._bitmaps = {}
+        for column in columns:
+            values = self.frame[column].to_numpy()
+            self._bitmaps[column] = {value: AppendBuffer(np.packbits(values == value)) for value in np.unique(values).tolist()}
+        self.bitmaps = self._views()
+
+    def _views(self):
+        return {column: {value: buffer.values for value, buffer in bitmaps.items()} for column, bitmaps in self._bitmaps.items()}
+
+    def extend(self, df):
+        """Append rows dated after the last indexed date.
+
+        Each bitmap only has its trailing partial byte repacked, in place:
+        earlier views only unpack that byte's bits of their own rows, which
+        stay the same. Attributes are rebound rather than written in place,
+        so a shallow copy can be extended while the original is still read.
+        """
+        df = df.sort_values(self.date_column, kind="stable").reset_index(drop=True)
+        dates = df[self.date_column].to_numpy().astype("datetime64[D]")
+        if len(dates) == 0:
+            return self
+        if len(self.dates) and dates[0] <= self.dates[-1]:
+            raise ValueError("extend() only accepts dates after the last indexed date")
+        rows, used = len(self.frame), len(self.frame) % 8
+        bitmaps = {}
+        for column, column_bitmaps in self._bitmaps.items():
+            values = df[column].to_numpy()
+            bitmaps[column] = {}
+            for value in set(column_bitmaps) | set(np.unique(values).tolist()):
+                old = column_bitmaps.get(value)
+                if old is None:
+                    old = AppendBuffer(np.zeros((rows + 7) // 8, dtype=np.uint8))
+                bits = values == value
+                keep = None
+                if used:
+                    # Refill the last byte, whose low bits were padding
+                    bits = np.concatenate([np.unpackbits(old.values[-1:])[:used].astype(bool), bits])
+                    keep = len(old) - 1
+                bitmaps[column][value] = old.extend(np.packbits(bits), keep=keep)
+        self._rows = self._rows.extend(df[self.frame.columns])
+        self.frame = self._rows.frame
+        self._dates = self._dates.extend(dates)
+        self.dates = self._dates.values
+        self._bitmaps = bitmaps
+        self.bitmaps = self._views()
+        return self
+
+    def date_range(self, start, end):
+        """Row slice ``[lo, hi)`` of the dates in [start, end]."""
+        lo, hi = np.searchsorted(self.dates, [np.datetime64(start, "D"), np.datetime64(end, "D") + 1])
+        return int(lo), int(hi)
+
+    def _combined(self, column, values, byte_lo, byte_hi):
+        combined = np.zeros(byte_hi - byte_lo, dtype=np.uint8)
+        for value in values:
+            bitmap = self.bitmaps[column].get(value)
+            if bitmap is not None:
+                combined |= bitmap[byte_lo:byte_hi]
+        return combined
+
+    def positions(self, start, end, **filters):
+        """Row positions matching the date range and every ``column=values`` filter.
+
+        A filter value of ``None`` means "no restriction" for that column.
+        """
+        lo, hi = self.date_range(start, end)
+        filters = {column: values for column, values in filters.items() if values is not None}
+        if lo >= hi:
+            return np.arange(0)
+        if not filters:
+            return np.arange(lo, hi)
+
+        byte_lo, byte_hi = lo // 8, (hi + 7) // 8
+        mask = None
+        for column, values in filters.items():
+            combined = self._combined(column, values, byte_lo, byte_hi)
+            if mask is None:
+                mask = combined
+            else:
+                mask &= combined
+        offset = byte_lo * 8
+        bits = np.unpackbits(mask)[lo - offset:hi - offset]
+        return np.flatnonzero(bits) + lo
+
+    def test(self, column, values, positions):
+        """Boolean array telling which of `positions` have `column` in `values`."""
+        keep = np.zeros(len(positions), dtype=bool)
+        byte, shift = positions >> 3, 7 - (positions & 7)
+        for value in values:
+            bitmap = self.bitmaps[column].get(value)
+            if bitmap is not None:
+                keep |= ((bitmap[byte] >> shift) & 1).astype(bool)
+        return keep
+
+    def view(self, start, end, aliases=None, **filters):
+        return FilteredView(self, self.positions(start, end, **filters), aliases)
@@ -0,0 +1,178 @@
+"""Hour-of-day x weekday aggregation for the hourly drill-down tab.
+
+The hourly rows are folded once, with a single ``bincount`` over the integer
+code ``day * 24 + hour``, into dense ``(days, 24)`` matrices covering every
+calendar day between the first and last date. Because consecutive calendar
+days cycle through the weekdays, the rows of any date range reshape into
+``(weeks, 7, 24)`` and sum to the weekday x hour grid without a groupby.
+
+`HourlyDrilldown.grid` also remembers the last range it answered per
+measure; when only the date range moves, it adds and subtracts the days that
+entered and left the window instead of summing the whole range again.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from buffers import AppendBuffer
+
+MEASURES = ("count_hour", "casual_hour", "registered_hour")
+WEEKEND = (0, 6)
+
+
+def _day_ordinal(dates):
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+def _weekday(day_ordinal):
+    # 1970-01-01 was a Thursday; the dataset counts weekdays from Sunday = 0
+    return (day_ordinal + 4) % 7
+
+
+class HourlyDrilldown:
+    def __init__(self, hourly, date_column="dateday", hour_column="hour", measures=MEASURES):
+        days = _day_ordinal(hourly[date_column])
+        self.first_day = int(days.min())
+        self.n_days = int(days.max()) - self.first_day + 1
+        codes = (days - self.first_day) * 24 + np.asarray(hourly[hour_column], dtype=np.int64)
+        size = self.n_days * 24
+
+        self._sums = {
+            measure: AppendBuffer(np.bincount(codes, weights=np.asarray(hourly[measure]), minlength=size).reshape(self.n_days, 24))
+            for measure in measures
+        }
+        self._observed = AppendBuffer(np.bincount(codes, minlength=size).reshape(self.n_days, 24).astype(np.float64))
+        self._publish()
+        self.date_column, self.hour_column = date_column, hour_column
+        self.first_weekday = int(_weekday(self.first_day))
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def extend(self, hourly):
+        """Fold in hourly rows dated on or after the first day.
+
+        Days after the last calendar row are appended to the matrices'
+        `buffers` storage; only rows of days already present are copied and
+        rebuilt. The remembered windows are dropped. Attributes are rebound
+        rather than written in place, so a shallow copy can be extended while
+        the original is still read.
+        """
+        days = _day_ordinal(hourly[self.date_column])
+        if len(days) == 0:
+            return self
+        if days.min() < self.first_day:
+            raise ValueError("extend() only accepts days on or after the first day")
+        lo = int(days.min()) - self.first_day
+        n_days = max(self.n_days, int(days.max()) - self.first_day + 1)
+        codes = (days - self.first_day - lo) * 24 + np.asarray(hourly[self.hour_column], dtype=np.int64)
+        size = (n_days - lo) * 24
+
+        def grow(buffer, weights=None):
+            added = np.bincount(codes, weights=weights, minlength=size).reshape(n_days - lo, 24)
+            if lo >= self.n_days:
+                # Only new calendar rows, after a gap of days without any hour
+                return buffer.extend(np.concatenate([np.zeros((lo - self.n_days, 24)), added]))
+            matrix = buffer.values
+            tail = np.zeros((n_days - lo, 24))
+            tail[:self.n_days - lo] = matrix[lo:]
+            tail += added
+            return AppendBuffer(np.concatenate([matrix[:lo], tail]))
+
+        self._sums = {measure: grow(sums, np.asarray(hourly[measure])) for measure, sums in self._sums.items()}
+        self._observed = grow(self._observed)
+        self.n_days = n_days
+        self._publish()
+        self._last = {}
+        return self
+
+    def _publish(self):
+        self.sums = {measure: buffer.values for measure, buffer in self._sums.items()}
+        self.observed = self._observed.values
+
+    def day_range(self, start, end):
+        """Calendar row slice ``[lo, hi)`` for the dates in [start, end]."""
+        lo = int(np.datetime64(start, "D").astype(np.int64)) - self.first_day
+        hi = int(np.datetime64(end, "D").astype(np.int64)) - self.first_day + 1
+        return max(lo, 0), min(max(hi, 0), self.n_days)
+
+    def _fold(self, matrix, lo, hi):
+        """Sum calendar rows [lo, hi) of `matrix` into a (7, 24) weekday x hour grid."""
+        grid = np.zeros((7, 24))
+        if lo >= hi:
+            return grid
+        # Whole weeks starting on a Sunday reshape into (weeks, 7, 24) without a copy
+        aligned_lo = lo + (-(self.first_weekday + lo)) % 7
+        weeks = max(hi - aligned_lo, 0) // 7
+        aligned_hi = aligned_lo + 7 * weeks
+        if weeks:
+            grid += matrix[aligned_lo:aligned_hi].reshape(weeks, 7, 24).sum(axis=0)
+        # At most six leading and six trailing days remain
+        edges = np.r_[lo:min(aligned_lo, hi), max(aligned_hi, aligned_lo, lo):hi]
+        if len(edges):
+            np.add.at(grid, (self.first_weekday + edges) % 7, matrix[edges])
+        return grid
+
+    def _delta(self, matrix, old, new):
+        """Grid change when the window moves from `old` to `new` (both [lo, hi))."""
+        (old_lo, old_hi), (new_lo, new_hi) = old, new
+        change = np.zeros((7, 24))
+        if new_lo < old_lo:
+            change += self._fold(matrix, new_lo, old_lo)
+        elif new_lo > old_lo:
+            change -= self._fold(matrix, old_lo, new_lo)
+        if new_hi > old_hi:
+            change += self._fold(matrix, old_hi, new_hi)
+        elif new_hi < old_hi:
+            change -= self._fold(matrix, new_hi, old_hi)
+        return change
+
+    def grid(self, start, end, measure="count_hour"):
+        """``(sums, hours)`` weekday x hour grids for [start, end].
+
+        `sums` holds the total of `measure` per cell and `hours` how many
+        observed hourly rows fell in it, so ``sums / hours`` is the mean.
+        """
+        window = self.day_range(start, end)
+        with self._lock:
+            last = self._last.get(measure)
+        if last is not None:
+            previous, sums, hours = last
+            moved = abs(window[0] - previous[0]) + abs(window[1] - previous[1])
+            overlap = min(window[1], previous[1]) - max(window[0], previous[0])
+        if last is not None and overlap > 0 and moved < window[1] - window[0]:
+            sums = sums + self._delta(self.sums[measure], previous, window)
+            hours = hours + self._delta(self.observed, previous, window)
+        else:
+            sums = self._fold(self.sums[measure], *window)
+            hours = self._fold(self.observed, *window)
+        with self._lock:
+            self._last[measure] = (window, sums, hours)
+        return sums, hours
+
+    def mean_grid(self, start, end, measure="count_hour"):
+        """Mean rentals per hour as a (7, 24) array, NaN where no hour was observed."""
+        sums, hours = self.grid(start, end, measure)
+        return np.divide(sums, hours, out=np.full(sums.shape, np.nan), where=hours > 0)
+
+    def peak_hours(self, start, end, measure="count_hour", weekdays=None):
+        """Mean per hour of day for working days and weekends, plus the overall mean.
+
+        `weekdays` restricts which weekday rows (0 = Sunday) are included.
+        """
+        sums, hours = self.grid(start, end, measure)
+        if weekdays is not None:
+            keep = np.isin(np.arange(7), weekdays)
+            sums, hours = sums * keep[:, None], hours * keep[:, None]
+        weekend = np.isin(np.arange(7), WEEKEND)
+
+        def mean(rows):
+            total, count = sums[rows].sum(axis=0), hours[rows].sum(axis=0)
+            return np.divide(total, count, out=np.full(24, np.nan), where=count > 0)
+
+        return pd.DataFrame({
+            "Jam": np.arange(24),
+            "Hari Kerja": mean(~weekend),
+            "Akhir Pekan": mean(weekend),
+            "Semua Hari": mean(np.ones(7, dtype=bool)),
+        })
@@ -0,0 +1,315 @@
+"""Append new rental days to all_data.csv without rebuilding the full dataset.
+
+`append_days` takes rows in the format of Dataset/hour.csv and
+Dataset/day.csv (what the operational feed delivers), runs the notebook's
+cleaning and join on just those rows (`pipeline.join`) and appends the
+result to all_data.csv, to its columnar cache and to the summary tables.
+The dashboard's `LiveDataset` notices the append through the cache's
+lineage and folds only the new rows into its cube, filter index, hourly
+drill-down, prefix sums and anomaly baseline.
+
+`check_consistency` compares the incrementally maintained state with a full
+rebuild from the CSV.
+
+    python incremental.py new_hour.csv new_day.csv --check
+"""
+import argparse
+import copy
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import columnar_cache
+import pipeline
+from anomalies import AnomalyBaseline
+from cube import AggregateCube
+from data_loader import DATA_PATH, MONTH_NAMES, daily_view, load_all_data, read_all_data
+from filters import FilterIndex
+from hourly import HourlyDrilldown
+from prefix_sums import PrefixSums
+from transforms import MONTH_TO_SEASON, SEASONS
+
+STAT_COLUMNS = ["n", "sum", "sumsq", "min", "max"]
+
+
+class SummaryTables:
+    """Running count/sum/sum of squares/min/max of a daily measure per year, season and month.
+
+    These back the notebook's yearly max/min/mean/std table and the season
+    and month averages; `update` merges new days without revisiting old ones.
+    """
+
+    GROUPINGS = ("year", "season", "month")
+
+    def __init__(self, measure="count_day", stats=None):
+        self.measure = measure
+        self.stats = stats or {
+            grouping: pd.DataFrame(columns=STAT_COLUMNS, dtype=np.float64) for grouping in self.GROUPINGS
+        }
+
+    def update(self, daily):
+        """Merge the days of `daily` (as produced by `daily_view`)."""
+        values = daily[self.measure].to_numpy(dtype=np.float64)
+        months = daily["month_day"].to_numpy()
+        keys = {"year": daily["year_day"].to_numpy(), "season": MONTH_TO_SEASON[months], "month": months}
+        for grouping, key in keys.items():
+            codes, inverse = np.unique(key, return_inverse=True)
+            part = np.zeros((len(codes), len(STAT_COLUMNS)))
+            part[:, 0] = np.bincount(inverse, minlength=len(codes))
+            part[:, 1] = np.bincount(inverse, weights=values, minlength=len(codes))
+            part[:, 2] = np.bincount(inverse, weights=values**2, minlength=len(codes))
+            part[:, 3], part[:, 4] = np.inf, -np.inf
+            np.minimum.at(part[:, 3], inverse, values)
+            np.maximum.at(part[:, 4], inverse, values)
+
+            index = self.stats[grouping].index.union(codes)
+            merged = self.stats[grouping].reindex(index).to_numpy()
+            at = index.get_indexer(codes)
+            merged[at, :3] = np.nan_to_num(merged[at, :3]) + part[:, :3]
+            merged[at, 3] = np.fmin(merged[at, 3], part[:, 3])
+            merged[at, 4] = np.fmax(merged[at, 4], part[:, 4])
+            self.stats[grouping] = pd.DataFrame(merged, index=index, columns=STAT_COLUMNS)
+        return self
+
+    def _moments(self, grouping):
+        stats = self.stats[grouping]
+        mean = stats["sum"] / stats["n"]
+        variance = (stats["sumsq"] - stats["n"] * mean**2) / (stats["n"] - 1)
+        return stats, mean, np.sqrt(variance.clip(lower=0.0))
+
+    def yearly(self):
+        """max/min/mean/std per year, like ``day_df.groupby("year").agg(...)``."""
+        stats, mean, std = self._moments("year")
+        table = pd.DataFrame({"max": stats["max"], "min": stats["min"], "mean": mean, "std": std})
+        table.index = table.index.astype(int).rename("year")
+        return table
+
+    def season_means(self):
+        _, mean, _ = self._moments("season")
+        return pd.Series(mean.to_numpy(), index=[SEASONS[int(code)] for code in mean.index], name="mean")
+
+    def month_means(self):
+        _, mean, _ = self._moments("month")
+        return pd.Series(mean.to_numpy(), index=[MONTH_NAMES[int(code) - 1] for code in mean.index], name="mean")
+
+    def to_dict(self):
+        return {
+            "measure": self.measure,
+            "stats": {grouping: stats.reset_index().to_dict(orient="list") for grouping, stats in self.stats.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = {
+            grouping: pd.DataFrame(columns).set_index("index").rename_axis(None).astype(np.float64)
+            for grouping, columns in data["stats"].items()
+        }
+        return cls(data["measure"], stats)
+
+
+def summary_path(path=DATA_PATH, cache_dir=columnar_cache.CACHE_DIR):
+    return os.path.join(cache_dir, os.path.basename(path) + ".summary.json")
+
+
+def save_summary(tables, digest, path=DATA_PATH, cache_dir=columnar_cache.CACHE_DIR):
+    tmp = summary_path(path, cache_dir) + ".tmp"
+    with open(tmp, "w") as target:
+        json.dump({"digest": digest, **tables.to_dict()}, target)
+    os.replace(tmp, summary_path(path, cache_dir))
+
+
+def load_summary(path=DATA_PATH, cache_dir=columnar_cache.CACHE_DIR):
+    """Summary tables for the current `path`, rebuilt from its cache when stale."""
+    digest = columnar_cache.source_digest(path, cache_dir)
+    try:
+        with open(summary_path(path, cache_dir)) as source:
+            data = json.load(source)
+        if data["digest"] == digest:
+            return SummaryTables.from_dict(data)
+    except (OSError, ValueError, KeyError):
+        pass
+    hourly, _ = load_all_data(path, cache_dir=cache_dir)
+    tables = SummaryTables().update(daily_view(hourly))
+    save_summary(tables, digest, path, cache_dir)
+    return tables
+
+
+def append_days(hour, day, path=DATA_PATH, cache_dir=columnar_cache.CACHE_DIR):
+    """Append raw hour.csv/day.csv rows for days after the stored ones; returns the new rows.
+
+    The rows are cleaned and joined like the full pipeline, appended to the
+    CSV and its columnar cache, and merged into the summary tables.
+    Raises ValueError if a new date is not after the last stored date.
+    """
+    new = pipeline.join(hour, day).sort_values(["dateday", "hour"], kind="stable").reset_index(drop=True)
+    stored = columnar_cache.load(path, read_all_data, cache_dir)
+    if list(new.columns) != list(stored.columns):
+        raise ValueError("joined rows do not have all_data.csv's columns")
+    if new.empty:
+        return new
+    last = stored["dateday"].iloc[-1] if len(stored) else None
+    if last is not None and new["dateday"].iloc[0] <= last:
+        raise ValueError(f"new rows must start after {last:%Y-%m-%d}")
+
+    tables = load_summary(path, cache_dir)
+
+    def write_rows(target):
+        new.to_csv(target, mode="a", header=False, index=False, date_format="%Y-%m-%d")
+
+    columnar_cache.append(path, new, write_rows, read_all_data, cache_dir)
+    tables.update(daily_view(new))
+    save_summary(tables, columnar_cache.source_digest(path, cache_dir), path, cache_dir)
+    return new
+
+
+DatasetState = namedtuple(
+    "DatasetState",
+    "digest rows hourly daily stats cube filter_index drilldown prefix_sums anomalies incremental",
+)
+
+
+class LiveDataset:
+    """The dashboard's frames and indexes for one all_data.csv, kept current.
+
+    `current` reloads only when the file's digest changed; `hits` and
+    `misses` count the two cases. If the new cache lists the digest this
+    object was built from among its parents, only the appended rows are
+    folded into the cube, the filter index, the hourly drill-down, the
+    prefix sums and the anomaly baseline; otherwise everything is rebuilt. Each version is a
+    separate `DatasetState`, so a rerun still holding the previous one is
+    unaffected.
+    """
+
+    def __init__(self, path=DATA_PATH, cache_dir=columnar_cache.CACHE_DIR):
+        self.path = path
+        self.cache_dir = cache_dir
+        self._state = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def current(self):
+        with self._lock:
+            state = self._state
+            if state is not None and columnar_cache.source_digest(self.path, self.cache_dir) == state.digest:
+                self.hits += 1
+                return state
+            self.misses += 1
+            hourly, stats = load_all_data(self.path, cache_dir=self.cache_dir)
+            digest, rows, parents = columnar_cache.lineage(self.path, self.cache_dir)
+            if state is not None and state.digest in parents and rows >= state.rows:
+                try:
+                    self._state = self._extend(state, digest, hourly, stats)
+                    return self._state
+                except ValueError:
+                    pass
+            self._state = self._build(digest, hourly, stats)
+            return self._state
+
+    # The daily frame is the filter index's: its rows sit in append buffers,
+    # so an extended state does not copy the earlier days
+
+    @staticmethod
+    def _build(digest, hourly, stats):
+        daily = daily_view(hourly)
+        filter_index = FilterIndex(daily)
+        return DatasetState(
+            digest, len(hourly), hourly, filter_index.frame, dict(stats, update="full"),
+            AggregateCube(daily), filter_index, HourlyDrilldown(hourly), PrefixSums(daily),
+            AnomalyBaseline(hourly), False,
+        )
+
+    @staticmethod
+    def _extend(state, digest, hourly, stats):
+        new_hourly = hourly.iloc[state.rows:]
+        new_daily = daily_view(new_hourly)
+        filter_index = copy.copy(state.filter_index).extend(new_daily)
+        return DatasetState(
+            digest, len(hourly), hourly, filter_index.frame, dict(stats, update="incremental"),
+            copy.copy(state.cube).extend(new_daily),
+            filter_index,
+            copy.copy(state.drilldown).extend(new_hourly),
+            copy.copy(state.prefix_sums).extend(new_daily),
+            copy.copy(state.anomalies).extend(new_hourly),
+            True,
+        )
+
+
+def _merged_month_cells(cube):
+    """A cube's month cells merged by (month, weekday, weathersit), as ``(keys, stats)``."""
+    keys = np.column_stack([cube.month_keys, cube.month_dims[:, 1:]])
+    keys, groups = np.unique(keys, axis=0, return_inverse=True)
+    return keys, cube._merge(groups.ravel(), len(keys), cube.month_stats)
+
+
+def check_consistency(path=DATA_PATH, cache_dir=columnar_cache.CACHE_DIR, dataset=None):
+    """Compare the incremental state of `path` with a full rebuild; returns a list of mismatches."""
+    problems = []
+    fresh = read_all_data(path)
+    cached = columnar_cache.load(path, read_all_data, cache_dir)
+    if list(cached.columns) != list(fresh.columns) or len(cached) != len(fresh):
+        problems.append("cache: shape differs from the CSV")
+    else:
+        problems += [f"cache: column {column} differs" for column in fresh.columns if not cached[column].equals(fresh[column])]
+
+    daily = daily_view(fresh)
+    expected = SummaryTables().update(daily)
+    tables = load_summary(path, cache_dir)
+    for grouping in SummaryTables.GROUPINGS:
+        have, want = tables.stats[grouping], expected.stats[grouping]
+        if not (have.index.equals(want.index) and np.allclose(have.to_numpy(), want.to_numpy(), rtol=1e-12)):
+            problems.append(f"summary: {grouping} differs")
+
+    if dataset is not None:
+        state = dataset.current()
+        (have_keys, have), (want_keys, want) = _merged_month_cells(state.cube), _merged_month_cells(AggregateCube(daily))
+        if not np.array_equal(have_keys, want_keys) or any(
+            not np.allclose(have[name], want[name]) for name in STAT_COLUMNS
+        ) or not np.array_equal(have["hist"], want["hist"]):
+            problems.append("dashboard: cube month cells differ")
+        index = FilterIndex(daily)
+        if any(
+            state.filter_index.bitmaps[column].keys() != bitmaps.keys()
+            or any(not np.array_equal(state.filter_index.bitmaps[column][value], bitmap) for value, bitmap in bitmaps.items())
+            for column, bitmaps in index.bitmaps.items()
+        ):
+            problems.append("dashboard: filter bitmaps differ")
+        drilldown = HourlyDrilldown(fresh)
+        if not all(np.allclose(state.drilldown.sums[m], drilldown.sums[m]) for m in drilldown.sums):
+            problems.append("dashboard: hourly drill-down differs")
+        prefix_sums = PrefixSums(daily)
+        if not all(
+            np.array_equal(have, want)
+            for have, want in zip(state.prefix_sums.stratum_dates + state.prefix_sums.stratum_sums,
+                                  prefix_sums.stratum_dates + prefix_sums.stratum_sums)
+        ):
+            problems.append("dashboard: prefix sums differ")
+        baseline = AnomalyBaseline(fresh)
+        if not all(np.array_equal(have, want) for have, want in zip(state.anomalies.stats(), baseline.stats())):
+            problems.append("dashboard: anomaly baseline differs")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("hour", help="new rows in Dataset/hour.csv format")
+    parser.add_argument("day", help="new rows in Dataset/day.csv format")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--check", action="store_true", help="compare with a full rebuild afterwards")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    new = append_days(pd.read_csv(args.hour), pd.read_csv(args.day), args.data)
+    print(f"{len(new):,} rows appended to {args.data} in {(time.perf_counter() - start) * 1000:.0f} ms")
+    if args.check:
+        problems = check_consistency(args.data)
+        print("\n".join(problems) if problems else "consistent with a full rebuild")
+
+
+if __name__ == "__main__":
+    main()
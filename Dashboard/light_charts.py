@@ -0,0 +1,120 @@
+"""Summary data and Vega-Lite specs for the lightweight chart mode.
+
+Instead of rasterizing seaborn figures on the server, the light mode sends
+small precomputed summaries (box-plot quartiles, KDE grids, histogram bins,
+group means) to Streamlit's client-side Vega-Lite renderer. The payload size
+depends on the number of groups and grid points, not on the number of rows.
+"""
+import numpy as np
+import pandas as pd
+
+
+def box_stats(frame, group, value):
+    """Quartiles and 1.5 IQR whiskers per group, as seaborn's box plot draws them."""
+    rows = []
+    for name, values in frame.groupby(group, observed=True)[value]:
+        values = values.to_numpy(dtype=np.float64)
+        q1, median, q3 = np.percentile(values, [25, 50, 75])
+        reach = 1.5 * (q3 - q1)
+        inside = values[(values >= q1 - reach) & (values <= q3 + reach)]
+        rows.append({
+            group: name, "lower": inside.min(), "q1": q1, "median": median, "q3": q3, "upper": inside.max(),
+        })
+    return pd.DataFrame(rows, columns=[group, "lower", "q1", "median", "q3", "upper"])
+
+
+def box_spec(group, title, y_title):
+    """Layered Vega-Lite box plot over the columns produced by `box_stats`."""
+    x = {"field": group, "type": "nominal", "sort": None, "title": group}
+    return {
+        "title": title,
+        "encoding": {"x": x},
+        "layer": [
+            {
+                "mark": "rule",
+                "encoding": {
+                    "y": {"field": "lower", "type": "quantitative", "title": y_title},
+                    "y2": {"field": "upper"},
+                },
+            },
+            {
+                "mark": {"type": "bar", "size": 40},
+                "encoding": {
+                    "y": {"field": "q1", "type": "quantitative"},
+                    "y2": {"field": "q3"},
+                    "color": {"field": group, "type": "nominal", "sort": None, "legend": None},
+                },
+            },
+            {
+                "mark": {"type": "tick", "color": "white", "size": 40},
+                "encoding": {"y": {"field": "median", "type": "quantitative"}},
+            },
+        ],
+    }
+
+
+def category_spec(mark, x, y, title, x_title=None, y_title=None, color=None):
+    """Bar or line chart that keeps the data's row order on the x axis."""
+    encoding = {
+        "x": {"field": x, "type": "nominal", "sort": None, "title": x_title or x},
+        "y": {"field": y, "type": "quantitative", "title": y_title or y},
+    }
+    if color is not None:
+        encoding["color"] = {"field": color, "type": "nominal", "sort": None}
+    return {"title": title, "mark": {"type": "line", "point": True} if mark == "line" else mark, "encoding": encoding}
+
+
+def histogram(values, bins=30):
+    """Histogram bin centres and counts of `values`."""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return pd.DataFrame({"Jumlah Peminjaman": [], "Frekuensi": []})
+    counts, edges = np.histogram(values, bins=bins)
+    return pd.DataFrame({"Jumlah Peminjaman": (edges[:-1] + edges[1:]) / 2, "Frekuensi": counts})
+
+
+def kde_grid(values, grid=None, grid_size=256):
+    """Gaussian KDE of `values` on a grid, via a binned histogram convolution.
+
+    Binning first keeps the cost at O(rows + grid_size^2) instead of
+    O(rows * grid_size), with Scott's rule for the bandwidth like seaborn.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if grid is None:
+        span = values.max() - values.min() if len(values) else 1.0
+        grid = np.linspace(values.min() - 0.1 * span, values.max() + 0.1 * span, grid_size) if len(values) else np.zeros(0)
+    if len(values) < 2 or values.std() == 0:
+        return grid, np.zeros(len(grid))
+    bandwidth = values.std(ddof=1) * len(values) ** (-1 / 5)
+    step = grid[1] - grid[0]
+    edges = np.append(grid - step / 2, grid[-1] + step / 2)
+    counts, _ = np.histogram(values, bins=edges)
+    offsets = (grid[:, None] - grid[None, :]) / bandwidth
+    density = np.exp(-0.5 * offsets**2) @ counts / (len(values) * bandwidth * np.sqrt(2 * np.pi))
+    return grid, density
+
+
+def density_by_group(frame, group, value, grid_size=128):
+    """Long frame of per-group KDE curves on a shared grid (violin replacement)."""
+    values = frame[value].to_numpy(dtype=np.float64)
+    if len(values) == 0:
+        return pd.DataFrame({value: [], "Densitas": [], group: []})
+    span = max(values.max() - values.min(), 1.0)
+    grid = np.linspace(values.min() - 0.1 * span, values.max() + 0.1 * span, grid_size)
+    parts = []
+    for name, group_values in frame.groupby(group, observed=True)[value]:
+        _, density = kde_grid(group_values.to_numpy(), grid=grid)
+        parts.append(pd.DataFrame({value: grid, "Densitas": density, group: name}))
+    return pd.concat(parts, ignore_index=True)
+
+
+def strip_sample(frame, group, max_points=500, seed=0):
+    """At most `max_points` rows per group, so strip plots ship bounded data."""
+    rng = np.random.default_rng(seed)
+    keep = [
+        rows if len(rows) <= max_points else rng.choice(rows, max_points, replace=False)
+        for rows in frame.groupby(group, observed=True).indices.values()
+    ]
+    if not keep:
+        return frame.iloc[:0]
+    return frame.iloc[np.sort(np.concatenate(keep))].reset_index(drop=True)
@@ -0,0 +1,282 @@
+"""Aggregates over the month partitions, computed in a process pool and merged exactly.
+
+Each task reads a run of consecutive partitions (`partitions.PartitionedDataset.ranges`)
+and reduces it to a `PartialAggregate`: per group, the count, sum, sum of
+squares, min, max and a histogram with one bin per integer value of each
+measure. Partials of disjoint rows merge by adding counts, sums and
+histograms, and the measures are integer rental counts, so the float64 sums
+are exact and the merged result does not depend on how the rows were split
+or in which order the partials were merged. Quantiles read off the
+histograms equal pandas' linearly interpolated ones.
+
+The tasks run in a `ProcessPoolExecutor`. Workers memory-map the partition
+files themselves, so only directory names and row ranges are sent to them
+and only the partials come back; ``workers=1`` runs the same tasks in this
+process.
+
+    python parallel_agg.py --level daily --by year --workers 4 --check
+"""
+import argparse
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import columnar_cache
+from partitions import DATE_COLUMN, LEVELS, open_partitions
+from transforms import MONTH_TO_SEASON, SEASONS
+
+MEASURES = ("count", "casual", "registered")
+GROUPINGS = ("year", "season", "month", "weekday", "weathersit", "workingday", "holiday", "hour")
+# More tasks than workers, so one slow partition run does not idle the others
+TASKS_PER_WORKER = 4
+
+
+def column_name(name, level):
+    """all_data.csv column of measure or grouping `name` at `level`."""
+    return name if name == "hour" else f"{name}_{'hour' if level == 'hourly' else 'day'}"
+
+
+class PartialAggregate:
+    """Per-group count, sum, sum of squares, min, max and histogram of integer measures.
+
+    `codes` are the sorted group codes; `sums`, `sumsq`, `minimum` and
+    `maximum` have one column per measure, and ``hist[m][g, v]`` counts the
+    rows of group ``g`` whose measure ``m`` equals ``v``.
+    """
+
+    def __init__(self, measures, codes, n, sums, sumsq, minimum, maximum, hist):
+        self.measures = tuple(measures)
+        self.codes = codes
+        self.n = n
+        self.sums = sums
+        self.sumsq = sumsq
+        self.minimum = minimum
+        self.maximum = maximum
+        self.hist = hist
+
+    @classmethod
+    def empty(cls, measures):
+        size = len(measures)
+        return cls(
+            measures, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+            np.zeros((0, size)), np.zeros((0, size)),
+            np.zeros((0, size), dtype=np.int64), np.zeros((0, size), dtype=np.int64),
+            [np.zeros((0, 0), dtype=np.int64) for _ in measures],
+        )
+
+    @classmethod
+    def from_rows(cls, measures, keys, values):
+        """Aggregate ``values[:, m]`` (non-negative integers) per distinct `keys`."""
+        if len(keys) == 0:
+            return cls.empty(measures)
+        if values.min() < 0:
+            raise ValueError("measures must be non-negative integers")
+        codes, inverse = np.unique(keys, return_inverse=True)
+        size = len(codes)
+        n = np.bincount(inverse, minlength=size)
+        sums = np.zeros((size, len(measures)))
+        sumsq = np.zeros((size, len(measures)))
+        hist = []
+        for m in range(len(measures)):
+            column = values[:, m]
+            weights = column.astype(np.float64)
+            sums[:, m] = np.bincount(inverse, weights=weights, minlength=size)
+            sumsq[:, m] = np.bincount(inverse, weights=weights * weights, minlength=size)
+            width = int(column.max()) + 1
+            hist.append(np.bincount(inverse * width + column, minlength=size * width).reshape(size, width))
+        minimum, maximum = cls._bounds(hist)
+        return cls(measures, codes, n, sums, sumsq, minimum, maximum, hist)
+
+    @staticmethod
+    def _bounds(hist):
+        # Smallest and largest value with a non-zero bin, per group and measure
+        present = [counts > 0 for counts in hist]
+        minimum = np.stack([mask.argmax(axis=1) for mask in present], axis=1)
+        maximum = np.stack([mask.shape[1] - 1 - mask[:, ::-1].argmax(axis=1) for mask in present], axis=1)
+        return minimum.astype(np.int64), maximum.astype(np.int64)
+
+    def merge(self, other):
+        """Partial of the rows of both; neither input is modified."""
+        if self.measures != other.measures:
+            raise ValueError("cannot merge partials of different measures")
+        codes = np.union1d(self.codes, other.codes)
+        ours, theirs = np.searchsorted(codes, self.codes), np.searchsorted(codes, other.codes)
+        size = len(codes)
+
+        def added(a, b, shape, dtype):
+            total = np.zeros(shape, dtype=dtype)
+            total[ours] += a
+            total[theirs] += b
+            return total
+
+        n = added(self.n, other.n, size, np.int64)
+        sums = added(self.sums, other.sums, (size, len(self.measures)), np.float64)
+        sumsq = added(self.sumsq, other.sumsq, (size, len(self.measures)), np.float64)
+        hist = []
+        for a, b in zip(self.hist, other.hist):
+            counts = np.zeros((size, max(a.shape[1], b.shape[1])), dtype=np.int64)
+            counts[ours, :a.shape[1]] += a
+            counts[theirs, :b.shape[1]] += b
+            hist.append(counts)
+        minimum = np.full((size, len(self.measures)), np.iinfo(np.int64).max)
+        maximum = np.full((size, len(self.measures)), np.iinfo(np.int64).min)
+        minimum[ours], maximum[ours] = self.minimum, self.maximum
+        minimum[theirs] = np.minimum(minimum[theirs], other.minimum)
+        maximum[theirs] = np.maximum(maximum[theirs], other.maximum)
+        return PartialAggregate(self.measures, codes, n, sums, sumsq, minimum, maximum, hist)
+
+    def quantile(self, measure, q):
+        """Quantile `q` per group, interpolated like ``Series.quantile``."""
+        counts = self.hist[self.measures.index(measure)]
+        cumulative = np.cumsum(counts, axis=1)
+        position = q * (self.n - 1)
+        lo, hi = np.floor(position).astype(np.int64), np.ceil(position).astype(np.int64)
+        values = np.full(len(self.codes), np.nan)
+        for g in np.flatnonzero(self.n > 0):
+            # The k-th smallest value (0-based) is the first bin whose cumulative count exceeds k
+            below, above = np.searchsorted(cumulative[g], [lo[g], hi[g]], side="right")
+            values[g] = below + (above - below) * (position[g] - lo[g])
+        return values
+
+    def table(self, measure, quantiles=(0.25, 0.5, 0.75)):
+        """count/sum/mean/std/min/max and quantiles of `measure` per group code."""
+        m = self.measures.index(measure)
+        n = self.n.astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.sums[:, m] / n
+            variance = (self.sumsq[:, m] - n * mean**2) / (n - 1)
+        table = pd.DataFrame({
+            "count": self.n,
+            "sum": self.sums[:, m],
+            "mean": mean,
+            "std": np.sqrt(np.maximum(variance, 0.0)),
+            "min": self.minimum[:, m],
+            "max": self.maximum[:, m],
+        }, index=pd.Index(self.codes, name="group"))
+        for q in quantiles:
+            table[f"q{int(q * 100)}"] = self.quantile(measure, q)
+        return table
+
+
+def _key_column(by, level):
+    if by == "year":
+        return DATE_COLUMN
+    # Season comes from the month, as in `SummaryTables` and the cube
+    return column_name("month" if by == "season" else by, level)
+
+
+def group_keys(frame, by, level):
+    """Group code of each row of `frame`: calendar year, index into SEASONS or the stored code."""
+    if by is None:
+        return np.zeros(len(frame), dtype=np.int64)
+    values = frame[_key_column(by, level)]
+    if by == "year":
+        return values.to_numpy().astype("datetime64[Y]").astype(np.int64) + 1970
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # month_hour/weathersit_hour are stored as labels; their codes are 0-based
+        keys = values.cat.codes.to_numpy().astype(np.int64) + 1
+    else:
+        keys = values.to_numpy().astype(np.int64)
+    return MONTH_TO_SEASON[keys].astype(np.int64) if by == "season" else keys
+
+
+def reduce_ranges(ranges, level="daily", by=None, measures=MEASURES):
+    """`PartialAggregate` of the partition row `ranges` (one task)."""
+    if not ranges:
+        return PartialAggregate.empty(measures)
+    columns = {column_name(measure, level) for measure in measures}
+    if by is not None:
+        columns.add(_key_column(by, level))
+    frame = columnar_cache.read_ranges(ranges, columns)
+    values = np.stack([frame[column_name(measure, level)].to_numpy().astype(np.int64) for measure in measures], axis=1)
+    return PartialAggregate.from_rows(measures, group_keys(frame, by, level), values)
+
+
+def split_ranges(ranges, tasks):
+    """Cut `ranges` into at most `tasks` runs of consecutive ranges with similar row counts."""
+    if not ranges:
+        return []
+    rows = np.cumsum([stop - start for _, start, stop in ranges])
+    bounds = np.searchsorted(rows, rows[-1] * np.arange(1, tasks) / tasks, side="left") + 1
+    bounds = np.unique(np.r_[0, np.minimum(bounds, len(ranges)), len(ranges)])
+    return [ranges[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def aggregate(dataset, start=None, end=None, level="daily", by=None, measures=MEASURES, workers=None):
+    """`PartialAggregate` of `measures` per `by` group over the rows of `dataset` dated in [start, end].
+
+    `dataset` is a `partitions.PartitionedDataset`; the range defaults to
+    everything stored. `by` is one of `GROUPINGS` (``"hour"`` only for the
+    hourly level) or None for one total. `workers` defaults to the number
+    of CPUs.
+    """
+    if by is not None and by not in GROUPINGS:
+        raise ValueError(f"unknown grouping {by!r}")
+    if by == "hour" and level != "hourly":
+        raise ValueError("grouping by hour needs the hourly level")
+    workers = workers or os.cpu_count() or 1
+    if start is None:
+        start = dataset.min_dates[level][0] if len(dataset.min_dates[level]) else np.datetime64("1970-01-01")
+    if end is None:
+        end = dataset.max_dates[level][-1] if len(dataset.max_dates[level]) else start
+    tasks = split_ranges(dataset.ranges(start, end, level), workers * TASKS_PER_WORKER)
+    reduce = functools.partial(reduce_ranges, level=level, by=by, measures=tuple(measures))
+    if workers == 1 or len(tasks) <= 1:
+        partials = map(reduce, tasks)
+    else:
+        with ProcessPoolExecutor(min(workers, len(tasks))) as pool:
+            partials = list(pool.map(reduce, tasks))
+    return functools.reduce(PartialAggregate.merge, partials, PartialAggregate.empty(tuple(measures)))
+
+
+def describe(partial, measure):
+    """``Series.describe()`` of `measure` over all rows of an ungrouped partial."""
+    row = partial.table(measure).iloc[0]
+    return pd.Series(
+        [row["count"], row["mean"], row["std"], row["min"], row["q25"], row["q50"], row["q75"], row["max"]],
+        index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"], name=measure, dtype=np.float64,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--level", choices=LEVELS, default="daily")
+    parser.add_argument("--by", choices=GROUPINGS)
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--check", action="store_true", help="compare with a serial run and with pandas")
+    args = parser.parse_args()
+
+    dataset = open_partitions()
+    result = aggregate(dataset, args.start, args.end, args.level, args.by, workers=args.workers)
+    labels = {"season": SEASONS}.get(args.by)
+    for measure in MEASURES:
+        table = result.table(measure)
+        if labels is not None:
+            table.index = [labels[code] for code in table.index]
+        print(f"{column_name(measure, args.level)}:\n{table.to_string()}\n")
+    if not args.check:
+        return
+
+    serial = aggregate(dataset, args.start, args.end, args.level, args.by, workers=1)
+    same = all(result.table(measure).equals(serial.table(measure)) for measure in MEASURES)
+    print(f"parallel == serial: {same}")
+    start = args.start or dataset.min_dates[args.level][0]
+    end = args.end or dataset.max_dates[args.level][-1]
+    frame = dataset.read(start, end, args.level)
+    keys = group_keys(frame, args.by, args.level)
+    for measure in MEASURES:
+        column = column_name(measure, args.level)
+        expected = frame[column].astype(np.int64).groupby(keys).agg(["count", "sum", "mean", "std", "min", "max"])
+        expected["q50"] = frame[column].astype(np.int64).groupby(keys).median()
+        table = result.table(measure)[expected.columns]
+        ok = np.allclose(table.to_numpy(np.float64), expected.to_numpy(np.float64), rtol=1e-9, equal_nan=True)
+        print(f"{column} matches pandas: {ok}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Year/month partitioned copy of all_data.csv for date-range reads.
+
+The hourly rows and their daily view (`data_loader.daily_view`) are stored
+as one columnar directory per calendar month, rows sorted by date::
+
+    .cache/all_data.csv.parts/
+        partitions.json       source digest, row count and, per level, the
+                              month keys, min/max dates and row counts
+        hourly/2011-01/       `columnar_cache` directory
+        daily/2011-01/
+
+A date-range read opens only the partitions whose [min, max] dates overlap
+the range and cuts the first and last of them with ``searchsorted`` on the
+sorted datetime64 column, so reading one month maps one month of columns no
+matter how many years are stored. When all_data.csv only grew by appended
+days (see `incremental`), the partitions are extended instead of rebuilt.
+
+partitions.json is the record of what is committed: it is replaced last, and
+its per-partition row counts are where an extend writes and where reads
+stop. An extend that fails halfway (hourly done, daily not, or the manifest
+not replaced) leaves rows past those counts; the next extend starts from the
+same counts and writes over them, so no row is stored twice.
+
+    python partitions.py --start 2012-03-01 --end 2012-03-31 --level daily
+"""
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import columnar_cache
+from data_loader import DATA_PATH, daily_view, read_all_data
+
+METADATA = "partitions.json"
+LEVELS = ("hourly", "daily")
+DATE_COLUMN = "dateday"
+
+
+def parts_path(path=DATA_PATH, cache_dir=columnar_cache.CACHE_DIR):
+    return os.path.join(cache_dir, os.path.basename(path) + ".parts")
+
+
+def _months(df):
+    """Yield ``(key, rows)`` per calendar month of a frame sorted by `DATE_COLUMN`."""
+    months = df[DATE_COLUMN].to_numpy().astype("datetime64[M]")
+    bounds = np.flatnonzero(months[1:] != months[:-1]) + 1
+    for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(df)]):
+        yield str(months[lo]), df.iloc[lo:hi]
+
+
+FIELDS = ("key", "min_date", "max_date", "rows")
+
+
+def _add_entry(entries, key, part):
+    # Metadata is stored column-wise (one list per field), which keeps
+    # partitions.json quick to parse with thousands of months
+    dates = part[DATE_COLUMN].to_numpy()
+    entries["key"].append(key)
+    entries["min_date"].append(str(dates[0].astype("datetime64[D]")))
+    entries["max_date"].append(str(dates[-1].astype("datetime64[D]")))
+    entries["rows"].append(len(part))
+
+
+def _levels(hourly):
+    if not hourly[DATE_COLUMN].is_monotonic_increasing:
+        hourly = hourly.sort_values(DATE_COLUMN, kind="stable")
+    return {"hourly": hourly, "daily": daily_view(hourly)}
+
+
+def _write_metadata(root, meta):
+    tmp = os.path.join(root, METADATA + ".tmp")
+    with open(tmp, "w") as target:
+        json.dump(meta, target)
+    os.replace(tmp, os.path.join(root, METADATA))
+
+
+def write_partitions(hourly, root, digest=""):
+    """Partition `hourly` (all_data.csv's layout) by month under `root`."""
+    tmp = root + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    meta = {"digest": digest, "rows": len(hourly)}
+    for level, frame in _levels(hourly).items():
+        meta[level] = {field: [] for field in FIELDS}
+        for key, part in _months(frame):
+            columnar_cache.write_columns(part, os.path.join(tmp, level, key))
+            _add_entry(meta[level], key, part)
+    os.makedirs(tmp, exist_ok=True)
+    _write_metadata(tmp, meta)
+    shutil.rmtree(root, ignore_errors=True)
+    os.replace(tmp, root)
+
+
+def extend_partitions(new_hourly, root, digest):
+    """Add hourly rows dated after everything stored under `root`.
+
+    The last month is appended to after the row count recorded in
+    partitions.json, not its own manifest's, and later months are written
+    as new partitions; partitions.json is replaced last. Raises ValueError
+    if a new row is not after the stored maximum date.
+    """
+    with open(os.path.join(root, METADATA)) as source:
+        meta = json.load(source)
+    levels = _levels(new_hourly) if len(new_hourly) else {}
+    last = meta["hourly"]["max_date"][-1] if meta["hourly"]["key"] else None
+    if levels and last is not None and levels["hourly"][DATE_COLUMN].iloc[0] <= pd.Timestamp(last):
+        raise ValueError(f"new rows must start after {last}")
+    for level, frame in levels.items():
+        entries = meta[level]
+        for key, part in _months(frame):
+            target = os.path.join(root, level, key)
+            if entries["key"] and entries["key"][-1] == key:
+                columnar_cache.append_columns(target, part, at=entries["rows"][-1])
+                entries["max_date"][-1] = str(part[DATE_COLUMN].to_numpy()[-1].astype("datetime64[D]"))
+                entries["rows"][-1] += len(part)
+            else:
+                columnar_cache.write_columns(part, target)
+                _add_entry(entries, key, part)
+    meta.update(digest=digest, rows=meta["rows"] + len(new_hourly))
+    _write_metadata(root, meta)
+
+
+class PartitionedDataset:
+    def __init__(self, root):
+        self.root = root
+        with open(os.path.join(root, METADATA)) as source:
+            self.meta = json.load(source)
+        self.min_dates = {level: np.array(self.meta[level]["min_date"], dtype="datetime64[D]") for level in LEVELS}
+        self.max_dates = {level: np.array(self.meta[level]["max_date"], dtype="datetime64[D]") for level in LEVELS}
+
+    def partitions(self, start, end, level="hourly"):
+        """``(key, min_date, max_date, rows)`` of the partitions overlapping [start, end]."""
+        start, end = np.datetime64(start, "D"), np.datetime64(end, "D")
+        # Partitions are disjoint and sorted, so both bounds are a binary search
+        lo = np.searchsorted(self.max_dates[level], start, side="left")
+        hi = np.searchsorted(self.min_dates[level], end, side="right")
+        entries = self.meta[level]
+        return [
+            (entries["key"][i], self.min_dates[level][i], self.max_dates[level][i], entries["rows"][i])
+            for i in range(lo, hi)
+        ]
+
+    def ranges(self, start, end, level="hourly"):
+        """``(directory, start row, stop row)`` per partition overlapping [start, end]."""
+        start, end = np.datetime64(start, "D"), np.datetime64(end, "D")
+        ranges = []
+        for key, min_date, max_date, rows in self.partitions(start, end, level):
+            directory = os.path.join(self.root, level, key)
+            lo, hi = 0, rows
+            if min_date < start or max_date > end:
+                # Only the rows partitions.json counts; a failed extend may have left more
+                dates = columnar_cache.read_columns(directory, {DATE_COLUMN})[DATE_COLUMN].to_numpy()[:rows]
+                lo, hi = np.searchsorted(dates, [start, end + 1])
+            ranges.append((directory, int(lo), int(hi)))
+        return ranges
+
+    def read(self, start, end, level="hourly", columns=None):
+        """Rows of `level` dated in [start, end], optionally only `columns`.
+
+        Only the partitions overlapping the range are opened and, in each
+        column file, only the bytes of the rows inside it are read.
+        """
+        ranges = self.ranges(start, end, level)
+        if not ranges:
+            if not self.meta[level]["key"]:
+                return pd.DataFrame(columns=list(columns or [DATE_COLUMN]))
+            # No overlap: an empty frame with the stored schema
+            ranges.append((os.path.join(self.root, level, self.meta[level]["key"][0]), 0, 0))
+        frame = columnar_cache.read_ranges(ranges, None if columns is None else set(columns))
+        return frame if columns is None else frame[list(columns)]
+
+
+def open_partitions(path=DATA_PATH, cache_dir=columnar_cache.CACHE_DIR):
+    """`PartitionedDataset` for the current `path`, built or extended as needed."""
+    root = parts_path(path, cache_dir)
+    hourly = columnar_cache.load(path, read_all_data, cache_dir)
+    digest, rows, parents = columnar_cache.lineage(path, cache_dir)
+    try:
+        with open(os.path.join(root, METADATA)) as source:
+            meta = json.load(source)
+    except (OSError, ValueError):
+        meta = None
+    if meta is not None and meta.get("digest") == digest:
+        return PartitionedDataset(root)
+    if meta is not None and meta.get("digest") in parents and meta["rows"] <= rows:
+        try:
+            extend_partitions(hourly.iloc[meta["rows"]:], root, digest)
+            return PartitionedDataset(root)
+        except (OSError, ValueError):
+            pass
+    write_partitions(hourly, root, digest)
+    return PartitionedDataset(root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--start", required=True)
+    parser.add_argument("--end", required=True)
+    parser.add_argument("--level", choices=LEVELS, default="hourly")
+    parser.add_argument("--columns", nargs="*")
+    parser.add_argument("--output", help="CSV file to write the rows to (default: print a summary)")
+    args = parser.parse_args()
+
+    dataset = open_partitions()
+    frame = dataset.read(args.start, args.end, args.level, args.columns)
+    if args.output:
+        frame.to_csv(args.output, index=False, date_format="%Y-%m-%d")
+    opened = len(dataset.partitions(args.start, args.end, args.level))
+    print(f"{len(frame):,} {args.level} rows from {opened} partition(s)")
+
+
+if __name__ == "__main__":
+    main()
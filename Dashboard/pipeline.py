@@ -0,0 +1,169 @@
+"""Streaming rebuild of all_data.csv from Dataset/hour.csv and Dataset/day.csv.
+
+This is the notebook's cleaning and ``hour_df.merge(day_df, on="dateday")``
+step as a standalone stage with bounded memory. day.csv (one row per date) is
+loaded and cleaned once and indexed by date ordinal; hour.csv is streamed in
+chunks, each chunk is cleaned, joined against that index with an array
+lookup and written out before the next chunk is read.
+
+Two output formats are supported:
+
+* ``csv``: the denormalized 30-column all_data.csv the dashboard ships;
+* ``columnar``: a directory holding the hourly columns plus a ``day_offset``
+  column and, separately, the daily table stored once. `read_columnar`
+  joins them back lazily with a ``take``.
+
+    python pipeline.py --format csv --output all_data.csv
+    python pipeline.py --format columnar --output .cache/all_data.columnar
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import columnar_cache
+import transforms
+from data_loader import DAY_PATH, HOUR_PATH
+
+RENAME = {
+    "dteday": "dateday",
+    "yr": "year",
+    "mnth": "month",
+    "hr": "hour",
+    "hum": "humidity",
+    "cnt": "count",
+}
+# hour.csv columns that day.csv does not have keep their name after the join
+HOUR_ONLY = ("hour",)
+
+
+def clean(frame):
+    """The notebook's cleaning steps for one chunk of hour.csv or day.csv."""
+    frame = frame.drop(columns="instant").rename(columns=RENAME)
+    dates = pd.to_datetime(frame["dateday"], format="%Y-%m-%d")
+    frame["dateday"] = dates
+    frame["year"] = dates.dt.year
+    frame["month"] = transforms.month_names(dates.dt.month)
+    frame["weathersit"] = transforms.weather_conditions(frame["weathersit"])
+    return frame
+
+
+class DayIndex:
+    """Cleaned day.csv with an array lookup from date ordinal to row position."""
+
+    def __init__(self, day):
+        self.day = day.reset_index(drop=True)
+        ordinals = self.day["dateday"].to_numpy().astype("datetime64[D]").astype(np.int64)
+        # An empty day table gets an empty lookup: every date misses
+        self.first = int(ordinals.min()) if len(ordinals) else 0
+        self.position = np.full(int(ordinals.max()) - self.first + 1 if len(ordinals) else 0, -1, dtype=np.int32)
+        self.position[ordinals - self.first] = np.arange(len(self.day), dtype=np.int32)
+
+    def lookup(self, dates):
+        """Row position in the day table for each date, -1 where it has none."""
+        ordinals = np.asarray(dates, dtype="datetime64[D]").astype(np.int64) - self.first
+        inside = (ordinals >= 0) & (ordinals < len(self.position))
+        positions = np.full(len(ordinals), -1, dtype=np.int32)
+        positions[inside] = self.position[ordinals[inside]]
+        return positions
+
+    def suffixed(self):
+        """Day columns renamed with the ``_day`` suffix used in all_data.csv."""
+        return self.day.drop(columns="dateday").add_suffix("_day")
+
+
+def hour_chunks(hour_path=HOUR_PATH, day_path=DAY_PATH, chunksize=100_000):
+    """Yield ``(hours, day_offset)`` per chunk of hour.csv, inner-joined on date.
+
+    `hours` holds the cleaned hourly columns of rows whose date exists in
+    day.csv, and `day_offset` their row position in `DayIndex.day`.
+    """
+    index = DayIndex(clean(pd.read_csv(day_path)))
+    yield index
+    for chunk in pd.read_csv(hour_path, chunksize=chunksize):
+        hours = clean(chunk)
+        offsets = index.lookup(hours["dateday"])
+        keep = offsets >= 0
+        yield hours[keep].reset_index(drop=True), offsets[keep]
+
+
+def _hour_columns(hours):
+    return hours.rename(columns={
+        column: f"{column}_hour" for column in hours.columns if column not in HOUR_ONLY + ("dateday",)
+    })
+
+
+def denormalize(hours, offsets, day_columns):
+    """all_data.csv rows for cleaned `hours` whose days sit at `offsets` in `day_columns`."""
+    return pd.concat([_hour_columns(hours), day_columns.take(offsets).reset_index(drop=True)], axis=1)
+
+
+def join(hour, day):
+    """Clean raw hour.csv and day.csv rows and inner-join them into all_data.csv's layout."""
+    index = DayIndex(clean(day))
+    hours = clean(hour)
+    offsets = index.lookup(hours["dateday"])
+    keep = offsets >= 0
+    return denormalize(hours[keep].reset_index(drop=True), offsets[keep], index.suffixed())
+
+
+def write_csv(output, hour_path=HOUR_PATH, day_path=DAY_PATH, chunksize=100_000):
+    """Write the denormalized all_data.csv incrementally; returns the row count."""
+    chunks = hour_chunks(hour_path, day_path, chunksize)
+    day_columns = next(chunks).suffixed()
+    rows = 0
+    tmp = output + ".tmp"
+    with open(tmp, "w", newline="") as target:
+        for hours, offsets in chunks:
+            joined = denormalize(hours, offsets, day_columns)
+            joined.to_csv(target, header=rows == 0, index=False, date_format="%Y-%m-%d")
+            rows += len(joined)
+    os.replace(tmp, output)
+    return rows
+
+
+def write_columnar(output, hour_path=HOUR_PATH, day_path=DAY_PATH, chunksize=100_000):
+    """Write hourly columns + ``day_offset`` and the day table once; returns the row count."""
+    chunks = hour_chunks(hour_path, day_path, chunksize)
+    index = next(chunks)
+    os.makedirs(output, exist_ok=True)
+    columnar_cache.write_columns(index.day, os.path.join(output, "days"))
+    writer = columnar_cache.ColumnWriter(os.path.join(output, "hours"))
+    for hours, offsets in chunks:
+        writer.append(_hour_columns(hours).assign(day_offset=offsets))
+    writer.close()
+    return writer.rows
+
+
+def read_columnar(output, day_columns=None):
+    """Memory-map a `write_columnar` store and return it in all_data.csv's layout.
+
+    Only the daily columns named in `day_columns` (default: all) are expanded
+    onto the hourly rows.
+    """
+    hours = columnar_cache.read_columns(os.path.join(output, "hours"))
+    days = columnar_cache.read_columns(os.path.join(output, "days")).drop(columns="dateday").add_suffix("_day")
+    if day_columns is not None:
+        days = days[list(day_columns)]
+    offsets = hours["day_offset"].to_numpy()
+    expanded = days.take(offsets).reset_index(drop=True)
+    return pd.concat([hours.drop(columns="day_offset"), expanded], axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hour", default=HOUR_PATH)
+    parser.add_argument("--day", default=DAY_PATH)
+    parser.add_argument("--format", choices=["csv", "columnar"], default="csv")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    args = parser.parse_args()
+
+    write = write_csv if args.format == "csv" else write_columnar
+    rows = write(args.output, args.hour, args.day, args.chunksize)
+    print(f"{rows:,} rows -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Prefix-sum index behind the summary metric cards and the moving averages.
+
+The daily rows are sorted by date and split into one stratum per
+(weekday, weathersit) combination. Each stratum keeps only its own days:
+their dates and the running sums of each measure, so row ``i`` of
+``stratum_sums[s]`` holds the totals of the stratum's first ``i`` days and
+the day count is the row number itself. A date range is two
+``searchsorted`` calls on each selected stratum's dates and the totals are
+the difference of two rows, whatever the length of the range. Storage is
+one date and one sum per measure per day (32 bytes), however many strata
+there are. The weekday/weekend filter is a set of weekdays, so any subset
+of weekdays and weather codes is answered the same way.
+
+Moving averages sum the selected strata into one prefix over all dates,
+once per filter combination (`PrefixSums.collapsed`): the sum over the
+trailing window of a day is the difference between the prefix at that day
+and the prefix at the window start, so a trend line costs one subtraction
+per plotted day instead of a rolling pass over the filtered frame.
+
+Dates and prefix rows are `buffers` storage, so `PrefixSums.extend` writes
+only the rows of the new days.
+"""
+import numpy as np
+import pandas as pd
+
+from buffers import AppendBuffer
+from cube import MEASURES
+
+WEEKDAYS = 7
+WEATHER_CODES = 4
+STRATA = WEEKDAYS * WEATHER_CODES
+
+
+class PrefixSums:
+    def __init__(self, daily, date_column="date"):
+        if not daily[date_column].is_monotonic_increasing:
+            daily = daily.sort_values(date_column, kind="stable")
+        self.date_column = date_column
+        self._dates = AppendBuffer(daily[date_column].to_numpy().astype("datetime64[D]"))
+        self._stratum_dates = [AppendBuffer(np.empty(0, dtype="datetime64[D]")) for _ in range(STRATA)]
+        self._stratum_sums = [AppendBuffer(np.zeros((1, len(MEASURES)), dtype=np.int64)) for _ in range(STRATA)]
+        self._add(daily)
+        self.dates = self._dates.values
+
+    @staticmethod
+    def _split(daily):
+        """``(stratum, row positions)`` of each stratum with days in `daily`, rows in date order."""
+        weekdays = daily["weekday_day"].to_numpy().astype(np.intp)
+        weather = daily["weathersit_day"].to_numpy().astype(np.intp)
+        if ((weekdays < 0) | (weekdays >= WEEKDAYS) | (weather < 1) | (weather > WEATHER_CODES)).any():
+            raise ValueError("weekday_day must be 0-6 and weathersit_day 1-4")
+        strata = weekdays * WEATHER_CODES + weather - 1
+        # A stable sort keeps each stratum's rows in date order
+        order = np.argsort(strata, kind="stable")
+        present, starts = np.unique(strata[order], return_index=True)
+        return zip(present, np.split(order, starts[1:]))
+
+    def _add(self, daily):
+        """Append the days of `daily` to their strata and republish the views."""
+        dates = daily[self.date_column].to_numpy().astype("datetime64[D]")
+        values = daily[list(MEASURES)].to_numpy(dtype=np.int64)
+        stratum_dates, stratum_sums = list(self._stratum_dates), list(self._stratum_sums)
+        for stratum, rows in self._split(daily):
+            base = stratum_sums[stratum].values[-1]
+            stratum_dates[stratum] = stratum_dates[stratum].extend(dates[rows])
+            stratum_sums[stratum] = stratum_sums[stratum].extend(base + np.cumsum(values[rows], axis=0))
+        self._stratum_dates, self._stratum_sums = stratum_dates, stratum_sums
+        self.stratum_dates = [buffer.values for buffer in stratum_dates]
+        self.stratum_sums = [buffer.values for buffer in stratum_sums]
+        self._collapsed = {}
+
+    def extend(self, daily):
+        """Append days dated after the last indexed date.
+
+        Only the new prefix rows are computed; attributes are rebound rather
+        than written in place, so a shallow copy can be extended while the
+        original is still read.
+        """
+        daily = daily.sort_values(self.date_column, kind="stable")
+        dates = daily[self.date_column].to_numpy().astype("datetime64[D]")
+        if len(dates) == 0:
+            return self
+        if len(self.dates) and dates[0] <= self.dates[-1]:
+            raise ValueError("extend() only accepts dates after the last indexed date")
+        self._add(daily)
+        self._dates = self._dates.extend(dates)
+        self.dates = self._dates.values
+        return self
+
+    @property
+    def nbytes(self):
+        """Bytes held by the stratum dates and prefix rows."""
+        return sum(dates.nbytes + sums.nbytes for dates, sums in zip(self.stratum_dates, self.stratum_sums))
+
+    def date_range(self, start, end):
+        """Row slice ``[lo, hi)`` of the dates in [start, end]."""
+        lo, hi = np.searchsorted(self.dates, [np.datetime64(start, "D"), np.datetime64(end, "D") + 1])
+        return int(lo), int(hi)
+
+    @staticmethod
+    def _strata(weekdays=None, weather=None):
+        """Boolean mask over the strata; ``None`` means "no restriction"."""
+        keep = np.zeros((WEEKDAYS, WEATHER_CODES), dtype=bool)
+        days = slice(None) if weekdays is None else [d for d in weekdays if 0 <= d < WEEKDAYS]
+        codes = slice(None) if weather is None else [c - 1 for c in weather if 1 <= c <= WEATHER_CODES]
+        keep[np.ix_(np.arange(WEEKDAYS)[days], np.arange(WEATHER_CODES)[codes])] = True
+        return keep.ravel()
+
+    def collapsed(self, weekdays=None, weather=None):
+        """Day count and measure sums of the selected strata up to each date, shape ``(1 + measures, days + 1)``.
+
+        Computed once per filter combination and kept until `extend`.
+        """
+        key = (None if weekdays is None else tuple(weekdays), None if weather is None else tuple(weather))
+        prefix = self._collapsed.get(key)
+        if prefix is None:
+            per_day = np.zeros((1 + len(MEASURES), len(self.dates)), dtype=np.int64)
+            for stratum in np.flatnonzero(self._strata(weekdays, weather)):
+                # Dates are unique, so each stratum day has exactly one position among all dates
+                positions = np.searchsorted(self.dates, self.stratum_dates[stratum])
+                per_day[0, positions] = 1
+                per_day[1:, positions] = np.diff(self.stratum_sums[stratum], axis=0).T
+            prefix = np.concatenate([np.zeros((len(per_day), 1), dtype=np.int64), np.cumsum(per_day, axis=1)], axis=1)
+            self._collapsed[key] = prefix
+        return prefix
+
+    def totals(self, start, end, weekdays=None, weather=None):
+        """Number of days and sum of each measure over [start, end] and the filters.
+
+        Returns a dict with a ``"days"`` entry and one entry per measure.
+        """
+        bounds = [np.datetime64(start, "D"), np.datetime64(end, "D") + 1]
+        days, sums = 0, np.zeros(len(MEASURES), dtype=np.int64)
+        for stratum in np.flatnonzero(self._strata(weekdays, weather)):
+            lo, hi = np.searchsorted(self.stratum_dates[stratum], bounds)
+            hi = max(hi, lo)
+            days += int(hi - lo)
+            sums += self.stratum_sums[stratum][hi] - self.stratum_sums[stratum][lo]
+        return dict(zip(("days",) + MEASURES, [days] + sums.tolist()))
+
+    def moving_average(self, start, end, measure="count_day", windows=(7, 30), weekdays=None, weather=None):
+        """Daily value and trailing moving averages of `measure` for the matching days in [start, end].
+
+        The ``ma<w>`` column averages the matching days among the `w`
+        calendar days ending on each day; the window may reach back before
+        `start`.
+        """
+        lo, hi = self.date_range(start, end)
+        hi = max(hi, lo)
+        prefix = self.collapsed(weekdays, weather)
+        days, sums = prefix[0], prefix[1 + MEASURES.index(measure)]
+        matched = days[lo + 1:hi + 1] > days[lo:hi]
+        ends = np.arange(lo + 1, hi + 1)[matched]
+        dates = self.dates[ends - 1]
+        frame = pd.DataFrame({self.date_column: dates.astype("datetime64[ns]"), measure: sums[ends] - sums[ends - 1]})
+        for window in windows:
+            starts = np.searchsorted(self.dates, dates - (window - 1))
+            frame[f"ma{window}"] = (sums[ends] - sums[starts]) / (days[ends] - days[starts])
+        return frame
@@ -0,0 +1,213 @@
+"""Per-rerun stage timing for the dashboard and cache hit/miss counts.
+
+`Profiler` records, for each run of the script, the wall time, rows
+processed and RSS change of named stages::
+
+    with profiler.stage("filter") as stage:
+        view = filter_index.view(...)
+        stage.rows = len(view)
+
+It lives in the session state and keeps the last `history` runs for the
+debug panel. While it is off, `stage` returns one shared no-op context
+manager, so an instrumented stage costs a method call and never reads the
+clock or /proc. Stages do not nest: a stage opened inside another one is
+counted as part of the outer stage.
+
+A fragment rerun (a widget inside one analysis tab) skips the top of the
+script; `Profiler.rerun` wraps the tab functions so such a rerun is
+recorded as a run of its own, and does nothing inside a full run.
+
+`CACHES` counts hits and misses per cache for the whole process; `counted`
+adds it to a Streamlit cache decorator such as ``st.cache_resource``.
+"""
+import functools
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import pandas as pd
+
+from data_loader import current_rss
+
+
+class StageTotals:
+    """Time, rows and RSS change of one named stage, summed over its calls in a run."""
+
+    __slots__ = ("seconds", "rows", "rss_bytes", "calls")
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.rows = 0
+        self.rss_bytes = 0
+        self.calls = 0
+
+
+class Run:
+    """One script or fragment run: label, start, duration and stage totals."""
+
+    def __init__(self, label):
+        self.label = label
+        self.started = datetime.now()
+        self.seconds = None
+        self.stages = {}
+        self.depth = 0
+        self._start = time.perf_counter()
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._start
+
+
+class _Timer:
+    """Context manager timing one call of a stage; `rows` set in the block is added to it."""
+
+    __slots__ = ("_run", "_name", "_start", "_rss", "rows")
+
+    def __init__(self, run, name):
+        self._run = run
+        self._name = name
+        self.rows = 0
+
+    def __enter__(self):
+        self._run.depth += 1
+        self._rss = current_rss()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._start
+        run = self._run
+        run.depth -= 1
+        totals = run.stages.get(self._name)
+        if totals is None:
+            totals = run.stages[self._name] = StageTotals()
+        totals.seconds += elapsed
+        totals.rows += self.rows or 0
+        totals.rss_bytes += current_rss() - self._rss
+        totals.calls += 1
+        return False
+
+
+class _NullTimer:
+    """What `Profiler.stage` returns when nothing is recorded; `rows` is discarded."""
+
+    __slots__ = ()
+    rows = property(lambda self: 0, lambda self, value: None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Profiler:
+    def __init__(self, history=20):
+        self.enabled = False
+        self.runs = deque(maxlen=history)
+        self._run = None
+
+    def begin(self, label, enabled):
+        """Start a full script run, recorded only if `enabled`; an unfinished earlier run is dropped."""
+        self.enabled = enabled
+        self._run = Run(label) if enabled else None
+
+    def end(self):
+        """Finish the current run and add it to the history."""
+        run, self._run = self._run, None
+        if run is not None:
+            run.finish()
+            self.runs.append(run)
+
+    def stage(self, name):
+        run = self._run
+        if run is None or run.depth:
+            return NULL_TIMER
+        return _Timer(run, name)
+
+    def rerun(self, label):
+        """Decorator recording a call made outside a run (a fragment rerun) as a run labelled `label`."""
+        def decorate(function):
+            @functools.wraps(function)
+            def call(*args, **kwargs):
+                if self._run is not None or not self.enabled:
+                    return function(*args, **kwargs)
+                self._run = Run(label)
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.end()
+            return call
+        return decorate
+
+    def history_frame(self):
+        """Milliseconds per stage of the recorded runs, newest first."""
+        rows = []
+        for run in reversed(self.runs):
+            row = {"Waktu": run.started.strftime("%H:%M:%S"), "Jalankan": run.label, "Total": run.seconds * 1000}
+            row.update({name: totals.seconds * 1000 for name, totals in run.stages.items()})
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def stage_frame(self, run=None):
+        """Stage totals of `run` (the newest by default), with the unstaged rest as "lainnya"."""
+        run = run or (self.runs[-1] if self.runs else None)
+        if run is None:
+            return pd.DataFrame(columns=["Tahap", "ms", "Baris", "RSS (MB)", "Panggilan"])
+        return pd.DataFrame({
+            "Tahap": list(run.stages) + ["lainnya"],
+            "ms": [totals.seconds * 1000 for totals in run.stages.values()]
+                  + [(run.seconds - sum(totals.seconds for totals in run.stages.values())) * 1000],
+            "Baris": [totals.rows for totals in run.stages.values()] + [0],
+            "RSS (MB)": [totals.rss_bytes / 2**20 for totals in run.stages.values()] + [0.0],
+            "Panggilan": [totals.calls for totals in run.stages.values()] + [0],
+        })
+
+
+class CacheCounter:
+    """Hit and miss counts per cache name, shared by every session of the process."""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, hit):
+        with self._lock:
+            counts = self._counts.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def snapshot(self):
+        """``{name: (hits, misses)}``"""
+        with self._lock:
+            return {name: tuple(counts) for name, counts in self._counts.items()}
+
+
+CACHES = CacheCounter()
+
+
+def counted(name, cache):
+    """Apply `cache` (e.g. ``st.cache_resource``) to a function, counting its hits and misses in `CACHES`.
+
+    A call is a miss when the cache ran the function body.
+    """
+    missed = threading.local()
+
+    def decorate(function):
+        @functools.wraps(function)
+        def compute(*args, **kwargs):
+            missed.value = True
+            return function(*args, **kwargs)
+
+        cached = cache(compute)
+
+        @functools.wraps(function)
+        def call(*args, **kwargs):
+            missed.value = False
+            result = cached(*args, **kwargs)
+            CACHES.count(name, not missed.value)
+            return result
+        return call
+    return decorate
@@ -0,0 +1,77 @@
+"""LRU cache of rendered matplotlib figures.
+
+Rendering seaborn figures dominates a rerun, yet the same chart is redrawn
+for the same filter state over and over. `RenderCache` stores the PNG bytes
+keyed by (filter state, plot type, chart id), evicts least recently used
+entries once `max_bytes` is exceeded and always closes the figure after
+rasterizing it, so pyplot does not accumulate open figures.
+"""
+import io
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+
+class RenderCache:
+    def __init__(self, max_bytes=64 * 2**20, dpi=150, history=500):
+        self.max_bytes = max_bytes
+        self.dpi = dpi
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._timings = {}
+        self._history = history
+
+    def __len__(self):
+        return len(self._entries)
+
+    def record(self, mode, seconds):
+        """Remember one render duration for `mode` (e.g. "matplotlib", "klien")."""
+        with self._lock:
+            self._timings.setdefault(mode, deque(maxlen=self._history)).append(seconds)
+
+    def percentiles(self, mode, q=(50, 95)):
+        """Render time percentiles in seconds for `mode`, or None without samples."""
+        with self._lock:
+            samples = list(self._timings.get(mode, ()))
+        if not samples:
+            return None
+        return tuple(np.percentile(samples, q))
+
+    def render(self, key, draw):
+        """PNG bytes for `key`, calling ``draw() -> Figure`` only on a miss."""
+        start = time.perf_counter()
+        with self._lock:
+            png = self._entries.get(key)
+            if png is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if png is None:
+            png = self._rasterize(draw())
+            with self._lock:
+                self.misses += 1
+                if key not in self._entries:
+                    self._entries[key] = png
+                    self.bytes += len(png)
+                self._evict()
+        self.record("matplotlib", time.perf_counter() - start)
+        return png
+
+    def _rasterize(self, fig):
+        import matplotlib.pyplot as plt
+
+        buffer = io.BytesIO()
+        try:
+            fig.savefig(buffer, format="png", dpi=self.dpi, bbox_inches="tight")
+        finally:
+            plt.close(fig)
+        return buffer.getvalue()
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, png = self._entries.popitem(last=False)
+            self.bytes -= len(png)
@@ -0,0 +1,51 @@
+"""Vectorized builders for the frames the dashboard tabs plot.
+
+Each helper replaces a per-row Python loop (``iterrows``, ``apply`` or list
+concatenation) with a lookup over integer codes, so building the plot data
+costs a few array operations regardless of how many rows are filtered in.
+The label lookups themselves live in `transforms`.
+"""
+import numpy as np
+import pandas as pd
+
+from transforms import DAY_NAMES, WEATHER_NAMES
+
+USER_TYPE_DTYPE = pd.CategoricalDtype(["Casual", "Registered"], ordered=True)
+
+
+def weather_plot_frame(df, measure="count_day"):
+    """Long frame of weather label and rental count for the weather tab."""
+    codes = df["weathersit_day"].to_numpy(dtype=np.intp) - 1
+    # Only weather that actually occurs gets a slot on the plot's x axis
+    present = np.flatnonzero(np.bincount(codes, minlength=len(WEATHER_NAMES)))
+    remap = np.full(len(WEATHER_NAMES), -1, dtype=np.int8)
+    remap[present] = np.arange(len(present))
+    dtype = pd.CategoricalDtype([WEATHER_NAMES[i] for i in present], ordered=True)
+    return pd.DataFrame({
+        "Kondisi Cuaca": pd.Categorical.from_codes(remap[codes], dtype=dtype),
+        "Jumlah Peminjaman": df[measure].to_numpy(),
+    })
+
+
+def user_type_frame(df):
+    """Casual and registered counts stacked into one long frame."""
+    casual = df["casual_day"].to_numpy()
+    registered = df["registered_day"].to_numpy()
+    return pd.DataFrame({
+        "Tipe Pengguna": pd.Categorical.from_codes(
+            np.repeat(np.array([0, 1], dtype=np.int8), [len(casual), len(registered)]),
+            dtype=USER_TYPE_DTYPE,
+        ),
+        "Jumlah Peminjaman": np.concatenate([casual, registered]),
+    })
+
+
+def weekly_frame(weekly_casual, weekly_registered):
+    """Casual/registered weekday means aligned on all seven days (0 where missing)."""
+    days = pd.RangeIndex(7, name="weekday_day")
+    return pd.DataFrame({
+        "Hari": DAY_NAMES,
+        "Hari_num": days,
+        "Casual": weekly_casual.set_index("weekday_day")["casual_day"].reindex(days, fill_value=0).to_numpy(),
+        "Registered": weekly_registered.set_index("weekday_day")["registered_day"].reindex(days, fill_value=0).to_numpy(),
+    })
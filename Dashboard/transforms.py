@@ -0,0 +1,51 @@
+"""Vectorized labelling of the dataset's integer codes for the dashboard and pipeline.
+
+Each mapping is a lookup array indexed by the integer code and returns a
+pandas Categorical with a fixed category order, so labelling costs one
+``take`` whatever the row count, and group and plot order never depend on
+which values happen to be present. Month inputs may hold either the month
+numbers or the names written by the cleaning step (``"January"``).
+
+The notebook keeps its own lookup tables in its setup cell so it runs on
+Colab without this package.
+"""
+import numpy as np
+import pandas as pd
+
+from data_loader import MONTH_DTYPE, MONTH_NAMES, WEATHER_DTYPE
+
+SEASONS = ["Musim Dingin", "Musim Semi", "Musim Panas", "Musim Gugur"]
+SEASON_DTYPE = pd.CategoricalDtype(SEASONS, ordered=True)
+# Month number -> index into SEASONS (index 0 unused)
+MONTH_TO_SEASON = np.array([-1, 0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0], dtype=np.int8)
+
+# The dashboard's names for weathersit codes 1-4
+WEATHER_NAMES = ["Cerah", "Berawan", "Hujan Ringan", "Hujan Lebat"]
+
+DAY_NAMES = ["Minggu", "Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu"]
+
+
+def _codes(values, labels):
+    """1-based integer codes of `values`, which hold either codes or `labels` (0 if unknown)."""
+    dtype = getattr(values, "dtype", None)
+    if dtype is None:
+        values = np.asarray(values)
+        dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype) or dtype.kind in "OUS":
+        return pd.Categorical(values, categories=labels).codes.astype(np.intp) + 1
+    return np.asarray(values)
+
+
+def weather_conditions(codes):
+    """weathersit codes 1-4 as the cleaned labels of all_data.csv."""
+    return pd.Categorical.from_codes(np.asarray(codes, dtype=np.intp) - 1, dtype=WEATHER_DTYPE)
+
+
+def month_names(months):
+    """Month numbers 1-12 as the English month names of all_data.csv."""
+    return pd.Categorical.from_codes(np.asarray(months, dtype=np.intp) - 1, dtype=MONTH_DTYPE)
+
+
+def season_labels(months):
+    """Season of each month (number 1-12 or name) as a Categorical in `SEASONS` order."""
+    return pd.Categorical.from_codes(MONTH_TO_SEASON[_codes(months, MONTH_NAMES)], dtype=SEASON_DTYPE)